@@ -1,23 +1,42 @@
-from datetime import datetime
-from tinydb import Query, TinyDB
-from packages.helper  import Helper
+import atexit
 import os
+import sys
 
-# Define the database directory and file path
+# the modules in packages import each other by their plain names
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "packages"))
+
+from helper import Helper
+from backend import openBackend
+from lazyImport import lazyImport
+import revision
+
+# numpy is only loaded on the first start of a day, see below
+playingConditions = lazyImport("playingConditions")
+
+# MAUER_STATS=1 prints the timings and the db i/o of this run to stderr when it ends
+if os.environ.get("MAUER_STATS"):
+    import instrumentation
+    instrumentation.enable()
+    atexit.register(instrumentation.dump)
+
+# Define the database directory
 db_dir = "./db" #should maybe be changed to %APPDATA%
-db_path = os.path.join(db_dir, "db.json")
 
-# Ensure the directory exists
-os.makedirs(db_dir, exist_ok=True)
+# Select the backend: "tinydb" stores the db in db.json, "sqlite" in db.sqlite, "journal" in db.jsonl
+db_backend = os.environ.get("MAUER_DB_BACKEND", "tinydb")
 
-# Initialize the database
-db = TinyDB(db_path)
+# Initialize the database; writes are atomic and batched per operation.
+# The db file is only opened when a table is used for the first time
+backend = openBackend(db_backend, db_dir)
 
-# Initialize tables
-games = db.table("games", cache_size=20) # stores the games that were already calculated
-courses = db.table("courses") # stores the courses
-hcLog = db.table("hcLog", cache_size=366) # stores the old HCs max one per day
+# creating instance of Helper and setting default tables (with the pending table of queueGame)
+help = Helper.fromBackend(backend)
 
-# creating instance of Helper and setting default tables
-help = Helper(games, courses, hcLog)
-            
\ No newline at end of file
+# derive the pcc of the rounds posted before today, then revise the WHS handicaps with them.
+# Runs on the first start of a day, later starts do not need to open the db.
+# One transaction, so the db is read once and written at most once
+if revision.needsRevision(db_dir):
+    with help.transaction():
+        playingConditions.updatePending([help])
+        revision.revise(help)
+    revision.markRevised(db_dir)
@@ -0,0 +1,391 @@
+"""
+The storages the Helper can work on. A backend holds the games, courses and hcLog tables:
+
+- TinyDBBackend: the tables of a TinyDB json file (db.json)
+- SQLiteBackend: the tables of a SQLite database (db.sqlite), with indexes on date, courseID and game_id
+- JournalBackend: the tables of an append-only json lines file (db.jsonl), see journal.py
+
+The tables of all three backends offer the part of the tinyDB Table api the Helper uses
+(insert, insert_multiple, all, search, get, update, remove, ...) and tinyDB queries.
+"""
+
+import json
+import os
+import re
+
+from tinydb import TinyDB
+from tinydb.table import Document
+from journal import Journal, JournalTable
+from storage import AtomicJSONStorage, SQLiteStorage, TransactionMiddleware
+
+# the fields of the documents that are indexed by the SQLite and journal backend
+INDEXED_FIELDS = {
+    "games": ("date", "courseID", "game_id"),
+    "courses": ("courseID",),
+    "hcLog": ("date",),
+    # players of a club, see club.py
+    "players": ("playerID",),
+}
+
+_NAME = re.compile(r"^\w+$")
+_COMPARISONS = {"==": "=", "!=": "!=", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+_SCALARS = (str, int, float, bool)
+
+
+class Backend:
+    """
+    Base class of the backends. The database is opened when a table is used for the first time,
+    so opening a backend costs nothing until it is needed (see benchmark.benchStartup).
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+        path (str): the file the database is stored in
+        """
+        self.path = path
+        self._opened = None
+
+    def _connect(self) -> tuple:
+        """
+        Opens the database.
+
+        Returns:
+        tuple: (games, courses, hcLog)
+        """
+        raise NotImplementedError
+
+    def _open(self) -> tuple:
+        if self._opened is None:
+            self._opened = self._connect()
+        return self._opened
+
+    @property
+    def isOpen(self) -> bool:
+        return self._opened is not None
+
+    @property
+    def games(self):
+        return self._open()[0]
+
+    @property
+    def courses(self):
+        return self._open()[1]
+
+    @property
+    def hcLog(self):
+        return self._open()[2]
+
+    def tables(self) -> tuple:
+        """
+        Returns:
+        tuple: (games, courses, hcLog) in the order the Helper takes them
+        """
+        return self._open()
+
+    def table(self, name: str):
+        """
+        Returns another table of the database, e.g. the games of one player (see club.py).
+        Tables named <kind>_<suffix> get the indexes of the kind (games, courses or hcLog).
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        raise NotImplementedError
+
+
+def indexedFields(name: str) -> tuple[str, ...]:
+    """
+    Returns:
+    tuple[str, ...]: the indexed fields of the table, "games_1" is indexed like "games"
+    """
+    return INDEXED_FIELDS.get(name, INDEXED_FIELDS.get(name.partition("_")[0], ()))
+
+
+class TinyDBBackend(Backend):
+    """
+    The tables of a TinyDB json file. Writes are atomic and batched per operation.
+    """
+
+    def _connect(self) -> tuple:
+        self.db = TinyDB(self.path, storage=TransactionMiddleware(AtomicJSONStorage))
+        return (
+            self.db.table("games", cache_size=20), # stores the games that were already calculated
+            self.db.table("courses"), # stores the courses
+            self.db.table("hcLog", cache_size=366), # stores the old HCs max one per day
+        )
+
+    def table(self, name: str):
+        self._open()
+        return self.db.table(name)
+
+    def close(self) -> None:
+        if self.isOpen:
+            self.db.close()
+
+
+class SQLiteBackend(Backend):
+    """
+    The tables of a SQLite database. Every table stores the documents as json,
+    the fields in INDEXED_FIELDS are indexed.
+    """
+
+    def _connect(self) -> tuple:
+        self._storage = SQLiteStorage(self.path)
+        self._tables = {
+            name: SQLiteTable(self._storage, name, INDEXED_FIELDS[name]) for name in ("games", "courses", "hcLog")
+        }
+        return self._tables["games"], self._tables["courses"], self._tables["hcLog"]
+
+    @property
+    def storage(self) -> SQLiteStorage:
+        self._open()
+        return self._storage
+
+    def table(self, name: str) -> "SQLiteTable":
+        self._open()
+        if name not in self._tables:
+            self._tables[name] = SQLiteTable(self._storage, name, indexedFields(name))
+        return self._tables[name]
+
+    def close(self) -> None:
+        if self.isOpen:
+            self._storage.close()
+
+
+class JournalBackend(Backend):
+    """
+    The tables of an append-only journal. Posting a round appends the changed documents
+    instead of rewriting the whole database, the file is compacted in the background.
+    """
+
+    def _connect(self) -> tuple:
+        self._storage = Journal(self.path, INDEXED_FIELDS)
+        return self._storage.table("games"), self._storage.table("courses"), self._storage.table("hcLog")
+
+    @property
+    def storage(self) -> Journal:
+        self._open()
+        return self._storage
+
+    def table(self, name: str) -> JournalTable:
+        return self.storage.table(name)
+
+    def close(self) -> None:
+        if self.isOpen:
+            self._storage.close()
+
+
+# the backends by name and the file they store the database in
+BACKENDS = {
+    "tinydb": (TinyDBBackend, "db.json"),
+    "sqlite": (SQLiteBackend, "db.sqlite"),
+    "journal": (JournalBackend, "db.jsonl"),
+}
+
+
+def openBackend(name: str, directory: str) -> Backend:
+    """
+    Opens the database of a backend in the given directory.
+
+    Args:
+    name (str): "tinydb", "sqlite" or "journal"
+    directory (str): the directory the database file is stored in
+
+    Returns:
+    Backend: the backend, the database is opened on first use
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name}. Must be one of {", ".join(BACKENDS)}.")
+    backendCls, fileName = BACKENDS[name]
+    os.makedirs(directory, exist_ok=True)
+    return backendCls(os.path.join(directory, fileName))
+
+
+def _field(path: tuple) -> str | None:
+    # the expression the index was created with, an index is only used for exactly the same text
+    if not path or not all(isinstance(key, str) and _NAME.match(key) for key in path):
+        return None
+    return f"json_extract(doc, '$.{".".join(path)}')"
+
+
+def _toSQL(queryHash: tuple) -> tuple[str, list] | None:
+    """
+    Translates the hash of a tinyDB query into a where clause. Only ==, !=, <, <=, >, >=, one_of
+    on scalar values and & / | of those are translated, for all other queries None is returned
+    and the query is evaluated in python.
+    """
+    op = queryHash[0]
+    if op in ("and", "or"):
+        parts = [_toSQL(part) for part in queryHash[1]]
+        if not parts or None in parts:
+            return None
+        sql = f" {op.upper()} ".join(f"({part[0]})" for part in parts)
+        return sql, [param for part in parts for param in part[1]]
+
+    if op not in _COMPARISONS and op != "one_of":
+        return None
+    field = _field(queryHash[1])
+    value = queryHash[2]
+    if field is None:
+        return None
+
+    if op == "one_of":
+        if not all(isinstance(item, _SCALARS) for item in value):
+            return None
+        return f"{field} IN (SELECT value FROM json_each(?))", [json.dumps(list(value))]
+
+    if not isinstance(value, _SCALARS):
+        return None
+    jsonType = field.replace("json_extract", "json_type", 1)
+    if op == "==":
+        return f"{field} = ?", [value]
+    if op == "!=":
+        # tinyDB never matches a missing field, but matches a null value
+        return f"{jsonType} IS NOT NULL AND {field} IS NOT ?", [value]
+    # python does not compare numbers with strings, sqlite orders them by type
+    kinds = "('text')" if isinstance(value, str) else "('integer', 'real', 'true', 'false')"
+    return f"{field} {_COMPARISONS[op]} ? AND {jsonType} IN {kinds}", [value]
+
+
+class SQLiteTable:
+    """
+    A table of the SQLite backend with the api of a tinyDB Table.
+    The statements are parametrized and reused, so sqlite3 only prepares them once.
+    """
+
+    def __init__(self, storage: SQLiteStorage, name: str, indexes: tuple[str, ...] = ()):
+        if not _NAME.match(name):
+            raise ValueError(f"Invalid table name {name}.")
+        self.storage = storage
+        self.name = name
+        self._select = f'SELECT doc_id, doc FROM "{name}"'
+        self._insert = f'INSERT INTO "{name}" (doc_id, doc) VALUES (?, ?)'
+        self._update = f'UPDATE "{name}" SET doc = ? WHERE doc_id = ?'
+        self._delete = f'DELETE FROM "{name}" WHERE doc_id = ?'
+
+        connection = storage.connection
+        connection.execute(
+            f'CREATE TABLE IF NOT EXISTS "{name}" (doc_id INTEGER PRIMARY KEY AUTOINCREMENT, doc TEXT NOT NULL)'
+        )
+        for field in indexes:
+            connection.execute(
+                f'CREATE INDEX IF NOT EXISTS "{name}_{field}" ON "{name}" ({_field((field,))})'
+            )
+
+    def __repr__(self) -> str:
+        return f"<SQLiteTable name='{self.name}', total={len(self)}>"
+
+    def _documents(self, rows) -> list[Document]:
+        return [Document(json.loads(doc), docId) for docId, doc in rows]
+
+    def _find(self, cond=None, doc_ids=None) -> list[Document]:
+        connection = self.storage.connection
+        if doc_ids is not None:
+            rows = connection.execute(
+                f"{self._select} WHERE doc_id IN (SELECT value FROM json_each(?)) ORDER BY doc_id",
+                (json.dumps(list(doc_ids)),),
+            )
+            docs = self._documents(rows)
+            return [doc for doc in docs if cond(doc)] if cond is not None else docs
+        if cond is None:
+            return self._documents(connection.execute(f"{self._select} ORDER BY doc_id"))
+
+        where = _toSQL(cond._hash) if getattr(cond, "_hash", None) is not None else None
+        if where is None:
+            return [doc for doc in self.all() if cond(doc)]
+        return self._documents(
+            connection.execute(f"{self._select} WHERE {where[0]} ORDER BY doc_id", where[1])
+        )
+
+    def insert(self, document: dict) -> int:
+        """
+        Inserts a document and returns its doc_id.
+        """
+        return self.insert_multiple([document])[0]
+
+    def insert_multiple(self, documents) -> list[int]:
+        """
+        Inserts the documents with one commit and returns their doc_ids.
+        """
+        docIds = []
+        with self.storage.writing() as connection:
+            for document in documents:
+                if not isinstance(document, dict):
+                    raise ValueError("Document is not a Mapping")
+                docId = document.doc_id if isinstance(document, Document) else None
+                cursor = connection.execute(self._insert, (docId, json.dumps(document)))
+                docIds.append(cursor.lastrowid)
+        return docIds
+
+    def all(self) -> list[Document]:
+        return self._find()
+
+    def search(self, cond) -> list[Document]:
+        """
+        Returns the documents matching the tinyDB query. Queries on indexed fields use the index.
+        """
+        return self._find(cond)
+
+    def get(self, cond=None, doc_id: int | None = None, doc_ids: list[int] | None = None):
+        if doc_id is not None:
+            docs = self._find(doc_ids=[doc_id])
+            return docs[0] if docs else None
+        if doc_ids is not None:
+            return self._find(doc_ids=doc_ids)
+        if cond is None:
+            raise RuntimeError("You have to pass either cond or doc_id or doc_ids")
+        docs = self._find(cond)
+        return docs[0] if docs else None
+
+    def contains(self, cond=None, doc_id: int | None = None) -> bool:
+        if doc_id is not None:
+            return self.get(doc_id=doc_id) is not None
+        if cond is None:
+            raise RuntimeError("You have to pass either cond or doc_id")
+        return self.get(cond) is not None
+
+    def count(self, cond) -> int:
+        return len(self.search(cond))
+
+    def update(self, fields, cond=None, doc_ids: list[int] | None = None) -> list[int]:
+        """
+        Updates the documents matching the query or doc_ids (all documents if neither is given).
+        fields is a dict of new values or a function changing the document in place.
+        """
+        docs = self._find(cond, doc_ids)
+        for doc in docs:
+            if callable(fields):
+                fields(doc)
+            else:
+                doc.update(fields)
+        if docs:
+            with self.storage.writing() as connection:
+                connection.executemany(self._update, [(json.dumps(doc), doc.doc_id) for doc in docs])
+        return [doc.doc_id for doc in docs]
+
+    def remove(self, cond=None, doc_ids: list[int] | None = None) -> list[int]:
+        """
+        Removes the documents matching the query or doc_ids.
+        """
+        if cond is None and doc_ids is None:
+            raise RuntimeError("Use truncate() to remove all documents")
+        docIds = [doc.doc_id for doc in self._find(cond, doc_ids)]
+        if docIds:
+            with self.storage.writing() as connection:
+                connection.executemany(self._delete, [(docId,) for docId in docIds])
+        return docIds
+
+    def truncate(self) -> None:
+        with self.storage.writing() as connection:
+            connection.execute(f'DELETE FROM "{self.name}"')
+
+    def clear_cache(self) -> None:
+        # documents are not cached, every read goes to the database
+        pass
+
+    def __len__(self) -> int:
+        return self.storage.connection.execute(f'SELECT COUNT(*) FROM "{self.name}"').fetchone()[0]
+
+    def __iter__(self):
+        return iter(self.all())
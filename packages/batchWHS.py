@@ -0,0 +1,162 @@
+# vectorized version of handicapWHS.handicapDifferential for many rounds at once,
+# e.g. to re-rate a whole season. Gives the same results as the scalar functions.
+import numpy as np
+
+MAX_HOLES = 18
+
+
+def _padded(rows: list[list[int]]) -> np.ndarray:
+    data = np.zeros((len(rows), MAX_HOLES), dtype=np.int64)
+    for i, row in enumerate(rows):
+        data[i, : len(row)] = row
+    return data
+
+
+def gamesToArrays(games: list[dict], courses: dict[str, dict], handicapIndex) -> dict:
+    """
+    Converts game and course dicts to the arrays used by handicapDifferentials.
+
+    Args:
+    games (list[dict]): the games
+    courses (dict[str, dict]): the courses by courseID
+    handicapIndex (float | list[float]): the HCI of the player for every game or one for all
+
+    Returns:
+    dict: the keyword arguments for handicapDifferentials
+    """
+    gameCourses = [courses[game["courseID"]] for game in games]
+    allowance = [
+        1 if game.get("handicap_allowance") is None else game["handicap_allowance"]
+        for game in games
+    ]
+    return {
+        "shots": _padded([game["shots"] for game in games]),
+        "is9Hole": np.array([game["is9Hole"] for game in games], dtype=bool),
+        "courseRating": np.array([course["course_rating"] for course in gameCourses], dtype=np.float64),
+        "slopeRating": np.array([course["slope_rating"] for course in gameCourses], dtype=np.float64),
+        "par": _padded([course["par"] for course in gameCourses]),
+        "strokeIndex": _padded([course["handicap_stroke_index"] for course in gameCourses]),
+        "handicapIndex": np.broadcast_to(np.asarray(handicapIndex, dtype=np.float64), len(games)),
+        "pcc": np.array([game["pcc"] for game in games], dtype=np.float64),
+        "handicapAllowance": np.array(allowance, dtype=np.float64),
+    }
+
+
+def playingHandicaps(is9Hole, courseRating, slopeRating, par, handicapIndex, handicapAllowance=None) -> np.ndarray:
+    """
+    Vectorized handicapWHS.calcPlayingHandicap.
+
+    Returns:
+    np.ndarray: the rounded playing handicaps as int64
+    """
+    modifier = np.where(is9Hole, 2, 1)
+    courseHandicap = handicapIndex * slopeRating / 113 + modifier * (courseRating - par.sum(axis=1))
+    if handicapAllowance is not None:
+        courseHandicap = courseHandicap * handicapAllowance
+    # np.rint rounds half to even like python's round
+    return np.rint(courseHandicap).astype(np.int64)
+
+
+def spreadPlayingHandicaps(par: np.ndarray, strokeIndex: np.ndarray, handicapStrokes: np.ndarray, is9Hole: np.ndarray) -> np.ndarray:
+    """
+    Vectorized handicapEGA.spreadPlayingHC. par and strokeIndex are padded with 0 for 9 hole courses.
+
+    Returns:
+    np.ndarray: the par of every hole including the handicap strokes
+    """
+    rounds = np.arange(len(par))[:, None]
+    holes = np.arange(MAX_HOLES)[None, :]
+    holeCount = np.where(is9Hole, 9, 18)
+    courseHoles = np.count_nonzero(par, axis=1)
+
+    # ganzzahligeDivision rounds towards 0
+    everyHole = np.sign(handicapStrokes) * (np.abs(handicapStrokes) // holeCount)
+    modifier = np.where(handicapStrokes > 0, 1, -1)
+    rem = handicapStrokes - modifier * (everyHole * holeCount)
+
+    # the stroke index (of the course length) is reversed for plus handicaps
+    reversedHoles = np.where(holes < courseHoles[:, None], courseHoles[:, None] - 1 - holes, holes)
+    order = np.where((handicapStrokes < 0)[:, None], reversedHoles, holes)
+    index = strokeIndex[rounds, order]
+
+    # for 9 holes the index is renumbered with the holes sorted by their stroke index
+    renumbered = np.argsort(index[:, :9], axis=1, kind="stable") + 1
+    index = index.copy()
+    index[is9Hole, :9] = renumbered[is9Hole]
+
+    extra = everyHole[:, None] + np.where(index <= np.abs(rem)[:, None], modifier[:, None], 0)
+    return par + np.where(holes < holeCount[:, None], extra, 0)
+
+
+def handicapDifferentials(
+    shots,
+    is9Hole,
+    courseRating,
+    slopeRating,
+    par,
+    strokeIndex,
+    handicapIndex,
+    pcc,
+    handicapAllowance=None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Calculates the handicap differentials and exceptional score reductions of many rounds at once.
+    Gives the same results as handicapWHS.handicapDifferential but does not change its inputs.
+    All holes arrays have 18 columns; holes that were not played/do not exist are 0.
+
+    Args:
+    shots (array R x 18): The shots of each round, 9 hole rounds use the first 9 columns
+    is9Hole (array R): True for 9 hole rounds
+    courseRating (array R): The course rating of the course played
+    slopeRating (array R): The slope rating of the course played
+    par (array R x 18): The par of the course played
+    strokeIndex (array R x 18): The handicap stroke index of the course played
+    handicapIndex (array R): The handicap index of the player at the time of the round
+    pcc (array R): The playing conditions calculation of the round
+    handicapAllowance (array R | None): The handicap allowance of the round, by default 1
+
+    Returns:
+    tuple[np.ndarray, np.ndarray]: the rounded handicap differentials and the exceptional score reductions
+    """
+    shots = np.asarray(shots, dtype=np.int64)
+    is9Hole = np.asarray(is9Hole, dtype=bool)
+    courseRating = np.asarray(courseRating, dtype=np.float64)
+    slopeRating = np.asarray(slopeRating, dtype=np.float64)
+    par = np.asarray(par, dtype=np.int64)
+    strokeIndex = np.asarray(strokeIndex, dtype=np.int64)
+    handicapIndex = np.asarray(handicapIndex, dtype=np.float64)
+    pcc = np.asarray(pcc, dtype=np.float64)
+    if handicapAllowance is not None:
+        handicapAllowance = np.asarray(handicapAllowance, dtype=np.float64)
+
+    if shots.ndim != 2 or shots.shape[1] != MAX_HOLES:
+        raise ValueError(f"shots has to be of shape (rounds, {MAX_HOLES}) but is {shots.shape}.")
+    if par.shape != shots.shape or strokeIndex.shape != shots.shape:
+        raise ValueError("shots, par and strokeIndex need the same shape.")
+    if np.any(np.where(is9Hole, 9, 18) > np.count_nonzero(par, axis=1)):
+        raise ValueError("A round has more holes than its course.")
+
+    holes = np.arange(MAX_HOLES)[None, :]
+    played = holes < np.where(is9Hole, 9, 18)[:, None]
+
+    # implements 3.1 net double bogey
+    playingHandicap = playingHandicaps(
+        is9Hole, courseRating, slopeRating, par, handicapIndex, handicapAllowance
+    )
+    adjustedPar = spreadPlayingHandicaps(par, strokeIndex, playingHandicap, is9Hole)
+    limit = np.where((handicapIndex == 54)[:, None], par + 5, adjustedPar + 2)
+    adjusted = np.where(played, np.minimum(shots, limit), 0).sum(axis=1)
+
+    # implements 5.1a/b and 2.2a/b, the pcc is subtracted
+    scale = 113 / slopeRating
+    differential18 = (adjusted - courseRating - pcc) * scale
+    expectedScore = ((handicapIndex * 1.04) + 2.4) / 2
+    differential9 = (adjusted - courseRating - 0.5 * pcc) * scale + expectedScore
+    differential = np.where(is9Hole, differential9, differential18)
+
+    # implements 5.9 exceptional score reduction
+    delta = handicapIndex - differential
+    reduction = np.select([delta >= 10, delta >= 7], [-2.0, -1.0], 0.0)
+
+    # same as roundHalfUp(differential, 1)
+    return np.floor(differential * 10 + 0.5) / 10, reduction
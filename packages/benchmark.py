@@ -0,0 +1,735 @@
+"""
+Benchmarks for the hot paths of the helper.
+
+Run from the repository root with:
+    python packages/benchmark.py
+
+The suite times the hot paths on synthetic histories of 20 to 100k rounds, writes the results
+to bench_output.txt and compares them with the stored baseline, a result more than
+REGRESSION_FACTOR times slower than the baseline fails the run:
+    python packages/benchmark.py --suite [--save-baseline]
+
+The cold start of main.py is checked against STARTUP_BUDGET the same way, a start over its
+budget fails the run:
+    python packages/benchmark.py --startup
+"""
+
+import argparse
+import copy
+from datetime import datetime, timedelta
+import json
+import pathlib
+import random
+import time
+import timeit
+
+from tinydb import TinyDB
+from tinydb.storages import MemoryStorage
+from dateIndex import toDatetime
+from helper import Helper
+import handicapEGA as ega
+import handicapWHS as whs
+
+SIZES = [100, 1_000, 10_000, 100_000]
+REPEAT = 200
+
+# the startup time of main.py in ms, a slower start fails benchStartup, by (db, start)
+STARTUP_BUDGET = {
+    ("empty", "first of the day"): 400,
+    ("empty", "later"): 150,
+    ("50 MB", "first of the day"): 2500,
+    ("50 MB", "later"): 150,
+}
+
+SUITE_SIZES = [20, 1_000, 10_000, 100_000]
+# a suite result this much slower than the baseline is a regression
+REGRESSION_FACTOR = 1.5
+BASELINE = pathlib.Path(__file__).with_name("bench_baseline.txt")
+
+
+def mockGames(count: int, seed: int = 0) -> list[dict]:
+    """
+    Creates count games on consecutive days in random insertion order.
+    """
+    rng = random.Random(seed)
+    baseDate = datetime(2000, 1, 1, 12)
+    games = [
+        {
+            "game_id": str(i),
+            "courseID": "Runde 1",
+            "date": (baseDate + timedelta(days=i)).isoformat(),
+            "shots": [rng.randint(3, 7) for _ in range(18)],
+            "pcc": 0.0,
+            "cba": 0.0,
+            "is9Hole": False,
+            "handicap_dif": round(rng.uniform(0.0, 54.0), 1),
+            "exceptional_reduction": 0.0,
+        }
+        for i in range(count)
+    ]
+    rng.shuffle(games)
+    return games
+
+
+def mockLog(count: int, seed: int = 0) -> list[dict]:
+    """
+    Creates count handicap log entries on consecutive days in random insertion order.
+    """
+    rng = random.Random(seed)
+    baseDate = datetime(2000, 1, 1, 12)
+    log = [
+        {
+            "whs": round(rng.uniform(0.0, 54.0), 1),
+            "ega": round(rng.uniform(0.0, 54.0), 1),
+            "date": (baseDate + timedelta(days=i)).isoformat(),
+        }
+        for i in range(count)
+    ]
+    rng.shuffle(log)
+    return log
+
+
+def createHelper(games: list[dict] = (), log: list[dict] = ()) -> Helper:
+    db = TinyDB(storage=MemoryStorage)
+    helper = Helper(db.table("games"), db.table("courses"), db.table("hcLog"))
+    if games:
+        helper.games.insert_multiple(games)
+    if log:
+        helper.hcLog.insert_multiple(log)
+    return helper
+
+
+def timePerCall(func, repeat: int = REPEAT) -> float:
+    """
+    Returns:
+    float: the best time of one call in microseconds
+    """
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1e6
+
+
+def benchGetLastGames() -> None:
+    print(f"{'rounds':>8} {'getLastGames [us]':>18} {'getLastGames(100, 119) [us]':>28}")
+    for size in SIZES:
+        helper = createHelper(mockGames(size))
+        helper.gameIndex  # build the index once, like the first call after startup would
+        last = timePerCall(helper.getLastGames)
+        window = timePerCall(lambda: helper.getLastGames(100, 119))
+        print(f"{size:>8} {last:>18.1f} {window:>28.1f}")
+
+
+def benchHCLog() -> None:
+    print(
+        f"{'entries':>8} {'get_last_hci [us]':>18} {'getHCLog [us]':>14} {'get_hci_on [us]':>16}"
+        f" {'min(getHCLog) [us]':>19} {'logIndex.low [us]':>18}"
+    )
+    for size in SIZES:
+        helper = createHelper(log=mockLog(size))
+        helper.logIndex
+        startDate = datetime(2000, 1, 1) + timedelta(days=size // 2)
+        newest = datetime(2000, 1, 1, 12) + timedelta(days=size)
+        last = timePerCall(lambda: helper.get_last_hci(True))
+        window = timePerCall(lambda: helper.getHCLog(startDate=startDate))
+        effective = timePerCall(lambda: helper.get_hci_on(True, startDate))
+        # the Low Handicap Index of the next round
+        scan = timePerCall(lambda: min(doc["whs"] for doc in helper.getHCLog(startDate=newest)))
+        low = timePerCall(lambda: helper.logIndex.low(newest))
+        print(f"{size:>8} {last:>18.1f} {window:>14.1f} {effective:>16.1f} {scan:>19.1f} {low:>18.1f}")
+
+
+def realCourses() -> dict[str, dict]:
+    courses = {}
+    for file in pathlib.Path("test/real_data/courses").glob("*.json"):
+        with file.open() as f:
+            course = json.load(f)
+        courses[course["courseID"]] = course
+    return courses
+
+
+def benchBatchDifferentials(count: int = 100_000) -> None:
+    import batchWHS
+
+    courses = realCourses()
+    games = [
+        dict(game, courseID="Runde 1", is9Hole=False, shots=game["shots"][:18] + [5] * (18 - len(game["shots"])))
+        for game in mockGames(count)
+    ]
+    arrays = batchWHS.gamesToArrays(games, courses, 20.0)
+
+    start = time.perf_counter()
+    batchWHS.handicapDifferentials(**arrays)
+    batch = time.perf_counter() - start
+
+    sample = games[: count // 10]
+    start = time.perf_counter()
+    for game in sample:
+        whs.handicapDifferential(copy.deepcopy(game), courses["Runde 1"], 20.0)
+    scalar = (time.perf_counter() - start) * 10
+
+    print(f"{'rounds':>8} {'batch [s]':>10} {'scalar (extrapolated) [s]':>26}")
+    print(f"{count:>8} {batch:>10.3f} {scalar:>26.3f}")
+
+
+def benchReplayEGA(count: int = 10_000) -> None:
+    from replayEGA import replayHandicap
+
+    courses = realCourses()
+    rounds = sorted(
+        (dict(game, courseID="Runde 1", is9Hole=False) for game in mockGames(count)),
+        key=lambda game: game["date"],
+    )
+    start = time.perf_counter()
+    replayHandicap(rounds, courses, 54.0)
+    print(f"{'rounds':>8} {'EGA replay [s]':>15}")
+    print(f"{count:>8} {time.perf_counter() - start:>15.3f}")
+
+
+def benchCalculateAdjustment() -> None:
+    import handicapEGA as ega
+
+    print(f"{'points':>8} {'calculateAdjustment [us]':>25}")
+    for points in [1, 10, 50, 120]:
+        duration = timePerCall(lambda: ega.calculateAdjustment(36 + points, 54.0, 0, False), 2000)
+        print(f"{points:>8} {duration:>25.2f}")
+
+
+def benchRecordMemory(count: int = 100_000) -> None:
+    import tracemalloc
+    from records import Game
+
+    games = mockGames(count)
+    print(f"{'rounds':>8} {'dicts [MB]':>11} {'records [MB]':>13}")
+    sizes = []
+    for convert in (copy.deepcopy, lambda docs: [Game(doc) for doc in docs]):
+        tracemalloc.start()
+        converted = convert(games)
+        sizes.append(tracemalloc.get_traced_memory()[0] / 2**20)
+        tracemalloc.stop()
+        del converted
+    print(f"{count:>8} {sizes[0]:>11.1f} {sizes[1]:>13.1f}")
+
+
+def benchBackends(sizes: list[int] = [1_000, 10_000], courseCount: int = 500) -> None:
+    from tempfile import TemporaryDirectory
+    from tinydb import where
+    from backend import openBackend
+
+    print(f"{'games':>8} {'backend':>8} {'getCourses [us]':>16} {'game_id [us]':>13} {'30 days [us]':>13}")
+    for size in sizes:
+        games = mockGames(size)
+        for i, game in enumerate(games):
+            game["game_id"] = str(i)
+            game["courseID"] = f"course {i % courseCount}"
+        courses = [{"courseID": f"course {i}"} for i in range(courseCount)]
+        rng = random.Random(0)
+
+        for name in ["tinydb", "sqlite"]:
+            with TemporaryDirectory() as tempDir:
+                backend = openBackend(name, tempDir)
+                backend.games.insert_multiple(games)
+                backend.courses.insert_multiple(courses)
+                helper = Helper(*backend.tables())
+
+                # different values every call, so the query cache of tinyDB does not help
+                def lookupCourses():
+                    helper.getCourses([{"courseID": f"course {rng.randrange(courseCount)}"} for _ in range(4)])
+
+                def lookupGame():
+                    backend.games.search(where("game_id") == str(rng.randrange(size)))
+
+                def dateRange():
+                    start = datetime(2000, 1, 1) + timedelta(days=rng.randrange(size))
+                    backend.games.search(
+                        (where("date") >= start.isoformat())
+                        & (where("date") < (start + timedelta(days=30)).isoformat())
+                    )
+
+                print(
+                    f"{size:>8} {name:>8} {timePerCall(lookupCourses, 20):>16.1f}"
+                    f" {timePerCall(lookupGame, 20):>13.1f} {timePerCall(dateRange, 20):>13.1f}"
+                )
+                backend.close()
+
+
+def benchPostRound(sizes: list[int] = [100, 1_000, 10_000], rounds: int = 20) -> None:
+    from tempfile import TemporaryDirectory
+    from backend import openBackend
+
+    print(f"{'games':>8} {'backend':>8} {'addGame [ms]':>13}")
+    for size in sizes:
+        games = [dict(game, courseID="Runde 1", is9Hole=False, shots=[5] * 18) for game in mockGames(size)]
+        for name in ["tinydb", "sqlite", "journal"]:
+            with TemporaryDirectory() as tempDir:
+                backend = openBackend(name, tempDir)
+                backend.courses.insert_multiple(realCourses().values())
+                backend.games.insert_multiple(games)
+                helper = Helper(*backend.tables())
+                # the indexes are built once at startup
+                helper.gameIndex, helper.logIndex
+                gameDate = datetime(2000, 1, 1) + timedelta(days=size)
+
+                start = time.perf_counter()
+                for i in range(rounds):
+                    helper.addGame("Runde 1", [5] * 18, False, 0, 0, gameDate + timedelta(days=i))
+                duration = (time.perf_counter() - start) / rounds * 1e3
+                print(f"{size:>8} {name:>8} {duration:>13.2f}")
+                backend.close()
+
+
+def benchExceptionalScore(size: int = 10_000, rounds: int = 20) -> None:
+    from tempfile import TemporaryDirectory
+    from backend import openBackend
+
+    # an exceptional score is stored with its round like any other score
+    print(f"{'backend':>8} {'round':>12} {'addGame [ms]':>13}")
+    games = [dict(game, courseID="Runde 1", is9Hole=False, shots=[5] * 18) for game in mockGames(size)]
+    for name in ["tinydb", "sqlite", "journal"]:
+        for label, shots in [("normal", [7] * 18), ("exceptional", [3] * 18)]:
+            with TemporaryDirectory() as tempDir:
+                backend = openBackend(name, tempDir)
+                backend.courses.insert_multiple(realCourses().values())
+                backend.games.insert_multiple(games)
+                helper = Helper(*backend.tables())
+                helper.gameIndex, helper.logIndex
+                gameDate = datetime(2000, 1, 1) + timedelta(days=size)
+
+                start = time.perf_counter()
+                for i in range(rounds):
+                    helper.addGame("Runde 1", shots, False, 0, 0, gameDate + timedelta(days=i))
+                duration = (time.perf_counter() - start) / rounds * 1e3
+                print(f"{name:>8} {label:>12} {duration:>13.2f}")
+                backend.close()
+
+
+def benchClubPost(players: int = 300, backendName: str = "journal") -> None:
+    from tempfile import TemporaryDirectory
+    from backend import openBackend
+    from club import Club
+
+    courses = realCourses()
+    rng = random.Random(0)
+    rounds = [
+        {"playerID": f"p{i}", "courseID": "Runde 1", "shots": [rng.randint(3, 8) for _ in range(18)],
+         "is9Hole": False, "pcc": 0, "cba": 0, "date": datetime(2025, 1, 1)}
+        for i in range(players)
+    ]
+
+    print(f"{'players':>8} {'mode':>12} {'post [s]':>9} {'writes':>7}")
+    for mode in ["addGame", "post_rounds", "pool"]:
+        with TemporaryDirectory() as tempDir:
+            backend = openBackend(backendName, tempDir)
+            backend.courses.insert_multiple(courses.values())
+            club = Club(backend)
+            for i in range(players):
+                club.addPlayer(f"p{i}")
+            # one round of history, so the indexes exist like in a running club
+            club.post_rounds([dict(score, date=datetime(2024, 12, 1)) for score in rounds], workers=0)
+            writes = backend.courses.storage.writes
+
+            start = time.perf_counter()
+            if mode == "addGame":
+                for score in rounds:
+                    club.player(score["playerID"]).addGame(
+                        score["courseID"], score["shots"], False, 0, 0, score["date"]
+                    )
+            else:
+                club.post_rounds(rounds, workers=0 if mode == "post_rounds" else None)
+            duration = time.perf_counter() - start
+            print(f"{players:>8} {mode:>12} {duration:>9.3f} {backend.courses.storage.writes - writes:>7}")
+            backend.close()
+
+
+def benchRevision(size: int = 10_000, rounds: int = 100, backendName: str = "journal") -> None:
+    from datetime import date
+    from tempfile import TemporaryDirectory
+    from backend import openBackend
+    import revision
+
+    games = [dict(game, courseID="Runde 1", is9Hole=False, shots=[5] * 18) for game in mockGames(size)]
+    gameDate = datetime(2000, 1, 1) + timedelta(days=size)
+    print(f"{'games':>8} {'post':>10} {'per round [ms]':>15}")
+    for mode in ["addGame", "queueGame"]:
+        with TemporaryDirectory() as tempDir:
+            backend = openBackend(backendName, tempDir)
+            backend.courses.insert_multiple(realCourses().values())
+            backend.games.insert_multiple(games)
+            games_, courses, hcLog = backend.tables()
+            helper = Helper(games_, courses, hcLog, pending=backend.table("pending"))
+            helper.gameIndex, helper.logIndex
+
+            start = time.perf_counter()
+            for i in range(rounds):
+                post = helper.addGame if mode == "addGame" else helper.queueGame
+                post("Runde 1", [5] * 18, False, 0, 0, gameDate + timedelta(hours=i))
+            duration = (time.perf_counter() - start) / rounds * 1e3
+            print(f"{size:>8} {mode:>10} {duration:>15.2f}")
+
+            if mode == "queueGame":
+                start = time.perf_counter()
+                revision.revise(helper, today=date.max)
+                print(f"{'':>8} {'revision':>10} {(time.perf_counter() - start) * 1e3:>12.2f} ms for the day")
+            backend.close()
+
+
+def benchRecalculation(size: int = 10_000, backendName: str = "journal") -> None:
+    from tempfile import TemporaryDirectory
+    from backend import openBackend
+    import synthetic
+
+    courses = list(realCourses().values())
+    print(f"{'games':>8} {'recalculation':>28} {'games replayed':>15} {'[ms]':>10}")
+    with TemporaryDirectory() as tempDir:
+        backend = openBackend(backendName, tempDir)
+        backend.courses.insert_multiple(courses)
+        helper = Helper(*backend.tables())
+        synthetic.insertHistory(helper, synthetic.history(courses, size))
+        first = helper.getLastGames(size - 1, size - 1)[0]
+        late = helper.getLastGames(50, 50)[0]
+
+        # the synthetic history has no checkpoints yet, the full replay writes them
+        for name, run in [
+            ("whole history", lambda: helper.recalculate(first["date"])),
+            ("correct a round 50 ago", lambda: helper.correctGame(late["game_id"], pcc=1)),
+            ("delete a round 50 ago", lambda: helper.removeGame(late["game_id"])),
+        ]:
+            start = time.perf_counter()
+            report = run()
+            duration = (time.perf_counter() - start) * 1e3
+            print(f"{size:>8} {name:>28} {report['games']:>15} {duration:>10.1f}")
+        backend.close()
+
+
+def benchPCC(rounds: int = 5_000, courseCount: int = 200) -> None:
+    import playingConditions
+
+    rng = random.Random(0)
+    template = realCourses()["Runde 1"]
+    courses = {f"c{i}": dict(template, courseID=f"c{i}") for i in range(courseCount)}
+    field = [
+        {
+            "courseID": f"c{rng.randrange(courseCount)}",
+            "date": datetime(2025, 6, 1, rng.randrange(7, 18)).isoformat(),
+            "shots": [par + rng.randint(-1, 3) for par in template["par"]],
+            "is9Hole": False,
+            "pcc": 0,
+        }
+        for _ in range(rounds)
+    ]
+    hcis = [round(rng.uniform(0.0, 54.0), 1) for _ in range(rounds)]
+
+    start = time.perf_counter()
+    result = playingConditions.fieldPCC(field, courses, hcis)
+    duration = time.perf_counter() - start
+    print(f"{'rounds':>8} {'fields':>8} {'with pcc':>9} {'time [ms]':>10}")
+    print(f"{rounds:>8} {courseCount:>8} {len(result):>9} {duration * 1e3:>10.1f}")
+
+
+def benchService(clients: int = 50, requests: int = 100, backendName: str = "journal") -> None:
+    import asyncio
+    from tempfile import TemporaryDirectory
+    from backend import openBackend
+    import service
+
+    async def run(helper: Helper) -> dict:
+        server = service.Service(helper)
+        await server.start()
+        try:
+            return await service.loadTest(port=server.port, clients=clients, requests=requests)
+        finally:
+            await server.stop()
+
+    with TemporaryDirectory() as tempDir:
+        backend = openBackend(backendName, tempDir)
+        backend.courses.insert_multiple(realCourses().values())
+        report = asyncio.run(run(Helper(*backend.tables())))
+        backend.close()
+
+    # the writer blocks the event loop while it writes a batch
+    writer = report["service"]["routes"]["writer"]
+    print(
+        f"{'requests':>9} {'per second':>11} {'p50 [ms]':>9} {'p99 [ms]':>9} {'posts':>6} {'flushes':>8}"
+        f" {'writer p50 [ms]':>16} {'writer p99 [ms]':>16}"
+    )
+    print(
+        f"{report['requests']:>9} {report['per_second']:>11.0f} {report['p50_ms']:>9.2f} {report['p99_ms']:>9.2f}"
+        f" {report['service']['posts']:>6} {report['service']['flushes']:>8}"
+        f" {writer['p50_ms']:>16.2f} {writer['p99_ms']:>16.2f}"
+    )
+
+
+def benchScorecards(players: int = 300) -> None:
+    from io import BytesIO
+    import scorecards
+
+    courses = list(realCourses().values())
+    helpers = []
+    for i in range(players):
+        helper = createHelper(log=[{"whs": round(i / players * 54, 1), "ega": 30.0, "date": "2025-01-01T00:00:00"}])
+        helper.courses.insert_multiple(courses)
+        helpers.append(helper)
+
+    start = time.perf_counter()
+    cards = scorecards.prepareCards(
+        [(f"player {i}", helper, courses[i % len(courses)]) for i, helper in enumerate(helpers)], is_whs=True
+    )
+    prepare = time.perf_counter() - start
+    print(f"prepared {len(cards)} cards in {prepare * 1e3:.1f} ms")
+
+    print(f"{'output':>16} {'cards/s':>8}")
+    for name, kwargs in [
+        ("one pdf", {"single": True}),
+        ("zip, 1 process", {"workers": 0}),
+        ("zip, all cpus", {"workers": None}),
+    ]:
+        report = scorecards.exportScorecards(cards, BytesIO(), **kwargs)
+        print(f"{name:>16} {report['cards_per_second']:>8.0f}")
+
+
+def importTimes(log: str) -> list[tuple[str, int]]:
+    """
+    Parses the output of python -X importtime.
+
+    Returns:
+    list[tuple[str, int]]: (module, cumulative import time in us) of the modules imported
+        by the script itself, slowest first
+    """
+    times = []
+    for line in log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if not name.startswith("  "):
+            times.append((name.strip(), int(cumulative)))
+    return sorted(times, key=lambda item: -item[1])
+
+
+def benchStartup(games: int = 150_000, repeat: int = 5) -> list[tuple[str, str]]:
+    """
+    Measures the cold start of main.py in a new interpreter with an empty db and with a db of
+    about 50 MB, on the first start of a day (with the revision) and on a later start.
+
+    Returns:
+    list[tuple[str, str]]: the (db, start) slower than their STARTUP_BUDGET
+    """
+    import os
+    import subprocess
+    import sys
+    from tempfile import TemporaryDirectory
+    from backend import openBackend
+    import revision
+
+    root = pathlib.Path(__file__).resolve().parent.parent
+    env = dict(os.environ, PYTHONPATH=str(root / "packages"), MAUER_DB_BACKEND="tinydb")
+
+    def start(cwd: str) -> tuple[float, str]:
+        begin = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", str(root / "main.py")], cwd=cwd, env=env, capture_output=True, text=True
+        )
+        duration = (time.perf_counter() - begin) * 1e3
+        if result.returncode:
+            raise RuntimeError(result.stderr)
+        return duration, result.stderr
+
+    overBudget = []
+    print(f"{'db':>6} {'start':>17} {'[ms]':>7} {'budget':>7}  slowest imports")
+    for db in ["empty", "50 MB"]:
+        with TemporaryDirectory() as tempDir:
+            dbDir = os.path.join(tempDir, "db")
+            if db != "empty":
+                backend = openBackend("tinydb", dbDir)
+                backend.courses.insert_multiple(realCourses().values())
+                backend.games.insert_multiple(mockGames(games))
+                backend.hcLog.insert_multiple(mockLog(games))
+                backend.close()
+            for name in ["first of the day", "later"]:
+                durations = []
+                for _ in range(repeat):
+                    if name == "first of the day":
+                        pathlib.Path(dbDir, revision.STAMP).unlink(missing_ok=True)
+                    duration, log = start(tempDir)
+                    durations.append(duration)
+                budget = STARTUP_BUDGET[(db, name)]
+                slowest = ", ".join(f"{module} {us / 1e3:.0f}" for module, us in importTimes(log)[:3])
+                over = min(durations) > budget
+                if over:
+                    overBudget.append((db, name))
+                print(f"{db:>6} {name:>17} {min(durations):>7.0f} {budget:>7} {slowest}{'  OVER BUDGET' if over else ''}")
+    return overBudget
+
+
+def benchSynthetic(players: int = 2_000, rounds: int = 20, backendName: str = "journal") -> None:
+    import tracemalloc
+    from tempfile import TemporaryDirectory
+    from backend import openBackend
+    from club import Club
+    import synthetic
+
+    courses = list(synthetic.courses(50))
+    list(synthetic.history(courses, 100))  # compiles the courses
+    start = time.perf_counter()
+    count = sum(1 for _ in synthetic.history(courses, 100_000))
+    duration = time.perf_counter() - start
+    tracemalloc.start()
+    sum(1 for _ in synthetic.history(courses, 10_000))
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    print(f"{'history':>10} {count:>8} rounds {count / duration:>10.0f} rounds/s {peak:>6.1f} MB peak")
+
+    with TemporaryDirectory() as tempDir:
+        backend = openBackend(backendName, tempDir)
+        start = time.perf_counter()
+        report = synthetic.populateClub(Club(backend), 50, players, rounds)
+        duration = time.perf_counter() - start
+        print(f"{'club':>10} {report['players']:>8} players {report['rounds'] / duration:>9.0f} rounds/s ({backendName})")
+        backend.close()
+
+
+def history(count: int, seed: int = 0) -> tuple[list[dict], list[dict]]:
+    """
+    Creates the history of a player with count rounds on the real courses (see synthetic.history).
+
+    Returns:
+    tuple[list[dict], list[dict]]: the games and the hcLog entries, oldest first
+    """
+    import synthetic
+
+    pairs = list(synthetic.history(list(realCourses().values()), count, seed))
+    return [game for game, _ in pairs], [entry for _, entry in pairs]
+
+
+def suite(sizes: list[int] = SUITE_SIZES, repeat: int = 20) -> dict[tuple[str, int], float]:
+    """
+    Times the hot paths for histories of the given sizes.
+
+    Returns:
+    dict[tuple[str, int], float]: the best time of one call in microseconds by (benchmark, rounds)
+    """
+    from io import BytesIO
+
+    courses = realCourses()
+    results = {}
+    for size in sizes:
+        games, log = history(size)
+        helper = createHelper(games, log)
+        helper.courses.insert_multiple(courses.values())
+        helper.gameIndex, helper.logIndex
+        latest = games[-1]
+        course = courses[latest["courseID"]]
+        nextDate = toDatetime(latest["date"]) + timedelta(days=1)
+        middle = toDatetime(games[size // 2]["date"])
+        last20 = helper.getLastGames()
+
+        dates = iter(nextDate + timedelta(hours=i) for i in range(repeat * 2))
+        results[("addGame", size)] = timePerCall(
+            lambda: helper.addGame(latest["courseID"], latest["shots"], latest["is9Hole"], 0, 0, next(dates)), repeat
+        )
+        results[("getLastGames", size)] = timePerCall(helper.getLastGames, repeat)
+        results[("getHCLog", size)] = timePerCall(lambda: helper.getHCLog(startDate=middle), repeat)
+        results[("updateHandicapIndex", size)] = timePerCall(
+            lambda: helper.updateHandicapIndex(latest, next(dates)), repeat
+        )
+        # the next round after the newest hcLog entry
+        newest = toDatetime(helper.logIndex.latest()["date"])
+        results[("lowHandicap", size)] = timePerCall(lambda: helper.logIndex.low(newest), repeat)
+        results[("handicapWHS.handicap", size)] = timePerCall(lambda: whs.handicap(last20, 20.0), repeat)
+        results[("handicapDifferential", size)] = timePerCall(
+            lambda: whs.handicapDifferential(dict(latest), course, 20.0), repeat
+        )
+        results[("calculateNewHandicap", size)] = timePerCall(
+            lambda: ega.calculateNewHandicap(latest, 0, 20.0, course), repeat
+        )
+        results[("projectRound", size)] = timePerCall(
+            lambda: helper.projectRound(latest["courseID"], latest["is9Hole"], gameDate=nextDate), repeat
+        )
+        results[("export_scorecard", size)] = timePerCall(lambda: helper.export_scorecard(BytesIO(), course, True), repeat)
+    return results
+
+
+def writeResults(results: dict[tuple[str, int], float], path: str) -> None:
+    """
+    Writes the results as tab separated lines: benchmark, rounds, microseconds.
+    """
+    with open(path, "w") as file:
+        file.write("# benchmark\trounds\tus\n")
+        for (name, size), duration in results.items():
+            file.write(f"{name}\t{size}\t{duration:.1f}\n")
+
+
+def readResults(path: str) -> dict[tuple[str, int], float]:
+    results = {}
+    with open(path) as file:
+        for line in file:
+            if line.startswith("#") or not line.strip():
+                continue
+            name, size, duration = line.rstrip("\n").split("\t")
+            results[(name, int(size))] = float(duration)
+    return results
+
+
+def compare(
+    results: dict[tuple[str, int], float], baseline: dict[tuple[str, int], float], factor: float = REGRESSION_FACTOR
+) -> list[tuple[str, int]]:
+    """
+    Prints the results next to the baseline.
+
+    Returns:
+    list[tuple[str, int]]: the (benchmark, rounds) more than factor times slower than the baseline
+    """
+    regressions = []
+    print(f"{'benchmark':>22} {'rounds':>7} {'[us]':>10} {'baseline':>10} {'ratio':>6}")
+    for key, duration in results.items():
+        name, size = key
+        if key not in baseline:
+            print(f"{name:>22} {size:>7} {duration:>10.1f} {'-':>10} {'-':>6}  new")
+            continue
+        ratio = duration / baseline[key] if baseline[key] else 1.0
+        regression = ratio > factor
+        if regression:
+            regressions.append(key)
+        print(f"{name:>22} {size:>7} {duration:>10.1f} {baseline[key]:>10.1f} {ratio:>6.2f}{'  REGRESSION' if regression else ''}")
+    return regressions
+
+
+def runSuite(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Times the hot paths and compares them with the baseline.")
+    parser.add_argument("--suite", action="store_true", help="run the suite instead of all benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SUITE_SIZES, help="the numbers of rounds")
+    parser.add_argument("--output", default="bench_output.txt", help="the file the results are written to")
+    parser.add_argument("--baseline", default=str(BASELINE), help="the results to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    results = suite(args.sizes)
+    writeResults(results, args.output)
+    if args.save_baseline:
+        writeResults(results, args.baseline)
+    baseline = readResults(args.baseline) if pathlib.Path(args.baseline).exists() else {}
+    return 1 if compare(results, baseline) else 0
+
+
+if __name__ == "__main__":
+    import sys
+
+    if "--suite" in sys.argv:
+        sys.exit(runSuite())
+    if "--startup" in sys.argv:
+        sys.exit(1 if benchStartup() else 0)
+
+    benchGetLastGames()
+    benchHCLog()
+    benchBatchDifferentials()
+    benchReplayEGA()
+    benchCalculateAdjustment()
+    benchRecordMemory()
+    benchBackends()
+    benchPostRound()
+    benchExceptionalScore()
+    benchClubPost()
+    benchRevision()
+    benchRecalculation()
+    benchPCC()
+    benchService()
+    benchScorecards()
+    # like the suite, a start over its budget fails the run
+    sys.exit(1 if benchStartup() else 0)
+    benchSynthetic()
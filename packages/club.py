@@ -0,0 +1,271 @@
+"""
+Runs the Helper for a whole club. Every player has their own games, hcLog and pending table
+(games_<playerID>, hcLog_<playerID>, pending_<playerID>), the courses are shared.
+
+After a competition the rounds of all players are posted at once with post_rounds: the
+handicaps are calculated per player in a process pool and all results are written with one write.
+"""
+
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import re
+from types import MappingProxyType
+
+from tinydb import TinyDB, where
+from tinydb.storages import MemoryStorage
+from tinydb.table import Document
+import course as courseModule
+from backend import Backend
+from course import Course, compileCourse
+from dateIndex import toDatetime
+from helper import Helper, storageTransaction
+import scorecards
+
+_PLAYER_ID = re.compile(r"^\w+$")
+
+# the compiled courses of a worker process, see _initWorker
+_workerCourses: dict[str, Course] = {}
+
+
+class Club:
+    def __init__(self, backend: Backend):
+        """
+        Args:
+        backend (Backend): the database of the club, see backend.py
+        """
+        self.backend = backend
+        self.courses = backend.courses
+        self.players = backend.table("players")
+        self._helpers: dict[str, Helper] = {}
+        self._courseCache = None
+
+    def addPlayer(self, playerID: str, name: str | None = None) -> Helper:
+        """
+        Registers a new player.
+
+        Args:
+        playerID (str): the id of the player, only letters, digits and _
+        name (str | None): the name of the player
+
+        Returns:
+        Helper: the Helper working on the tables of the player
+        """
+        if not _PLAYER_ID.match(playerID):
+            raise ValueError(f"Invalid player id {playerID}. Only letters, digits and _ are allowed.")
+        if self.players.contains(where("playerID") == playerID):
+            raise ValueError(f"The player {playerID} already exists.")
+        self.players.insert({"playerID": playerID, "name": name})
+        return self.player(playerID)
+
+    def playerIDs(self) -> list[str]:
+        return [player["playerID"] for player in self.players.all()]
+
+    def player(self, playerID: str) -> Helper:
+        """
+        Returns the Helper of a player. The Helper and its indexes are kept for later calls.
+        """
+        helper = self._helpers.get(playerID)
+        if helper is None:
+            if not self.players.contains(where("playerID") == playerID):
+                raise KeyError(f"Could not find the player {playerID}.")
+            helper = Helper(
+                self.backend.table(f"games_{playerID}"),
+                self.courses,
+                self.backend.table(f"hcLog_{playerID}"),
+                pending=self.backend.table(f"pending_{playerID}"),
+            )
+            self._helpers[playerID] = helper
+        return helper
+
+    def exportScorecards(
+        self,
+        pairs: list[tuple[str, str]],
+        output,
+        is_whs: bool | None = None,
+        single: bool = False,
+        workers: int | None = None,
+    ) -> dict:
+        """
+        Prints the scorecards of a tournament, see scorecards.py.
+
+        Args:
+        pairs (list[tuple[str, str]]): (playerID, courseID) of every card
+        output (str | file): the pdf (single) or the zip archive the cards are written to
+        is_whs (bool | None): print the WHS or the EGA handicap, None uses the last values of the courses
+        single (bool): one multi page pdf instead of a zip archive with one pdf per card
+        workers (int | None): number of processes rendering the pdfs of the zip archive
+
+        Returns:
+        dict: {"cards", "seconds", "cards_per_second"}
+        """
+        courses = {course["courseID"]: course for course in self.courses.all()}
+        names = {player["playerID"]: player["name"] for player in self.players.all()}
+        for playerID, courseID in pairs:
+            if courseID not in courses:
+                raise KeyError(f"Could not find the course {courseID}. Check for typos or create it.")
+        cards = scorecards.prepareCards(
+            [
+                (names.get(playerID) or playerID, self.player(playerID), courses[courseID])
+                for playerID, courseID in pairs
+            ],
+            is_whs,
+            use_last_values=is_whs is None,
+        )
+        return scorecards.exportScorecards(cards, output, single, workers)
+
+    @property
+    def courseCache(self) -> MappingProxyType:
+        """
+        The compiled courses by courseID, compiled once and shared (read only) by all players
+        and the worker processes of post_rounds. Call reloadCourses after changing the courses.
+        """
+        if self._courseCache is None:
+            self._courseCache = MappingProxyType(
+                {course["courseID"]: compileCourse(course) for course in self.courses.all()}
+            )
+        return self._courseCache
+
+    def reloadCourses(self) -> None:
+        self._courseCache = None
+
+    def discardCaches(self) -> None:
+        """
+        Drops the caches of all players, the players table and the compiled courses after the
+        storage discarded changes, see Helper.discardCaches.
+        """
+        self.players.clear_cache()
+        self.reloadCourses()
+        playerIDs = set(self.playerIDs())
+        for playerID, helper in list(self._helpers.items()):
+            helper.discardCaches()
+            if playerID not in playerIDs:
+                # added in the discarded changes
+                del self._helpers[playerID]
+
+    def transaction(self):
+        """
+        Groups all changes of all players into one write, see Helper.transaction.
+        """
+        return storageTransaction(self.courses.storage, self.discardCaches)
+
+    def post_rounds(self, rounds: list[dict], workers: int | None = None) -> list[dict]:
+        """
+        Posts the rounds of a competition. Gives the same result as calling addGame for every
+        round in the given order, but the players are calculated in parallel and everything is
+        written with one write. If a round is invalid nothing is written.
+
+        Args:
+        rounds (list[dict]): {"playerID", "courseID", "shots", "is9Hole", "pcc", "cba", "date"}
+            pcc and cba default to 0, the date to now
+        workers (int | None): number of processes. 0 calculates in this process,
+            None uses as many processes as the machine has cpus
+
+        Returns:
+        list[dict]: {"playerID", "game_id", "whs", "ega"} the new handicaps after every round
+        """
+        courses = self.courseCache
+        byPlayer = defaultdict(list)
+        for i, score in enumerate(rounds):
+            if score["courseID"] not in courses:
+                raise KeyError(f"Could not find the course {score["courseID"]}. Check for typos or create it.")
+            gameDate = score.get("date") or datetime.now()
+            byPlayer[score["playerID"]].append((i, dict(score, date=toDatetime(gameDate).isoformat())))
+
+        tasks = []
+        for playerID, playerRounds in byPlayer.items():
+            helper = self.player(playerID)
+            tasks.append(_playerState(helper, [score for _, score in playerRounds]))
+
+        if workers == 0 or len(tasks) < 2:
+            changes = [_postPlayerRounds(task, courses) for task in tasks]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_initWorker, initargs=(dict(courses),)
+            ) as executor:
+                changes = list(executor.map(_postPlayerRounds, tasks, chunksize=max(1, len(tasks) // 32)))
+
+        results = [None] * len(rounds)
+        with self.transaction():
+            for (playerID, playerRounds), change in zip(byPlayer.items(), changes):
+                _applyChanges(self.player(playerID), change)
+                for (i, _), result in zip(playerRounds, change["results"]):
+                    results[i] = dict(result, playerID=playerID)
+        return results
+
+
+def _playerState(helper: Helper, rounds: list[dict]) -> dict:
+    """
+    Collects the part of a player's history addGame reads: the 20 newest games and the
+    hcLog from one year before the oldest relevant date on.
+    """
+    games = helper.getLastGames()
+    dates = [toDatetime(score["date"]) for score in rounds]
+    if games:
+        dates.append(toDatetime(games[0]["date"]))
+    since = min(dates) - timedelta(days=366)
+    hcLog = helper.logIndex.between(since, datetime.max)
+    previous = helper.logIndex.before(since)
+    if previous is not None:
+        hcLog.append(previous)
+    return {
+        "games": [(doc.doc_id, dict(doc)) for doc in games],
+        "hcLog": [(doc.doc_id, dict(doc)) for doc in hcLog],
+        "rounds": rounds,
+    }
+
+
+def _initWorker(courses: dict[str, Course]) -> None:
+    # every worker gets the compiled courses once instead of compiling them again
+    _workerCourses.update(courses)
+    for course in courses.values():
+        courseModule.register(course)
+
+
+def _postPlayerRounds(task: dict, courses: dict[str, Course] | None = None) -> dict:
+    """
+    Posts the rounds of one player on an in memory copy of their history with Helper.addGame
+    and returns the changes to the tables.
+    """
+    courses = courses if courses is not None else _workerCourses
+    db = TinyDB(storage=MemoryStorage)
+    helper = Helper(db.table("games"), db.table("courses"), db.table("hcLog"))
+    helper.courses.insert_multiple(courses[courseID].doc for courseID in {score["courseID"] for score in task["rounds"]})
+    helper.games.insert_multiple(Document(doc, docId) for docId, doc in task["games"])
+    helper.hcLog.insert_multiple(Document(doc, docId) for docId, doc in task["hcLog"])
+
+    results = []
+    for score in task["rounds"]:
+        gameID = helper.addGame(
+            score["courseID"],
+            score["shots"],
+            score["is9Hole"],
+            score.get("pcc", 0),
+            score.get("cba", 0),
+            score["date"],
+        )
+        results.append({"game_id": gameID, "whs": helper.get_last_hci(True), "ega": helper.get_last_hci(False)})
+
+    games = {doc.doc_id: doc for doc in helper.games.all()}
+    hcLog = {doc.doc_id: doc for doc in helper.hcLog.all()}
+    originalGames = dict(task["games"])
+    originalLog = dict(task["hcLog"])
+    return {
+        "results": results,
+        "newGames": [dict(doc) for docId, doc in sorted(games.items()) if docId not in originalGames],
+        "removedLog": [docId for docId in originalLog if docId not in hcLog],
+        "newLog": [dict(doc) for docId, doc in sorted(hcLog.items()) if docId not in originalLog],
+    }
+
+
+def _applyChanges(helper: Helper, change: dict) -> None:
+    # writes the changes of _postPlayerRounds and keeps the indexes of the helper up to date
+    for doc, docId in zip(change["newGames"], helper.games.insert_multiple(change["newGames"])):
+        helper.gameIndex.insert(helper._gameRecord(doc, docId))
+
+    if change["removedLog"]:
+        helper.hcLog.remove(doc_ids=change["removedLog"])
+        for docId in change["removedLog"]:
+            helper.logIndex.remove(docId)
+    for doc, docId in zip(change["newLog"], helper.hcLog.insert_multiple(change["newLog"])):
+        helper.logIndex.insert(helper._logRecord(doc, docId))
@@ -0,0 +1,184 @@
+from array import array
+
+import handicapEGA as ega
+
+# the handicap indexes the lookup tables are built for, in tenths (-10.0 to 54.0)
+HCI_MIN_TENTHS = -100
+HCI_MAX_TENTHS = 540
+_HCIS = [tenths / 10 for tenths in range(HCI_MIN_TENTHS, HCI_MAX_TENTHS + 1)]
+
+# the number of versions of a course that stay compiled, e.g. the stored ratings and overrides
+COMPILED_VERSIONS = 4
+
+# compiled courses by courseID, keyed by the course version (see Course.version), least recently used first
+_compiled: dict[str, dict[tuple, "Course"]] = {}
+
+
+class Course:
+    """
+    A course document compiled once for the handicap calculations. Holds the par totals, the
+    9 hole splits and lookup tables from every handicap index (-10.0 to 54.0) to the EGA playing
+    handicap and the WHS course handicap, so converting a handicap is an index into a table. The
+    EGA tables are built on first use, only they check the slope rating (see
+    handicapEGA.playingHandicap).
+
+    Can be used wherever a course dict is expected, the document's fields can be read with course["..."].
+    """
+
+    __slots__ = (
+        "doc",
+        "courseID",
+        "courseRating",
+        "slopeRating",
+        "par",
+        "parTotal",
+        "parFront",
+        "parBack",
+        "strokeIndex",
+        "_ega18",
+        "_ega9",
+        "_whs18",
+        "_whs9",
+    )
+
+    def __init__(self, doc: dict):
+        self.doc = doc
+        self.courseID = doc.get("courseID")
+        self.courseRating = doc["course_rating"]
+        self.slopeRating = doc["slope_rating"]
+        self.par = tuple(doc["par"])
+        self.parTotal = sum(self.par)
+        self.parFront = sum(self.par[:9])
+        self.parBack = sum(self.par[9:])
+        self.strokeIndex = tuple(doc["handicap_stroke_index"])
+
+        rating, slope, par = self.courseRating, self.slopeRating, self.parTotal
+        self._ega18 = None
+        self._ega9 = None
+        # same expressions as handicapWHS.calcPlayingHandicap
+        self._whs18 = array("d", (hci * slope / 113 + 1 * (rating - par) for hci in _HCIS))
+        self._whs9 = array("d", (hci * slope / 113 + 2 * (rating - par) for hci in _HCIS))
+
+    def __getitem__(self, key: str):
+        return self.doc[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.doc
+
+    def get(self, key: str, default=None):
+        return self.doc.get(key, default)
+
+    @property
+    def version(self) -> tuple:
+        """
+        The values the course was compiled from, see course.version.
+        """
+        return (self.courseRating, self.slopeRating, self.par, self.strokeIndex)
+
+    def matches(self, doc: dict) -> bool:
+        """
+        Returns:
+        bool: True if the document has the same values the course was compiled from
+        """
+        return version(doc) == self.version
+
+    def egaPlayingHandicap(self, is9Hole: bool, handicap: float) -> int:
+        """
+        Same as handicapEGA.playingHandicap for this course.
+
+        Args:
+        is9Hole (bool): True if 9 holes are played
+        handicap (float): The EGA handicap
+
+        Returns:
+        int: The playing handicap
+        """
+        index = _tableIndex(handicap)
+        if index is None:
+            return ega.playingHandicap(is9Hole, handicap, self.courseRating, self.slopeRating, self.parTotal)
+        table = self._ega9 if is9Hole else self._ega18
+        if table is None:
+            rating, slope, par = self.courseRating, self.slopeRating, self.parTotal
+            table = array("h", (ega.playingHandicap(is9Hole, hci, rating, slope, par) for hci in _HCIS))
+            if is9Hole:
+                self._ega9 = table
+            else:
+                self._ega18 = table
+        return table[index]
+
+    def whsCourseHandicap(self, is9Hole: bool, handicapIndex: float) -> float:
+        """
+        The unrounded WHS course handicap, see handicapWHS.calcPlayingHandicap.
+
+        Args:
+        is9Hole (bool): True if 9 holes are played
+        handicapIndex (float): The WHS handicap index
+
+        Returns:
+        float: The course handicap before the handicap allowance and rounding
+        """
+        index = _tableIndex(handicapIndex)
+        if index is None:
+            modifier = 2 if is9Hole else 1
+            return handicapIndex * self.slopeRating / 113 + modifier * (self.courseRating - self.parTotal)
+        return (self._whs9 if is9Hole else self._whs18)[index]
+
+    def spread(self, handicapStrokes: int, is9Hole: bool) -> tuple[int, ...]:
+        """
+        Same as handicapEGA.spreadPlayingHC for this course.
+        """
+        return ega.spreadPlayingHC(self.doc, handicapStrokes, is9Hole)
+
+
+def _tableIndex(handicap: float) -> int | None:
+    # only exact tenths are looked up, so the result is the same as calculating it
+    index = round(handicap * 10) - HCI_MIN_TENTHS
+    if 0 <= index < len(_HCIS) and _HCIS[index] == handicap:
+        return index
+    return None
+
+
+def version(course: dict) -> tuple:
+    """
+    The values a course is compiled from. A course with overridden ratings
+    (see Helper.scorecard_course) is a different version of the course.
+    """
+    return (
+        course["course_rating"],
+        course["slope_rating"],
+        tuple(course["par"]),
+        tuple(course["handicap_stroke_index"]),
+    )
+
+
+def compileCourse(course: dict | Course) -> Course:
+    """
+    Returns the compiled course for a course document. The COMPILED_VERSIONS versions of a course
+    used last stay compiled, so switching between the stored ratings and overridden ones does
+    not compile again.
+
+    Args:
+    course (dict | Course): the course document
+
+    Returns:
+    Course: the compiled course
+    """
+    if isinstance(course, Course):
+        return course
+    compiled = _compiled.get(course.get("courseID"), {}).get(version(course))
+    if compiled is None:
+        compiled = Course(course)
+    register(compiled)
+    return compiled
+
+
+def register(compiled: Course) -> None:
+    """
+    Makes a compiled course the most recently used version of its course, so compileCourse
+    returns it for its documents. Used for courses compiled in another process, see club.py.
+    """
+    versions = _compiled.setdefault(compiled.courseID, {})
+    versions.pop(compiled.version, None)
+    if len(versions) >= COMPILED_VERSIONS:
+        del versions[next(iter(versions))]
+    versions[compiled.version] = compiled
@@ -0,0 +1,181 @@
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from itertools import count
+
+
+def toDatetime(value: datetime | date | str) -> datetime:
+    """
+    Converts the different date representations used in the tables to a datetime.
+
+    Args:
+    value (datetime | date | str): a datetime, a date or an iso-string
+
+    Returns:
+    datetime: the value as datetime
+    """
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time())
+    return datetime.fromisoformat(value)
+
+
+class DateIndex:
+    """
+    Keeps the documents of a table sorted by date, so the newest n to m documents
+    or all documents in a time frame can be found with a binary search instead of
+    loading and sorting the whole table on every call.
+
+    The index holds the documents themselves, so changes to a document have to be
+    done through the index (or the index has to be rebuilt) to stay in sync with the table.
+    """
+
+    def __init__(self, docs: list[dict] = (), key: str = "date"):
+        self._key = key
+        self._seq = count()
+        # ascending (date, -insertion number), so equal dates keep the order
+        # in which they were inserted when read newest first
+        self._keys: list[tuple[datetime, int]] = []
+        self._docs: list[dict] = []
+        self._keyById: dict[int, tuple[datetime, int]] = {}
+
+        entries = [(self._makeKey(doc), doc) for doc in docs]
+        entries.sort(key=lambda entry: entry[0])
+        for entryKey, doc in entries:
+            self._keys.append(entryKey)
+            self._docs.append(doc)
+            self._keyById[doc.doc_id] = entryKey
+
+    def _makeKey(self, doc: dict) -> tuple[datetime, int]:
+        # records (see records.py) hold the date already parsed
+        value = getattr(doc, self._key, None)
+        if not isinstance(value, datetime):
+            value = toDatetime(doc[self._key])
+        return (value, -next(self._seq))
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def insert(self, doc: dict) -> None:
+        """
+        Adds a document to the index. The document needs a doc_id (e.g. a tinyDB Document).
+
+        Args:
+        doc (dict): the document that was inserted into the table
+        """
+        entryKey = self._makeKey(doc)
+        pos = bisect_right(self._keys, entryKey)
+        self._keys.insert(pos, entryKey)
+        self._docs.insert(pos, doc)
+        self._keyById[doc.doc_id] = entryKey
+
+    def get(self, docId: int) -> dict | None:
+        """
+        Returns the indexed document, e.g. to change it the same way as in the table.
+
+        Args:
+        docId (int): the doc_id of the document
+
+        Returns:
+        dict | None: the document or None if it is not indexed
+        """
+        entryKey = self._keyById.get(docId)
+        if entryKey is None:
+            return None
+        return self._docs[bisect_left(self._keys, entryKey)]
+
+    def remove(self, docId: int) -> dict | None:
+        """
+        Removes a document from the index.
+
+        Args:
+        docId (int): the doc_id of the document
+
+        Returns:
+        dict | None: the removed document or None if it was not indexed
+        """
+        entryKey = self._keyById.pop(docId, None)
+        if entryKey is None:
+            return None
+        pos = bisect_left(self._keys, entryKey)
+        del self._keys[pos]
+        return self._docs.pop(pos)
+
+    def newest(self, n: int = 0, m: int | None = None) -> list[dict]:
+        """
+        returns the n-th to m-th (inclusive) newest documents. Newest document first.
+
+        Args:
+        n (int): The starting index.
+        m (int): The ending index. By default all remaining documents.
+
+        Returns:
+        list[dict]: The documents between the indices.
+        """
+        size = len(self._docs)
+        if m is None:
+            m = size - 1
+        n = max(0, n)
+        m = min(size - 1, max(n, m))
+        if n >= size:
+            return []
+        return self._docs[size - 1 - m : size - n][::-1]
+
+    def latest(self) -> dict | None:
+        """
+        Returns:
+        dict | None: the newest document or None if the index is empty
+        """
+        return self._docs[-1] if self._docs else None
+
+    def between(self, start: datetime, end: datetime, inclusiveStart: bool = True) -> list[dict]:
+        """
+        returns the documents from start to end (inclusive). Newest document first.
+
+        Args:
+        start (datetime): the oldest date of the time frame
+        end (datetime): the newest date of the time frame
+        inclusiveStart (bool): whether documents dated exactly on start are included
+
+        Returns:
+        list[dict]: the documents in the time frame
+        """
+        lo = self._lowerBound(start, inclusiveStart)
+        hi = self._lowerBound(end, False)
+        return self._docs[lo:hi][::-1]
+
+    def before(self, end: datetime, inclusive: bool = True) -> dict | None:
+        """
+        returns the newest document dated before (or on) the given date,
+        which is the document that was in effect at that date.
+
+        Args:
+        end (datetime): the reference date
+        inclusive (bool): whether a document dated exactly on end is returned
+
+        Returns:
+        dict | None: the document or None if there is no older document
+        """
+        pos = self._lowerBound(end, not inclusive)
+        return self._docs[pos - 1] if pos > 0 else None
+
+    def walkBack(self, end: datetime, inclusive: bool = True):
+        """
+        Yields the documents dated before (or on) the given date, newest first, without
+        copying the index. The index must not be changed while walking.
+
+        Args:
+        end (datetime): the reference date
+        inclusive (bool): whether documents dated exactly on end are yielded
+
+        Yields:
+        dict: the documents
+        """
+        for pos in range(self._lowerBound(end, not inclusive) - 1, -1, -1):
+            yield self._docs[pos]
+
+    def _lowerBound(self, value: datetime, inclusive: bool) -> int:
+        # keys are (date, -seq): (value, -inf) sorts before and (value, inf) after all keys on value
+        if inclusive:
+            return bisect_left(self._keys, (value, -float("inf")))
+        return bisect_right(self._keys, (value, float("inf")))
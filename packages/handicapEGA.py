@@ -1,9 +1,26 @@
 # sauce https://www.ega-golf.ch/sites/default/files/hcp_booklet_2019_final_0.pdf
+from functools import lru_cache
+from itertools import count
 import math
 
+# course imports this module, only its functions are used here
+import course as courseModule
+
 BUFFER_UPPER_LIMIT = 36
 BELOW_BUFFER_ADD = 0.1
 BUFFER_LOWER_LIMIT_9HOLE = [None, 35, 35, 34, 33, None]
+# lowest handicap (in tenths) of category 1 to 6, see handicapToCategory
+CATEGORY_LOWER_LIMIT_TENTHS = [None, None, 45, 115, 185, 265, 370]
+# reduction per point above the buffer zone (in tenths) of category 1 to 6
+CATEGORY_REDUCTION_TENTHS = [None, 1, 2, 3, 4, 5, 10]
+# number of (course, playing handicap, 9/18 holes) stroke allocations that are cached
+STROKE_ALLOCATION_CACHE_SIZE = 4096
+
+# precomputed stroke indexes per courseID, see spreadPlayingHC
+_strokeIndexes: dict[str, dict] = {}
+# the par and stroke indexes of every version of a course, looked up by _spreadPlayingHC
+_strokeIndexKeys: dict[int, tuple] = {}
+_courseVersions = count()
 
 
 # implements p.25 3.11.5
@@ -35,7 +52,7 @@ def calculateNewHandicap(
     Returns:
         float: The new calculated handicap.
     """
-    if not (-2 >= cba <= 1):
+    if not (-2 <= cba <= 1):
         raise ValueError(
             f"CBA can only be between -2 and +1. Given value was { cba }"
         )
@@ -44,13 +61,7 @@ def calculateNewHandicap(
         stableford = convertToStableford(game["shots"], course["par"])
         return initialHandicap(stableford, game["is9Hole"])
 
-    handicapStrokes = playingHandicap(
-        game["is9Hole"],
-        previousHandicap,
-        course["course_rating"],
-        course["slope_rating"],
-        sum(course["par"]),
-    )
+    handicapStrokes = courseModule.compileCourse(course).egaPlayingHandicap(game["is9Hole"], previousHandicap)
 
     # implements p.24 3.9.7
     # assigning handicap strokes
@@ -64,7 +75,8 @@ def calculateNewHandicap(
 
     adjustment = calculateAdjustment(stableford, previousHandicap, cba, game["is9Hole"])
 
-    return previousHandicap + adjustment
+    # EGA handicaps have one decimal, e.g. 18.2 + 0.1 would be 18.299999999999997
+    return round(previousHandicap + adjustment, 1)
 
 
 def ganzzahligeDivision(dividend: float, divisor: float) -> float:
@@ -77,9 +89,89 @@ def ganzzahligeDivision(dividend: float, divisor: float) -> float:
     return dividend // divisor
 
 
-def spreadPlayingHC(course: dict, handicapStrokes: int, is9Hole: bool) -> list:
-    par = course["par"].copy()
-    strokeIndex = course["handicap_stroke_index"].copy()
+def spreadPlayingHC(course: dict, handicapStrokes: int, is9Hole: bool) -> tuple[int, ...]:
+    """
+    Spreads the playing handicap over the holes of the course.
+    The result is cached per course, so it must not be modified.
+
+    Args:
+        course (dict): The course played on
+        handicapStrokes (int): The playing handicap
+        is9Hole (bool): True if 9 holes are played
+
+    Returns:
+        tuple[int, ...]: The par of every hole including the handicap strokes
+    """
+    entry = _courseStrokeIndexes(course)
+    return _spreadPlayingHC(entry["key"], handicapStrokes, is9Hole)
+
+
+def invalidateCourse(courseID: str) -> None:
+    """
+    Drops the cached stroke allocations of a course, e.g. after its stroke index was overridden.
+    """
+    entry = _strokeIndexes.pop(courseID, None)
+    if entry is not None:
+        _strokeIndexKeys.pop(entry["key"], None)
+
+
+def _courseStrokeIndexes(course: dict) -> dict:
+    courseID = course.get("courseID")
+    entry = _strokeIndexes.get(courseID)
+    # a course dict with overridden values (e.g. for a scorecard) gets its own entry
+    if (
+        entry is None
+        or entry["par"] != course["par"]
+        or entry["handicap_stroke_index"] != course["handicap_stroke_index"]
+    ):
+        invalidateCourse(courseID)
+        entry = _buildStrokeIndexes(course)
+        _strokeIndexes[courseID] = entry
+    return entry
+
+
+def strokeIndexPermutations(strokeIndex: list[int]) -> dict[tuple[bool, bool], tuple[int, ...]]:
+    """
+    Calculates the stroke index used by spreadPlayingHC for plus/normal handicaps and 9/18 holes.
+
+    Args:
+        strokeIndex (list[int]): The handicap stroke index of the course
+
+    Returns:
+        dict[tuple[bool, bool], tuple[int, ...]]: The stroke index by (plus handicap, is9Hole)
+    """
+    indexes = {}
+    for plus in (False, True):
+        for is9Hole in (False, True):
+            index = list(strokeIndex)
+            # plus handicaps give back strokes starting on the other end
+            if plus:
+                index.reverse()
+
+            # this creates tuples from the stroke index and a list from 1 to 9
+            # and sorts based on the first number (original stroke index), which
+            # creates a new stroke index with the same order using numbers 1-9
+            if is9Hole:
+                sorted_tuples = sorted(zip(index, list(range(1, 10))))
+                for i, (_, new_index) in enumerate(sorted_tuples):
+                    index[i] = new_index
+            indexes[plus, is9Hole] = tuple(index)
+    return indexes
+
+
+def _buildStrokeIndexes(course: dict) -> dict:
+    par = list(course["par"])
+    strokeIndex = list(course["handicap_stroke_index"])
+    key = next(_courseVersions)
+    _strokeIndexKeys[key] = (tuple(par), strokeIndexPermutations(strokeIndex))
+    return {"key": key, "par": par, "handicap_stroke_index": strokeIndex}
+
+
+@lru_cache(maxsize=STROKE_ALLOCATION_CACHE_SIZE)
+def _spreadPlayingHC(key: int, handicapStrokes: int, is9Hole: bool) -> tuple[int, ...]:
+    par, indexes = _strokeIndexKeys[key]
+    par = list(par)
+    strokeIndex = indexes[handicapStrokes < 0, is9Hole]
 
     holecount_modifier = 9 if is9Hole else 18
 
@@ -88,24 +180,13 @@ def spreadPlayingHC(course: dict, handicapStrokes: int, is9Hole: bool) -> list:
     hc_stroke_modifier = 1 if handicapStrokes > 0 else -1
 
     rem = handicapStrokes - hc_stroke_modifier*(everyHole * holecount_modifier)
-    
-    if handicapStrokes < 0:
-        strokeIndex.reverse()
-
-    # this creates tuples from the stroke index and a list from 1 to 9
-    # and sorts based on the first number (original stroke index), which
-    # creates a new stroke index with the same order using numbers 1-9
-    if is9Hole:
-        sorted_tuples = sorted(zip(strokeIndex, list(range(1, 10))))
-        for i, (_, new_index) in enumerate(sorted_tuples):
-            strokeIndex[i] = new_index
 
     for i in range(holecount_modifier):
         par[i] += everyHole
         if strokeIndex[i] <= abs(rem):
             par[i] += hc_stroke_modifier
 
-    return par
+    return tuple(par)
 
 
 # implements 3.10
@@ -298,42 +379,66 @@ def calculateAdjustment(
 ) -> float:
     """
     Calculates adjustment to handicap index.
+    Instead of reducing the handicap point by point the points are applied per category
+    segment, so the adjustment takes at most one step per category.
 
     Args:
         stablefordScore (int): Stableford score achieved including allotted handicap strokes.
-        handicap (float): The player's current handicap
+        handicap (float): The player's current handicap (EGA handicaps have one decimal)
         cba (int): The Calculated Buffer Adjustment of the game played.
 
     Returns:
         float: Amount to adjust handicap by.
     """
-    if not (-2 >= cba <= 1):
+    if not (-2 <= cba <= 1):
         raise ValueError(
             f"CBA can only be between -2 and +1. Given value was { cba }"
         )
-    
-    adjustment = 0
+
     category = handicapToCategory(handicap)
     if category == 6:
         cba = 0  # cba does not apply to cat 6
 
-    if stablefordScore > BUFFER_UPPER_LIMIT + cba:
-        for _ in range(stablefordScore - (BUFFER_UPPER_LIMIT + cba)):
-            category = handicapToCategory(handicap + adjustment)
-            single = category / 10
-            if category == 6:
-                single = 1
-            adjustment -= single
-        return adjustment
+    points = stablefordScore - (BUFFER_UPPER_LIMIT + cba)
+    if points > 0:
+        return -_reductionTenths(int(round(handicap * 10)), points) / 10
 
+    # below the buffer zone the handicap goes up by 0.1, but never into category 6.
+    # 9 hole rounds of category 1 have no buffer zone
+    if category == 6:
+        return 0
     lower = catToLowerBuffer(is9Hole, category)
-    if stablefordScore < lower + cba:
-        # cannot go back to cat 6
-        for _ in range(stablefordScore - lower):
-            if handicapToCategory(handicap + adjustment) == 6:
-                if adjustment > 0:
-                    return adjustment - BELOW_BUFFER_ADD
-                return adjustment
-            adjustment += BELOW_BUFFER_ADD
-
-    return adjustment
+    if lower is None or stablefordScore >= lower + cba:
+        return 0
+    if int(round(handicap * 10)) + 1 >= CATEGORY_LOWER_LIMIT_TENTHS[6]:
+        return 0
+    return BELOW_BUFFER_ADD
+
+
+def _reductionTenths(handicapTenths: int, points: int) -> int:
+    """
+    Calculates the reduction (in tenths) for the points above the buffer zone.
+    Every point reduces the handicap by category/10 (1 in category 6), where the
+    category is the one of the already reduced handicap.
+
+    Args:
+        handicapTenths (int): The handicap * 10
+        points (int): The Stableford points above the buffer zone
+
+    Returns:
+        int: The reduction in tenths
+    """
+    reduction = 0
+    while points > 0:
+        category = handicapToCategory(handicapTenths / 10)
+        single = CATEGORY_REDUCTION_TENTHS[category]
+        lowerLimit = CATEGORY_LOWER_LIMIT_TENTHS[category]
+        if lowerLimit is None:
+            steps = points
+        else:
+            # points that are applied before the handicap drops into the next category
+            steps = min(points, (handicapTenths - lowerLimit) // single + 1)
+        handicapTenths -= steps * single
+        reduction += steps * single
+        points -= steps
+    return reduction
@@ -1,6 +1,7 @@
 # sauce https://www.usga.org/handicapping/roh/2020-rules-of-handicapping.html
-import statistics as stats
+from fractions import Fraction
 from handicapEGA import roundHalfUp, spreadPlayingHC
+from course import Course
 
 # implements 5.2a
 def handicap(games: list[dict], lowHandicap: float) -> float:
@@ -8,7 +9,7 @@ def handicap(games: list[dict], lowHandicap: float) -> float:
     calculates the handicap given 0 to 20 games and returns the handicap unrounded. 
     
     Args:
-    games (list[dict]): up to the last 20 games
+    games (list[dict]): up to the last 20 games, newest first (see reducedDifferentials)
     lowHandicap (float): The Low Handicap Index represents the last 365-day period preceding the day 
         on which the most recent score in their scoring record was played.
 
@@ -21,36 +22,34 @@ def handicap(games: list[dict], lowHandicap: float) -> float:
 
     #implements 5.2a
     numGames = len(games)
-    differentials = []
-    for game in games:
-        # implements 5.9
-        differentials.append(game["handicap_dif"] + game["exceptional_reduction"])
-    differentials.sort()
+    differentials = sorted(reducedDifferentials(games))
     
     if numGames <= 3:
-        handicap = differentials[0] - 2
+        handicap = average(differentials, 1) - 2
     elif numGames == 4:
-        handicap = differentials[0] - 1
+        handicap = average(differentials, 1) - 1
     elif numGames == 5:
-        handicap = differentials[0]
+        handicap = average(differentials, 1)
     elif numGames == 6:
-        handicap = stats.mean(differentials[:2]) - 1
+        handicap = average(differentials, 2) - 1
     elif numGames <= 8:
-        handicap = stats.mean(differentials[:2])
+        handicap = average(differentials, 2)
     elif numGames <= 11:
-        handicap = stats.mean(differentials[:3])
+        handicap = average(differentials, 3)
     elif numGames <= 14:
-        handicap = stats.mean(differentials[:4])
+        handicap = average(differentials, 4)
     elif numGames <= 16:
-        handicap = stats.mean(differentials[:5])
+        handicap = average(differentials, 5)
     elif numGames <= 18:
-        handicap = stats.mean(differentials[:6])
+        handicap = average(differentials, 6)
     elif numGames == 19:
-        handicap = stats.mean(differentials[:7])
+        handicap = average(differentials, 7)
     else:
-        handicap = stats.mean(differentials[:8])
+        handicap = average(differentials, 8)
 
         # implements 5.7+8
+        if lowHandicap is not None:
+            lowHandicap = Fraction(round(lowHandicap * 10), 10)
         handicap = capIncrease(handicap, games, lowHandicap)
     
     # checks if at least 54 holes where played I do not know where the correlating rule was
@@ -62,6 +61,46 @@ def handicap(games: list[dict], lowHandicap: float) -> float:
     return roundHalfUp(handicap, 1)
 
 
+# implements 5.9
+def reducedDifferentials(games: list[dict]) -> list[int]:
+    """
+    The handicap differentials of a window of games with the exceptional score reductions applied,
+    in tenths so the average is exact and e.g. 11.15 is rounded up.
+
+    An exceptional score is recorded once, as the reduction_event of its own game. It applies to the
+    game itself (its exceptional_reduction) and the 19 games before it, so every game is reduced by
+    the events of the newer games in the window, summed up while walking the window. Games stored
+    before the reductions were events have none and carry the reductions of the games after them
+    in their exceptional_reduction.
+
+    Args:
+    games (list[dict]): up to the last 20 games, newest first
+
+    Returns:
+    list[int]: the reduced differentials in tenths, in the order of games
+    """
+    offset = 0.0
+    tenths = []
+    for game in games:
+        tenths.append(round((game["handicap_dif"] + (game["exceptional_reduction"] + offset)) * 10))
+        offset += game.get("reduction_event", 0.0)
+    return tenths
+
+
+def average(tenths: list[int], count: int) -> Fraction:
+    """
+    The exact average of the lowest differentials.
+
+    Args:
+    tenths (list[int]): the sorted differentials in tenths
+    count (int): the number of differentials averaged
+
+    Returns:
+    Fraction: the average
+    """
+    return Fraction(sum(tenths[:count]), 10 * count)
+
+
 # implements 5.7+8
 def capIncrease(handicap: float, games: list[dict], lowHandicap: float) -> float:
     """
@@ -72,13 +111,14 @@ def capIncrease(handicap: float, games: list[dict], lowHandicap: float) -> float
     game (list[dict]): the last 20 games
     lowHandicap (float): The 365 low of the Handicap Index
     """
+    if lowHandicap is None:
+        return handicap
+
     dif = handicap - lowHandicap
-    # apply soft cap
-    if dif > 3.0 < 5.0:
-        handicap = handicap - 0.5*dif
-    elif dif >= 5.0:
-        handicap = lowHandicap["whs"] + 5.0
-    
+    if dif > 3:
+        # soft cap: half of the increase above 3.0, hard cap: at most 5.0 above the low
+        handicap = min(lowHandicap + 3 + (dif - 3) / 2, lowHandicap + 5)
+
     return handicap
 
 
@@ -97,13 +137,13 @@ def handicapDifferential(game: dict, course: dict, handicapIndex:float) -> dict:
     adjusted = adjustGrossScore(game, course, handicapIndex)
     
 
-    # implements 5.1a and 2.2a
+    # implements 5.1a and 2.2a, a positive pcc (the field scored high) lowers the differential
     if len(game["shots"]) > 9:
-        differential =(adjusted - course["course_rating"] + game["pcc"] ) * (113 / course["slopeRating"])
+        differential =(adjusted - course["course_rating"] - game["pcc"] ) * (113 / course["slope_rating"])
     # implements 5.1b and 2.2b
     elif len(game["shots"]) == 9:
         # calculation according to https://serviceportal.dgv-intranet.de/regularien/whs-handicap-regeln/i22533_1_Handicap_Regeln_2024.cfm
-        score = (adjusted - course["course_rating"] + 0.5 * game["pcc"] ) * (113 / course["slopeRating"])
+        score = (adjusted - course["course_rating"] - 0.5 * game["pcc"] ) * (113 / course["slope_rating"])
         expectedScore = ((handicapIndex * 1.04) + 2.4) / 2
         differential = score + expectedScore
     else:
@@ -117,6 +157,8 @@ def handicapDifferential(game: dict, course: dict, handicapIndex:float) -> dict:
         game["exceptional_reduction"] = -2.0
     else:
         game["exceptional_reduction"] = 0.0
+    # the reduction of the games before it is applied when the index is calculated, see reducedDifferentials
+    game["reduction_event"] = game["exceptional_reduction"]
     
     game["handicap_dif"] = roundHalfUp(differential, 1)
 
@@ -147,7 +189,7 @@ def adjustGrossScore(game: dict, course: dict, handicapIndex: float) -> int:
                 shots[i] = par[i] + 5
     # implements 3.1b
     elif playingHandicap >= 54:
-        adjustedPar = spreadPlayingHC(course, game["shots"], game["is9Hole"])
+        adjustedPar = spreadPlayingHC(course, playingHandicap, game["is9Hole"])
         for i, shot in enumerate(shots):
             if shot > adjustedPar[i] + 2:
                 if adjustedPar[i] + 2 - shot >= 4:
@@ -155,7 +197,7 @@ def adjustGrossScore(game: dict, course: dict, handicapIndex: float) -> int:
                 else:
                     shots[i] = adjustedPar[i] + 2
     else:
-        adjustedPar = spreadPlayingHC(course, game["shots"], game["is9hole"])
+        adjustedPar = spreadPlayingHC(course, playingHandicap, game["is9Hole"])
 
         for i, shot in enumerate(shots):
             if shot > adjustedPar[i] + 2:
@@ -170,18 +212,22 @@ def calcPlayingHandicap(game: dict, course: dict, handicapIndex: int) -> int:
 
     Args:
     game (dict): The game the calculation is being done on.
-    course (dict): The course corresponding to the game.
+    course (dict): The course corresponding to the game. The course handicap of a compiled
+        Course (see course.py) is looked up in its table.
     handicapIndex (float): The current handicap Index.
 
     Returns:
     int: Rounded Playing Handicap
     """
     # implements 6.1a and implements 6.1b
-    modifier = 2 if game["is9Hole"] else 1
-    courseHandicap = handicapIndex * course["slope_rating"] / 113 + modifier*(course["course_rating" - sum(course["par"])])
+    if isinstance(course, Course):
+        courseHandicap = course.whsCourseHandicap(game["is9Hole"], handicapIndex)
+    else:
+        modifier = 2 if game["is9Hole"] else 1
+        courseHandicap = handicapIndex * course["slope_rating"] / 113 + modifier * (course["course_rating"] - sum(course["par"]))
 
     # implements 6.2a
-    handicapAllowance = 1 if game["handicap_allowance"] is None else game["handicap_allowance"]
+    handicapAllowance = 1 if game.get("handicap_allowance") is None else game["handicap_allowance"]
     playingHandicap = courseHandicap * handicapAllowance
 
     return round(playingHandicap)
@@ -1,19 +1,201 @@
-from datetime import date, datetime
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from itertools import islice
 import json
 from os import listdir
 from os.path import isfile, join
-import uuid
-from tinydb import TinyDB, Query, where
-import handicapWHS as whs
-import handicapEGA as ega
-from fpdf import FPDF
+from tinydb import TinyDB, where
+from tinydb.table import Document
+from dateIndex import DateIndex, toDatetime
+from lowHandicap import LogIndex
+from records import Game, HandicapLogEntry
+import schema
+from lazyImport import lazyImport
+
+# loaded on first use, so importing the helper stays fast (see benchmark.benchStartup)
+executors = lazyImport("concurrent.futures")
+uuid = lazyImport("uuid")
+whs = lazyImport("handicapWHS")
+ega = lazyImport("handicapEGA")
+fpdf = lazyImport("fpdf")
+scorecards = lazyImport("scorecards")
+projection = lazyImport("projection")
+recalculation = lazyImport("recalculation")
+replayEGA = lazyImport("replayEGA")
+
+
+def isTransactional(storage) -> bool:
+    """
+    True if the storage supports transactions like the TransactionMiddleware, SQLiteStorage and
+    Journal, see storageTransaction. Their modules (sqlite3, mmap) are only loaded by the
+    backends that use them.
+    """
+    return all(callable(getattr(storage, name, None)) for name in ("begin", "commit", "rollback"))
+
+
+@contextmanager
+def storageTransaction(storage, discardCaches):
+    """
+    Groups all changes done to the storage inside the with block into one write, see
+    Helper.transaction. Does nothing if the storage has no transactions.
+
+    Args:
+    storage (Storage): the storage of the tables
+    discardCaches (callable): drops everything cached from the tables, called when the storage
+        discarded the changes
+    """
+    if not isTransactional(storage):
+        yield
+        return
+
+    storage.begin()
+    try:
+        yield
+    except BaseException:
+        storage.rollback()
+        discardCaches()
+        raise
+    try:
+        storage.commit()
+    except RuntimeError:
+        # a nested transaction was rolled back, the cached documents of this one are gone
+        discardCaches()
+        raise
 
 
 class Helper:
-    def __init__(self, games, courses, hcLog):
-        self.games = games
-        self.courses = courses
-        self.hcLog = hcLog
+    def __init__(self, games, courses, hcLog, compact: bool = False, pending=None):
+        """
+        Every table can also be given as a function returning the table, it is called when
+        the table is used for the first time (see fromBackend).
+
+        Args:
+        games (Table): the games table
+        courses (Table): the courses table
+        hcLog (Table): the handicap log table
+        compact (bool): keep the games and hcLog in memory as Game/HandicapLogEntry records
+            instead of dicts. Uses less memory for large histories.
+        pending (Table | None): the rounds posted with queueGame that wait for the
+            nightly revision (see revision.py)
+        """
+        self._tables = {"games": games, "courses": courses, "hcLog": hcLog, "pending": pending}
+        self.compact = compact
+        self._gameIndex = None
+        self._logIndex = None
+        # physical writes done by the last transaction
+        self.lastWrites = 0
+
+    @classmethod
+    def fromBackend(cls, backend, compact: bool = False) -> "Helper":
+        """
+        Creates a Helper on the tables of a backend (see backend.py) with the pending table
+        "pending". The database is opened when the Helper uses a table for the first time.
+        """
+        return cls(
+            lambda: backend.games,
+            lambda: backend.courses,
+            lambda: backend.hcLog,
+            compact,
+            pending=lambda: backend.table("pending"),
+        )
+
+    def _table(self, name: str):
+        table = self._tables[name]
+        if callable(table):
+            table = self._tables[name] = table()
+        return table
+
+    @property
+    def games(self):
+        return self._table("games")
+
+    @property
+    def courses(self):
+        return self._table("courses")
+
+    @property
+    def hcLog(self):
+        return self._table("hcLog")
+
+    @property
+    def pending(self):
+        return self._table("pending")
+
+    @property
+    def gameIndex(self) -> DateIndex:
+        """
+        The games sorted by date. Built with one scan of the games table on first use
+        and kept up to date by addGame. Call reindex if you modify the table directly.
+        """
+        if self._gameIndex is None:
+            self._gameIndex = DateIndex(map(self._gameRecord, self.games.all()))
+        return self._gameIndex
+
+    @property
+    def logIndex(self) -> LogIndex:
+        """
+        The hcLog sorted by date, with the Low Handicap Index (see lowHandicap.py). Built with one
+        scan of the hcLog table on first use and kept up to date by updateHandicapIndex. Call
+        reindex if you modify the table directly.
+        """
+        if self._logIndex is None:
+            self._logIndex = LogIndex(map(self._logRecord, self.hcLog.all()))
+        return self._logIndex
+
+    def _gameRecord(self, doc: dict, docId: int | None = None) -> dict:
+        docId = getattr(doc, "doc_id", docId)
+        return Game(doc, docId) if self.compact else Document(doc, docId)
+
+    def _logRecord(self, doc: dict, docId: int | None = None) -> dict:
+        docId = getattr(doc, "doc_id", docId)
+        return HandicapLogEntry(doc, docId) if self.compact else Document(doc, docId)
+
+    def reindex(self) -> None:
+        """
+        Drops the in memory indexes, so they are rebuilt from the tables on next use.
+        """
+        self._gameIndex = None
+        self._logIndex = None
+
+    def discardCaches(self) -> None:
+        """
+        Drops the query caches of the tables and the indexes after the storage discarded changes.
+        Tables that were not opened yet have nothing cached.
+        """
+        for table in self._tables.values():
+            if table is not None and not callable(table):
+                table.clear_cache()
+        self.reindex()
+
+    @property
+    def transactional(self) -> bool:
+        """
+        True if the db supports transactions, see transaction.
+        """
+        return isTransactional(self.games.storage)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Groups all changes done inside the with block into one write of the database.
+        Only has an effect if the db uses the TransactionMiddleware or the SQLite or journal backend, otherwise every
+        change is written immediately as before. Transactions can be nested, the data
+        is written when the outermost one is left. If an exception is raised nothing is written.
+        If it is caught inside an outer transaction, the outer one discards its changes too and
+        raises a RuntimeError when it is left.
+
+        Usage:
+        with helper.transaction():
+            helper.games.insert(...)
+            helper.hcLog.insert(...)
+        """
+        storage = self.games.storage
+        outermost = self.transactional and not storage.inTransaction
+        before = getattr(storage, "writes", 0)
+        with storageTransaction(storage, self.discardCaches):
+            yield
+        if outermost:
+            self.lastWrites = getattr(storage, "writes", 0) - before
 
     # implements whs 5.4
     def updateHandicapIndex(self, game: dict, gameDate: datetime | str) -> dict:
@@ -29,35 +211,323 @@ class Helper:
         Return:
         dict: The handicaps as a dict
         """
-        gameDate = (
-            gameDate
-            if isinstance(gameDate, (date, datetime))
-            else datetime.fromisoformat(gameDate)
-        )
+        gameDate = toDatetime(gameDate)
 
-        cba = game["cba"]
-        previousHandicap = self.getHCLog(m=0)
-        course = self.getCourses(game["courseID"])[0]
+        cba = int(game["cba"])
+        previousHandicap = self.get_last_hci(False)
+        course = self.getCourses([game])[0]
 
-        latestGames = self.getLastGames()
-        latestEntry = max(latestGames, key=lambda x: x["date"])
-        hcLog = self.getHCLog(startDate=latestEntry["date"])
+        whsHC = self.calculateWHS()
+        egaHC = ega.calculateNewHandicap(game, cba, previousHandicap, course)
 
-        lowHandicap = min(hcLog, key=lambda x: x["date"])
+        return self._logHandicap(whsHC, egaHC, gameDate)
 
-        whsHC = whs.handicap(latestGames, lowHandicap["whs"])
-        egaHC = ega.calculateNewHandicap(game, cba, previousHandicap, course)
+    def calculateWHS(self) -> float:
+        """
+        Calculates the WHS handicap index from the last 20 games and the Low Handicap Index
+        of the year before the newest game. Nothing is written.
+
+        Returns:
+        float: the handicap index
+        """
+        latestGames = self.getLastGames()
+        lowHandicap = self.logIndex.low(latestGames[0]["date"])
 
-        data = {"whs": whsHC, "ega": egaHC, "date": gameDate}
+        return whs.handicap(latestGames, lowHandicap)
+
+    def _logHandicap(self, whsHC: float, egaHC: float, gameDate: datetime) -> dict:
+        # inserts the handicaps into the hcLog, replacing an entry of the same day
+        data = {"whs": whsHC, "ega": egaHC, "date": gameDate.isoformat()}
 
         # remove current HC if it is from the same day
-        HC = Query()
-        self.hcLog.remove(
-            HC.date.test(lambda d: datetime.fromisoformat(d).date() == gameDate)
+        dayStart = datetime.combine(gameDate.date(), datetime.min.time())
+        sameDay = self.logIndex.between(
+            dayStart, dayStart + timedelta(days=1), inclusiveStart=True
         )
+        sameDay = [doc for doc in sameDay if toDatetime(doc["date"]).date() == gameDate.date()]
+
+        # every few entries store the state the handicaps can be recalculated from, see recalculation.py
+        replaced = {doc.doc_id for doc in sameDay}
+        recent = self.logIndex.newest(0, recalculation.CHECKPOINT_INTERVAL + len(replaced))
+        if recalculation.checkpointDue([doc for doc in recent if doc.doc_id not in replaced]):
+            data["checkpoint"] = recalculation.checkpoint(self.getLastGames(0, 18))
+        with self.transaction():
+            if sameDay:
+                self.hcLog.remove(doc_ids=[doc.doc_id for doc in sameDay])
+            for doc in sameDay:
+                self.logIndex.remove(doc.doc_id)
+
+            docId = self.hcLog.insert(data)
+            self.logIndex.insert(self._logRecord(data, docId))
 
         return data
 
+    def projectionState(self, gameDate: datetime | str | None = None) -> dict:
+        """
+        Reads what a projection of the next round needs (see projection.py): the 19 newest games,
+        the current handicaps and the Low Handicap Index. Can be reused for any number of
+        projections until the next game is added.
+
+        Args:
+        gameDate (datetime | str | None): the date of the next round, by default now
+
+        Returns:
+        dict: the state for projection.project
+        """
+        gameDate = datetime.now() if gameDate is None else toDatetime(gameDate)
+        return projection.prepare(
+            self.getLastGames(0, 18),
+            self.logIndex.low(gameDate),
+            self.get_last_hci(True),
+            self.get_last_hci(False),
+        )
+
+    def projectRound(
+        self,
+        courseID: str,
+        nineHole: bool,
+        pcc: float = 0,
+        cba: float = 0,
+        gameDate: datetime | str | None = None,
+    ) -> dict:
+        """
+        Projects the WHS index and the EGA handicap after the next round for every gross score on
+        a course, e.g. what the player needs to shoot to cut their handicap. Nothing is written.
+        The arguments are the same as for addGame.
+
+        Returns:
+        dict: see projection.project, "thresholds" holds the highest score for every index
+        """
+        course = self.getCourses([{"courseID": courseID}])
+        if course == []:
+            raise KeyError(
+                f"Could not find the course {courseID}. Check for typos or create it."
+            )
+        return projection.project(self.projectionState(gameDate), course[0], nineHole, pcc, int(cba))
+
+    def replayEGA(self, handicap: float | None = None) -> list[dict]:
+        """
+        Recalculates the EGA handicap over the whole history of games, e.g. after a course rating
+        was corrected. The games and courses are read once, nothing is written.
+
+        Args:
+        handicap (float | None): the handicap before the first game. None if the player had no handicap
+
+        Returns:
+        list[dict]: {"game_id", "date", "ega"} the handicap after every game, oldest first
+        """
+        return replayEGA.replayHandicap(self.gameIndex.newest()[::-1], self.courses.all(), handicap)
+
+    def recalculate(self, fromDate: datetime | str) -> dict:
+        """
+        Recalculates the handicaps of all games from a date on, e.g. after a game was corrected.
+        Starts at the newest checkpoint before the day (see recalculation.py) and writes the
+        games and hcLog entries that changed in one transaction. The hcLog gets one entry per day
+        with games from the checkpoint on, like from the nightly revision.
+
+        Args:
+        fromDate (datetime | str): the date of the first changed game
+
+        Returns:
+        dict: {"checkpoint": the date of the checkpoint or None if the whole history was replayed,
+            "games": the number of replayed games, "updatedGames", "removedEntries", "insertedEntries"}
+        """
+        fromDate = toDatetime(fromDate)
+        dayStart = datetime.combine(fromDate.date(), datetime.min.time())
+        gameIndex, logIndex = self.gameIndex, self.logIndex
+
+        # the newest checkpoint before the day that still matches the games before it
+        start = None
+        for entry in logIndex.walkBack(dayStart, inclusive=False):
+            if "checkpoint" not in entry:
+                continue
+            entryDate = toDatetime(entry["date"])
+            before = list(islice(gameIndex.walkBack(entryDate), recalculation.WINDOW - 1))
+            if recalculation.matches(entry, before):
+                start = entry
+                break
+
+        if start is not None:
+            boundary = toDatetime(start["date"])
+            # the games of the window with the reductions they had at the checkpoint
+            window = []
+            for doc, reduction in zip(before, start["checkpoint"]["reductions"]):
+                game = dict(doc, shots=list(doc["shots"]), exceptional_reduction=reduction)
+                window.append((doc.doc_id, game))
+            window.reverse()
+            handicapIndex, egaHandicap = start["whs"], start["ega"]
+        else:
+            # from the first game on, the entries before it (e.g. an initial handicap) stay
+            first = next(iter(gameIndex.newest(len(gameIndex) - 1)), None)
+            if first is not None:
+                dayStart = min(dayStart, datetime.combine(toDatetime(first["date"]).date(), datetime.min.time()))
+            boundary = dayStart - timedelta(microseconds=1)
+            window = []
+            previous = logIndex.before(boundary)
+            handicapIndex = None if previous is None else previous["whs"]
+            egaHandicap = None if previous is None else previous["ega"]
+
+        rounds = [
+            (doc.doc_id, dict(doc, shots=list(doc["shots"])))
+            for doc in gameIndex.between(boundary, datetime.max, inclusiveStart=False)[::-1]
+        ]
+        courses = {course["courseID"]: course for course in self.getCourses([game for _, game in rounds])}
+
+        # the entries of the year before the first replayed day and the one in effect then
+        log = []
+        for entry in logIndex.walkBack(boundary):
+            log.append(entry)
+            if toDatetime(entry["date"]) <= boundary - timedelta(days=365):
+                break
+        log.reverse()
+
+        entries = recalculation.replay(
+            [game for _, game in window], [game for _, game in rounds], courses, log, handicapIndex, egaHandicap
+        )
+
+        report = {
+            "checkpoint": None if start is None else start["date"],
+            "games": len(rounds),
+            "updatedGames": 0,
+            "removedEntries": 0,
+            "insertedEntries": 0,
+        }
+        with self.transaction():
+            # one update for all changed games, the changes are found by game_id
+            changes = {}
+            for docId, game in window + rounds:
+                doc = gameIndex.get(docId)
+                # the shots are replayed on a copy, the stored ones stay as they are
+                fields = {
+                    key: game[key]
+                    for key in ("handicap_dif", "exceptional_reduction", "reduction_event")
+                    if key not in doc or game[key] != doc[key]
+                }
+                if fields:
+                    changes[docId] = fields
+                    for key, value in fields.items():
+                        doc[key] = value
+            if changes:
+                byGameID = {gameIndex.get(docId)["game_id"]: fields for docId, fields in changes.items()}
+                self.games.update(lambda doc: doc.update(byGameID[doc["game_id"]]), doc_ids=list(changes))
+            report["updatedGames"] = len(changes)
+
+            # only the entries that changed are rewritten
+            stale = {doc["date"]: doc for doc in logIndex.between(boundary, datetime.max, inclusiveStart=False)}
+            changed = []
+            for entry in entries:
+                doc = stale.get(entry["date"])
+                if doc is not None and doc == entry:
+                    del stale[entry["date"]]
+                else:
+                    changed.append(entry)
+            if stale:
+                self.hcLog.remove(doc_ids=[doc.doc_id for doc in stale.values()])
+                for doc in stale.values():
+                    logIndex.remove(doc.doc_id)
+            if changed:
+                for entry, docId in zip(changed, self.hcLog.insert_multiple(changed)):
+                    logIndex.insert(self._logRecord(entry, docId))
+            report["removedEntries"] = len(stale)
+            report["insertedEntries"] = len(changed)
+        return report
+
+    def correctGame(
+        self,
+        gameID: str,
+        courseID: str | None = None,
+        shots: list[int] | None = None,
+        nineHole: bool | None = None,
+        pcc: float | None = None,
+        cba: float | None = None,
+        gameDate: datetime | str | None = None,
+    ) -> dict:
+        """
+        Corrects a game that was already added and recalculates the handicaps from the game on.
+        Only the given values are changed, the arguments are the same as for addGame.
+
+        Returns:
+        dict: the report of recalculate
+        """
+        doc = self._findGame(gameID)
+        changes = {
+            key: value
+            for key, value in (("shots", shots), ("is9Hole", nineHole), ("pcc", pcc), ("cba", cba))
+            if value is not None
+        }
+        if courseID is not None:
+            if self.getCourses([{"courseID": courseID}]) == []:
+                raise KeyError(
+                    f"Could not find the course {courseID}. Check for typos or create it."
+                )
+            changes["courseID"] = courseID
+        if gameDate is not None:
+            changes["date"] = gameDate.isoformat() if isinstance(gameDate, (date, datetime)) else gameDate
+        if not (-1 <= changes.get("pcc", 0) <= 3):
+            raise ValueError(
+                f"PCC can only be between -1 and +3. Given value was { pcc }"
+            )
+        if not (-2 <= changes.get("cba", 0) <= 1):
+            raise ValueError(
+                f"CBA can only be between -2 and +1. Given value was { cba }"
+            )
+
+        fromDate = toDatetime(doc["date"])
+        with self.transaction():
+            self.games.update(changes, doc_ids=[doc.doc_id])
+            self.gameIndex.remove(doc.doc_id)
+            doc = self.games.get(doc_id=doc.doc_id)
+            self.gameIndex.insert(self._gameRecord(doc))
+            return self.recalculate(min(fromDate, toDatetime(doc["date"])))
+
+    def removeGame(self, gameID: str) -> dict:
+        """
+        Removes a game and recalculates the handicaps from its date on.
+
+        Returns:
+        dict: the report of recalculate
+        """
+        doc = self._findGame(gameID)
+        with self.transaction():
+            self.games.remove(doc_ids=[doc.doc_id])
+            self.gameIndex.remove(doc.doc_id)
+            return self.recalculate(doc["date"])
+
+    def correctCourse(
+        self, courseID: str, courseRating: float | None = None, slopeRating: int | None = None
+    ) -> dict | None:
+        """
+        Fixes the ratings of a course and recalculates the handicaps from the first game on it.
+
+        Returns:
+        dict | None: the report of recalculate, None if no game was played on the course
+        """
+        if slopeRating is not None and not (55 <= slopeRating <= 155):
+            raise ValueError(
+                f"Invalid parameter: {slopeRating}. Must be between 55 and 155."
+            )
+        changes = {
+            key: value
+            for key, value in (("course_rating", courseRating), ("slope_rating", slopeRating))
+            if value is not None
+        }
+        with self.transaction():
+            if not self.courses.update(changes, where("courseID") == courseID):
+                raise KeyError(
+                    f"Could not find the course {courseID}. Check for typos or create it."
+                )
+            scorecards.invalidateScorecards(courseID)
+            played = self.games.search(where("courseID") == courseID)
+            if not played:
+                return None
+            return self.recalculate(min(toDatetime(doc["date"]) for doc in played))
+
+    def _findGame(self, gameID: str) -> dict:
+        found = self.games.search(where("game_id") == gameID)
+        if not found:
+            raise KeyError(f"Could not find the game {gameID}.")
+        return found[0]
+
     def insertFromDir(self, table: TinyDB, path: str) -> None:
         """
         Inserts all the files in the given directory into the given db/table
@@ -68,38 +538,110 @@ class Helper:
         path = path if path[-1] == "/" else path + "/"
         files = [file for file in listdir(path) if isfile(join(path, file))]
 
+        data = []
         for file in files:
-            json_file = open(path + file, "r")
-            data = json.load(json_file)
-            table.insert(data)
+            with open(path + file, "r") as json_file:
+                data.append(json.load(json_file))
+        table.insert_multiple(data)
+        self.reindex()
+
+    def importFromDir(self, table: TinyDB, path: str, workers: int | None = None) -> dict:
+        """
+        Bulk import of a directory of game or course files (e.g. a club's archive).
+        The files are parsed and validated in parallel and all valid documents are
+        inserted with one write. Invalid files are reported and skipped.
+        For games the handicaps are recalculated from the oldest imported game on like after a
+        correction (see recalculate): the differentials of the files are calculated again day by day
+        with the index in effect at the start of the day and the hcLog gets an entry for every day.
+
+        Args:
+        table (TinyDB): the games or courses table
+        path (str): the path to the directory
+        workers (int | None): number of threads used for parsing. By default chosen by python
+
+        Returns:
+        dict: {"inserted": number of inserted documents, "errors": {file: error message}}
+        """
+        if table is self.games:
+            validate = schema.validateGame
+        elif table is self.courses:
+            validate = schema.validateCourse
+        else:
+            raise ValueError("Bulk import is only supported for the games and courses table.")
+
+        def load(file: str) -> dict:
+            with open(join(path, file), "r") as json_file:
+                doc = json.load(json_file)
+            validate(doc)
+            return doc
+
+        files = sorted(file for file in listdir(path) if isfile(join(path, file)))
+        docs = []
+        errors = {}
+        with executors.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {file: executor.submit(load, file) for file in files}
+            for file, future in futures.items():
+                try:
+                    docs.append((file, future.result()))
+                except (OSError, ValueError) as e:
+                    # json.JSONDecodeError is a ValueError
+                    errors[file] = str(e)
+
+        if table is self.games:
+            courses = {course["courseID"]: course for course in self.courses.all()}
+            valid = []
+            for file, doc in docs:
+                if doc["courseID"] not in courses:
+                    errors[file] = f"Could not find the course {doc["courseID"]}."
+                else:
+                    valid.append((file, doc))
+            docs = valid
+
+        docs = [doc for _, doc in docs]
+        if not docs:
+            return {"inserted": 0, "errors": errors}
+
+        with self.transaction():
+            table.insert_multiple(docs)
+            self.reindex()
+
+            # replays the imported days, so every game uses the index of its day like with addGame
+            if table is self.games:
+                self.recalculate(min(toDatetime(doc["date"]) for doc in docs))
+
+        return {"inserted": len(docs), "errors": errors}
 
     def addCourse(
-        self, courseID: str, courseRating: int, slopeRating: int, par: list[int]
+        self,
+        courseID: str,
+        courseRating: float,
+        slopeRating: int,
+        par: list[int],
+        strokeIndex: list[int],
     ) -> None:
         """
-        Adds a new game to tinyDB.
+        Adds a new course (one tee) to the courses table.
 
         Args:
         courseID (str): e.g. the name of the course
-        courseRating (int): The difficulty rating of the course usually between 67 and 77. Should be the sum of the par's if I understand it correctly
+        courseRating (float): The difficulty rating of the course for a scratch player, usually between 67 and 77
         slopeRating (int): The difficulty rating of the course, between 55 and 155 with the average being 113
         par (list[int]): The shots that that are expected for each hole
-        table (TinyDB): By default is set to courses table but can be changed by passing the reference. This should not be necessary
+        strokeIndex (list[int]): The handicap stroke index of each hole, 1 is the hardest hole
 
         Returns:
         None
         """
-
-        if not (55 <= slopeRating <= 155):
-            raise ValueError(
-                f"Invalid parameter: {slopeRating}. Must be between 55 and 155."
-            )
         data = {
-            "course_id": courseID,
+            "courseID": courseID,
             "course_rating": courseRating,
             "slope_rating": slopeRating,
             "par": par,
+            "handicap_stroke_index": strokeIndex,
         }
+        schema.validateCourse(data)
+        if self.getCourses([{"courseID": courseID}]) != []:
+            raise ValueError(f"The course {courseID} already exists.")
         self.courses.insert(data)
 
     def addGame(
@@ -124,55 +666,104 @@ class Helper:
         table (TinyDB): By default is set to courses table but can be changed by passing the reference. This should not be necessary
         courseTable (TinyDB): as this function does a query to tiny db, this allows you to change the default course table
 
+        The handicaps are calculated immediately, use queueGame to leave that to the nightly revision.
+
         Returns: str: the uuid in hex format
         """
-        course = self.getCourses([game], self.courses)
+        game, course = self._newGame(courseID, shots, nineHole, pcc, cba, gameDate)
+
+        handicapIndex = self.get_last_hci(True)
+
+        # all changes of one game are written at once
+        with self.transaction():
+            self._insertGame(game, course, 54.0 if handicapIndex is None else handicapIndex)
+
+            # insert into hcLog
+            self.updateHandicapIndex(game, gameDate)
+
+        return game["game_id"]
+
+    def queueGame(
+        self,
+        courseID: str,
+        shots: list[int],
+        nineHole: bool,
+        pcc: float = 0,
+        cba: float = 0,
+        gameDate: datetime | str | None = None,
+    ) -> str:
+        """
+        Posts a game without calculating the handicaps. The game is stored in the pending table
+        and added with the handicaps calculated by the nightly revision (see revision.py).
+        The arguments are the same as for addGame.
+
+        Returns: str: the uuid in hex format
+        """
+        if self.pending is None:
+            raise RuntimeError("The helper has no pending table to queue games in.")
+        game, _ = self._newGame(
+            courseID, shots, nineHole, pcc, cba, datetime.now() if gameDate is None else gameDate
+        )
+        self.pending.insert(game)
+        return game["game_id"]
+
+    def _newGame(
+        self,
+        courseID: str,
+        shots: list[int],
+        nineHole: bool,
+        pcc: float,
+        cba: float,
+        gameDate: datetime | str,
+    ) -> tuple[dict, dict]:
+        # validates the arguments of addGame and returns the game and its course
+        course = self.getCourses([{"courseID": courseID}])
         if course == []:
             raise KeyError(
                 f"Could not find the course {courseID}. Check for typos or create it."
             )
 
-        if not (-1 >= pcc <= 3):
+        if not (-1 <= pcc <= 3):
             raise ValueError(
                 f"PCC can only be between -1 and +3. Given value was { pcc }"
             )
-        if not (-2 >= cba <= 1):
+        if not (-2 <= cba <= 1):
             raise ValueError(
                 f"CBA can only be between -2 and +1. Given value was { cba }"
             )
 
-        id = uuid.uuid4().hex
         game = {
-            "id": id,
+            "game_id": uuid.uuid4().hex,
             "courseID": courseID,
             "date": (
-                date.isoformat() if isinstance(gameDate, (date, datetime)) else gameDate
+                gameDate.isoformat()
+                if isinstance(gameDate, (date, datetime))
+                else gameDate
             ),
             "shots": shots,
             "pcc": pcc,
             "cba": cba,
-            "is9hole": nineHole,
+            "is9Hole": nineHole,
         }
+        return game, course[0]
 
-        game = whs.handicapDifferential(game, course, self.getHCLog(m=0))
-
-        if game["exceptional_reduction"] != 0.0:
-            Game = Query()
-            ids = [game["game_id"] for game in self.getLastGames(0, 18)]
-            self.games.update(
-                lambda doc: {  # for each game tinyDB iterates over it hands the current doc to the lambda function
-                    "exceptional_reduction": doc.get("exceptional_reduction", 0)
-                    + game["exceptional_reduction"]
-                },
-                Game.game_id.one_of(ids),
-            )
+    def _insertGame(self, game: dict, course: dict, handicapIndex: float) -> int:
+        """
+        Calculates the handicap differential of the game with the given handicap index
+        and inserts the game. An exceptional score is stored with the game as its reduction_event,
+        the previous games are not changed (see handicapWHS.reducedDifferentials).
 
-        self.games.insert(game)
+        Returns:
+        int: the doc_id of the game
+        """
+        game = whs.handicapDifferential(game, course, handicapIndex)
 
-        # insert into hcLog
-        self.updateHandicapIndex(game, gameDate)
+        # built before the insert, otherwise the new game would be indexed twice
+        gameIndex = self.gameIndex
 
-        return id
+        docId = self.games.insert(game)
+        gameIndex.insert(self._gameRecord(game, docId))
+        return docId
 
     def getLastGames(self, n: int = 0, m: int = 19) -> list[dict]:
         """
@@ -186,21 +777,7 @@ class Helper:
         Returns:
         List[dict]: A list of games between the indices.
         """
-
-        games = self.games.all()
-
-        if not games:
-            return []
-
-        sorted_games = sorted(
-            games, key=lambda x: datetime.fromisoformat(x["date"]), reverse=True
-        )
-
-        # Validate and adjust indices
-        n = max(0, n)  # Ensure n is non-negative
-        m = min(len(sorted_games) - 1, max(n, m))  # Ensure m is within bounds and >= n
-
-        return sorted_games[n : m + 1]
+        return self.gameIndex.newest(n, m)
 
     def getHCLog(
         self, n: int = 0, m: int = 365, startDate: datetime = None
@@ -222,24 +799,43 @@ class Helper:
         if startDate is None:
             startDate = datetime.now()
 
-        log = self.hcLog.all()
-        log.sort(key=lambda doc: datetime.fromisoformat(doc["date"]), reverse=True)
-
-        data = [
-            doc
-            for doc in log
-            if n <= (startDate - datetime.fromisoformat(doc["date"])).days < m
-        ]
+        # n <= (startDate - date).days < m  <=>  startDate - m days < date <= startDate - n days
+        windowStart = startDate - timedelta(days=m)
+        data = self.logIndex.between(
+            windowStart, startDate - timedelta(days=n), inclusiveStart=False
+        )
 
-        if len(data) < len(log):
-            data.append(log[len(data) + n])
+        # the entry that was in effect when the timeframe started
+        previous = self.logIndex.before(windowStart)
+        if previous is not None:
+            data.append(previous)
 
         return data
 
-    def get_last_hci(self, is_whs: bool) -> float:
-        log = self.hcLog.all()
-        log.sort(key=lambda doc: datetime.fromisoformat(doc["date"]), reverse=True)
-        return log[0]["whs" if is_whs else "ega"]
+    def get_last_hci(self, is_whs: bool) -> float | None:
+        """
+        Returns the newest handicap index or None if there is no log entry yet
+        """
+        latest = self.logIndex.latest()
+        if latest is None:
+            return None
+        return latest["whs" if is_whs else "ega"]
+
+    def get_hci_on(self, is_whs: bool, onDate: datetime | str) -> float | None:
+        """
+        Returns the handicap index that was in effect on the given date
+
+        Args:
+        is_whs (bool): True for the WHS index, False for the EGA handicap
+        onDate (datetime | str): the date as datetime or iso-string
+
+        Returns:
+        float | None: the handicap or None if there was no log entry before that date
+        """
+        entry = self.logIndex.before(toDatetime(onDate))
+        if entry is None:
+            return None
+        return entry["whs" if is_whs else "ega"]
 
     def getCourses(self, games: list[dict]) -> list[dict]:
         """
@@ -255,14 +851,9 @@ class Helper:
         unique_courses = {
             game["courseID"] for game in games
         }  # Use a set for unique course IDs
-        query = Query()
-
-        result = []
-        for course_id in unique_courses:
-            data = self.courses.search(query.courseID == course_id)
-            result.extend(data)  # Extend the result list with the search results
 
-        return result
+        # one query for all courses instead of one per course
+        return self.courses.search(where("courseID").one_of(list(unique_courses)))
 
     def export_scorecard(
         self,
@@ -289,6 +880,35 @@ class Helper:
             AttributeError: Raised when is_whs is missing when not using last values.
             ValueError: Raised when trying to access last values, but they are nonexistent.
         """
+        course_copy = self.scorecard_course(
+            course, is_whs, cr_override, sr_override, hcp_override, use_last_values
+        )
+        hci = self.get_last_hci(course_copy["is_whs_scorecard"])
+
+        data = scorecards.prepare_table_data(course_copy, hci)
+        # create pdf page
+        pdf = fpdf.FPDF()
+        scorecards.render_scorecard_page(pdf, course_copy, hci, data)
+        pdf.output(filepath)
+
+    def scorecard_course(
+        self,
+        course: dict,
+        is_whs: bool | None = None,
+        cr_override: float | None = None,
+        sr_override: int | None = None,
+        hcp_override: list[int] | None = None,
+        use_last_values: bool | None = None,
+        write: bool = True,
+    ) -> dict:
+        """Returns a copy of the course with the values printed on the scorecard (see export_scorecard)
+
+        Args:
+            write (bool, optional): Store the overrides in the course as last values. Defaults to True.
+
+        Returns:
+            dict: the course with the overrides applied and is_whs_scorecard set
+        """
         if not use_last_values:
             if is_whs is None:
                 raise AttributeError("Attribute is_whs missing.")
@@ -318,15 +938,10 @@ class Helper:
         else:
 
             course_copy["is_whs_scorecard"] = is_whs
-            self.courses.update(
-                {"is_whs_scorecard": is_whs}, where("courseID") == course["courseID"]
-            )
+            overrides = {"is_whs_scorecard": is_whs}
             if cr_override is not None:
                 course_copy["course_rating"] = cr_override
-                self.courses.update(
-                    {"course_rating_override": cr_override},
-                    where("courseID") == course["courseID"],
-                )
+                overrides["course_rating_override"] = cr_override
 
             if sr_override is not None:
                 if not (55 <= sr_override <= 155):
@@ -334,112 +949,22 @@ class Helper:
                         f"Invalid parameter: {sr_override}. Must be between 55 and 155."
                     )
                 course_copy["slope_rating"] = sr_override
-                self.courses.update(
-                    {"slope_rating_override": sr_override},
-                    where("courseID") == course["courseID"],
-                )
+                overrides["slope_rating_override"] = sr_override
 
             if hcp_override is not None:
                 if not set(hcp_override) == set(range(0,19)):
                     raise ValueError("Handicap stroke index override is incorrect. Make sure you are only using numbers from 1 to 18.")
                 course_copy["handicap_stroke_index"] = hcp_override
-                self.courses.update(
-                    {"handicap_stroke_index_override": hcp_override},
-                    where("courseID") == course["courseID"],
-                )
+                overrides["handicap_stroke_index_override"] = hcp_override
 
-        hci = self.get_last_hci(course_copy["is_whs_scorecard"])
+            if write:
+                # one update instead of one per override
+                with self.transaction():
+                    self.courses.update(overrides, where("courseID") == course["courseID"])
+                if hcp_override is not None:
+                    ega.invalidateCourse(course["courseID"])
+                if len(overrides) > 1:
+                    scorecards.invalidateScorecards(course["courseID"])
 
-        data = prepare_table_data(course_copy, hci)
-        # create pdf page
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Helvetica", style="B", size=22)
-        pdf.cell(text=f"Kurs: {course_copy["courseID"]}")
-        pdf.ln(h=14)
-        pdf.set_font("Helvetica", size=14)
-
-        today = datetime.now().strftime("%x")  # uses local date format
-        text = f"__**CR:** {course_copy["course_rating"]}  **SR:** {course_copy["slope_rating"]}  **PCC/CBA:** ____  **Datum:** {today}  **HCI:** {hci}  **Name:**__"
-        pdf.multi_cell(
-            w=pdf.get_string_width(text, markdown=True) + 2,
-            text=text,
-            markdown=True,
-        )
-        x = pdf.get_x()
-        y = pdf.get_y()
-        pdf.line(x, y, pdf.w - pdf.r_margin, y)
-        pdf.ln()
-
-        with pdf.table(col_widths=(3, 3, 3, 3, 5)) as table:
-            row = table.row()
-            for cell in ("Loch", "Par", "HCP", "Vorgabe", "Schläge"):
-                row.cell(cell)
-            for data_row in data:
-                row = table.row()
-                for cell in data_row:
-                    row.cell(cell)
-
-        pdf.output(filepath)
-
-
-def prepare_table_data(
-    course: dict, hci: float
-) -> list[tuple[str, str, str, str, str]]:
-    """Generates a tuple of tuples representing rows in the scorecard table
-
-    Args:
-        course (dict): The course played on
-        hci (float): The handicap of the player
-        pcc (int): PCC/CBA of the game
-
-    Returns:
-        tuple[tuple[str, str, str, str, str], ...]:
-        A tuple of tuples representing the rows of the table
-    """
-    par = course["par"].copy()
-    hc_strokes = ega.playingHandicap(
-        False, hci, course["course_rating"], course["slope_rating"], sum(course["par"])
-    )
-    allocation_marker = "/"
-    if hc_strokes < 0:
-        allocation_marker = "="
-    strokes = ega.spreadPlayingHC(course, hc_strokes, False)
-    stroke_allocation = list(map(abs, [x - y for x, y in zip(strokes, par)]))
-    # Hole#, Par, HCP, hcp-strokes, shots taken (empty)
-    rows = []
-    for i in range(0, 9):
-        row = tuple(
-            map(
-                str,
-                (
-                    i + 1,
-                    par[i],
-                    course["handicap_stroke_index"][i],
-                    allocation_marker * stroke_allocation[i],
-                    "",
-                ),
-            )
-        )
-        rows.append(row)
-    rows.append(("OUT", str(sum(par[0:9])), "", "", ""))
-
-    if len(course["par"]) == 18:
-        for i in range(9, 18):
-            row = tuple(
-                map(
-                    str,
-                    (
-                        i + 1,
-                        par[i],
-                        course["handicap_stroke_index"][i],
-                        allocation_marker * stroke_allocation[i],
-                        "",
-                    ),
-                )
-            )
-            rows.append(row)
-        rows.append(("IN", str(sum(par[9:18])), "", "", ""))
-    rows.append(("GESAMT", str(sum(par)), "", str(hc_strokes), ""))
+        return course_copy
 
-    return rows
@@ -0,0 +1,296 @@
+"""
+Opt-in instrumentation of the hot paths, to find out whether a slow score post is spent in
+the db (table scans, reading documents, rewriting the file) or in the handicap math.
+
+Disabled it costs nothing: enable replaces the methods of the Helper, the entry points of
+handicapWHS/handicapEGA and the read and write paths of the backends with counting wrappers,
+disable puts the originals back.
+
+Recorded are the number of calls and the wall time of every instrumented function, and per
+logical operation (the outermost instrumented Helper call, e.g. addGame, or revision) the number of table
+scans, documents read and bytes written:
+- a table scan reads every document of a table (a tinyDB read, a query the SQLite or journal
+  backend can not answer with an index, all())
+- documents read counts the documents decoded from the storage
+- bytes written is the size of the json file (tinyDB), the appended lines (journal) or the
+  documents handed to sqlite
+
+Usage:
+    instrumentation.enable()
+    helper.addGame(...)
+    instrumentation.dump()
+
+    with instrumentation.profiled("addGame.prof") as result:
+        helper.addGame(...)
+    print(result["stats"])
+"""
+
+from contextlib import contextmanager
+import cProfile
+from functools import wraps
+import io
+import json
+import os
+import pstats
+import sys
+import time
+
+import backend
+import handicapEGA
+import handicapWHS
+import helper
+import journal
+import revision
+import storage
+from tinydb.table import Table
+
+HELPER_METHODS = (
+    "addGame",
+    "queueGame",
+    "updateHandicapIndex",
+    "calculateWHS",
+    "replayEGA",
+    "recalculate",
+    "correctGame",
+    "removeGame",
+    "correctCourse",
+    "importFromDir",
+    "getLastGames",
+    "getHCLog",
+    "get_last_hci",
+    "get_hci_on",
+    "getCourses",
+    "export_scorecard",
+    "scorecard_course",
+)
+WHS_FUNCTIONS = ("handicap", "capIncrease", "handicapDifferential", "adjustGrossScore", "calcPlayingHandicap")
+EGA_FUNCTIONS = ("calculateNewHandicap", "playingHandicap", "spreadPlayingHC", "calculateAdjustment", "convertToStableford")
+REVISION_FUNCTIONS = ("revise", "reviseDay")
+
+# the originals of the replaced attributes: (owner, name) -> original
+_originals: dict[tuple, object] = {}
+# wall time and calls by function name
+_calls: dict[str, list] = {}
+# scans, documents read and bytes written by logical operation
+_operations: dict[str, dict] = {}
+# the counters of the running operation, the instrumented calls inside it add to them
+_current: dict | None = None
+
+
+def isEnabled() -> bool:
+    return bool(_originals)
+
+
+def reset() -> None:
+    """
+    Clears the recorded stats.
+    """
+    _calls.clear()
+    _operations.clear()
+
+
+def enable() -> None:
+    """
+    Instruments the helper, the handicap modules and the backends. Calling it again does nothing.
+    """
+    if isEnabled():
+        return
+    for name in HELPER_METHODS:
+        _replace(helper.Helper, name, _timed(f"Helper.{name}", getattr(helper.Helper, name), operation=True))
+    for module, names in ((handicapWHS, WHS_FUNCTIONS), (handicapEGA, EGA_FUNCTIONS)):
+        for name in names:
+            _replace(module, name, _timed(f"{module.__name__}.{name}", getattr(module, name)))
+    for name in REVISION_FUNCTIONS:
+        _replace(revision, name, _timed(f"revision.{name}", getattr(revision, name), operation=True))
+
+    _replace(Table, "_read_table", _tinyDBRead(Table._read_table))
+    _replace(storage.AtomicJSONStorage, "write", _jsonWrite(storage.AtomicJSONStorage.write))
+    _replace(storage.SQLiteStorage, "writing", _sqliteWriting(storage.SQLiteStorage.writing))
+    _replace(backend.SQLiteTable, "_find", _scanWithoutCondition(backend.SQLiteTable._find))
+    _replace(backend.SQLiteTable, "_documents", _documents(backend.SQLiteTable._documents))
+    _replace(journal.JournalTable, "_find", _scanWithoutCondition(journal.JournalTable._find))
+    _replace(journal.JournalTable, "_candidates", _journalCandidates(journal.JournalTable._candidates))
+    _replace(journal.JournalTable, "_documents", _documents(journal.JournalTable._documents))
+    _replace(journal.Journal, "commit", _journalCommit(journal.Journal.commit))
+
+
+def disable() -> None:
+    """
+    Puts the original functions back. The recorded stats are kept until reset.
+    """
+    global _current
+    for (owner, name), original in _originals.items():
+        setattr(owner, name, original)
+    _originals.clear()
+    _current = None
+
+
+def snapshot() -> dict:
+    """
+    Returns:
+    dict: {"calls": {function: {"count", "total_ms", "mean_ms"}},
+        "operations": {operation: {"count", "scans", "documents", "bytes"}}}
+    """
+    calls = {
+        name: {"count": count, "total_ms": seconds * 1e3, "mean_ms": seconds * 1e3 / count}
+        for name, (count, seconds) in sorted(_calls.items(), key=lambda item: -item[1][1])
+    }
+    return {"calls": calls, "operations": {name: dict(counters) for name, counters in sorted(_operations.items())}}
+
+
+def dump(file=None) -> None:
+    """
+    Writes the snapshot as json to the file, stderr by default.
+    """
+    json.dump(snapshot(), sys.stderr if file is None else file, indent=2)
+    (sys.stderr if file is None else file).write("\n")
+
+
+@contextmanager
+def profiled(path: str | None = None, limit: int = 30):
+    """
+    Profiles the with block with cProfile, e.g. a single request.
+
+    Args:
+    path (str | None): also writes the raw stats to this file (for pstats or snakeviz)
+    limit (int): number of functions in the report
+
+    Yields:
+    dict: gets "stats", the functions with the highest cumulative time, after the block
+    """
+    result = {}
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield result
+    finally:
+        profile.disable()
+        if path is not None:
+            profile.dump_stats(path)
+        report = io.StringIO()
+        pstats.Stats(profile, stream=report).sort_stats("cumulative").print_stats(limit)
+        result["stats"] = report.getvalue()
+
+
+def _replace(owner, name: str, wrapper) -> None:
+    _originals[(owner, name)] = getattr(owner, name)
+    setattr(owner, name, wrapper)
+
+
+def _timed(name: str, func, operation: bool = False):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        global _current
+        outermost = operation and _current is None
+        if outermost:
+            _current = counters = {"count": 1, "scans": 0, "documents": 0, "bytes": 0}
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats = _calls.setdefault(name, [0, 0.0])
+            stats[0] += 1
+            stats[1] += time.perf_counter() - start
+            if outermost:
+                _current = None
+                total = _operations.setdefault(name, {"count": 0, "scans": 0, "documents": 0, "bytes": 0})
+                for key, value in counters.items():
+                    total[key] += value
+
+    return wrapper
+
+
+def _count(scans: int = 0, documents: int = 0, written: int = 0) -> None:
+    if _current is not None:
+        _current["scans"] += scans
+        _current["documents"] += documents
+        _current["bytes"] += written
+
+
+def _tinyDBRead(func):
+    # every read of a tinyDB table reads the whole table
+    @wraps(func)
+    def wrapper(self):
+        table = func(self)
+        _count(scans=1, documents=len(table))
+        return table
+
+    return wrapper
+
+
+def _jsonWrite(func):
+    @wraps(func)
+    def wrapper(self, data):
+        func(self, data)
+        _count(written=os.path.getsize(self._path))
+
+    return wrapper
+
+
+def _scanWithoutCondition(func):
+    # queries the backend can not answer with an index read all() and are counted there
+    @wraps(func)
+    def wrapper(self, cond=None, doc_ids=None):
+        if cond is None and doc_ids is None:
+            _count(scans=1)
+        return func(self, cond, doc_ids)
+
+    return wrapper
+
+
+def _journalCandidates(func):
+    @wraps(func)
+    def wrapper(self, queryHash):
+        candidates = func(self, queryHash)
+        if candidates is None:
+            _count(scans=1)
+        return candidates
+
+    return wrapper
+
+
+def _documents(func):
+    @wraps(func)
+    def wrapper(self, source):
+        docs = func(self, source)
+        _count(documents=len(docs))
+        return docs
+
+    return wrapper
+
+
+def _journalCommit(func):
+    @wraps(func)
+    def wrapper(self):
+        size = self._size
+        func(self)
+        _count(written=max(0, self._size - size))
+
+    return wrapper
+
+
+class _CountingConnection:
+    # counts the size of the text parameters of the statements run on the connection
+    def __init__(self, connection):
+        self._connection = connection
+
+    def execute(self, sql: str, parameters=()):
+        _count(written=sum(len(value) for value in parameters if isinstance(value, str)))
+        return self._connection.execute(sql, parameters)
+
+    def executemany(self, sql: str, rows):
+        rows = list(rows)
+        _count(written=sum(len(value) for row in rows for value in row if isinstance(value, str)))
+        return self._connection.executemany(sql, rows)
+
+    def __getattr__(self, name: str):
+        return getattr(self._connection, name)
+
+
+def _sqliteWriting(func):
+    @contextmanager
+    def wrapper(self):
+        with func(self) as connection:
+            yield _CountingConnection(connection)
+
+    return wrapper
@@ -0,0 +1,616 @@
+"""
+Append-only storage for the tables of the journal backend (see backend.py).
+
+All tables are stored in one file of json lines. Inserts and updates append the whole
+document, removes append a line without a document:
+
+    {"t": "games", "id": 3, "doc": {...}}
+    {"t": "games", "id": 3}
+    {"commit": 1}
+
+The lines of a transaction are appended at once and end with a commit line, lines after the
+last commit line are the remains of an interrupted write and are cut off when the journal
+is opened. In memory every table maps the doc_ids to the position of their newest line,
+documents are read from a memory map of the file. Once most lines are outdated the file is
+compacted in the background.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Mapping
+import json
+import mmap
+import os
+import threading
+
+from tinydb.table import Document
+
+# the file is compacted once this share of the lines is outdated ...
+COMPACT_RATIO = 0.5
+# ... and it has at least this many lines
+COMPACT_MINIMUM = 1000
+
+_COMMIT = b'{"commit":1}\n'
+_MISSING = object()
+
+
+def _matches(cond, doc: dict) -> bool:
+    # like the SQLite backend, a field that can not be compared with the value does not match
+    try:
+        return cond(doc)
+    except TypeError:
+        return False
+
+
+def _encode(record: dict) -> bytes:
+    return json.dumps(record, separators=(",", ":")).encode() + b"\n"
+
+
+class Journal:
+    """
+    The journal file shared by the tables. Offers the same transactions as the
+    TransactionMiddleware: the changes done inside begin/commit are appended with
+    one write, changes outside of a transaction are appended immediately.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        indexes: dict[str, tuple[str, ...]] | None = None,
+        compactRatio: float = COMPACT_RATIO,
+        compactMinimum: int = COMPACT_MINIMUM,
+        background: bool = True,
+    ):
+        """
+        Args:
+        path (str): the journal file, created if it does not exist
+        indexes (dict[str, tuple[str, ...]] | None): the indexed fields by table name, a table
+            named <name>_<suffix> uses the fields of <name>
+        compactRatio (float): share of outdated lines that triggers a compaction
+        compactMinimum (int): number of lines below which the file is never compacted
+        background (bool): compact in a background thread instead of during the commit
+        """
+        self.path = path
+        self.indexes = indexes or {}
+        self.compactRatio = compactRatio
+        self.compactMinimum = compactMinimum
+        self.background = background
+        # number of appends (fsyncs) done by this journal
+        self.writes = 0
+        # number of compactions done by this journal
+        self.compactions = 0
+
+        self._lock = threading.RLock()
+        self._compactLock = threading.Lock()
+        self._compaction = None
+        self._tables: dict[str, JournalTable] = {}
+        self._depth = 0
+        # a nested transaction was rolled back, the outermost one can not be committed
+        self._aborted = False
+        self._buffer: list[tuple[JournalTable, int | None, bytes]] = []
+        # (table name, doc_id) -> the committed entry of the documents changed by the open
+        # transaction, None if it was not committed yet. Compaction copies these lines
+        self._committed: dict[tuple[str, int], tuple[int, int] | None] = {}
+        self._map = None
+        # the map a running compaction copies from, it is closed by the compaction
+        self._compactionMap = None
+
+        # "a+b" creates the file and always appends
+        self._file = open(path, "a+b")
+        self._load()
+
+    def table(self, name: str) -> "JournalTable":
+        """
+        Returns the table with the given name, an empty table if it does not exist yet.
+        """
+        with self._lock:
+            table = self._tables.get(name)
+            if table is None:
+                # the tables of a player (games_1) are indexed like the table of their kind (games)
+                indexes = self.indexes.get(name, self.indexes.get(name.partition("_")[0], ()))
+                table = JournalTable(self, name, indexes)
+                self._tables[name] = table
+            return table
+
+    # reading
+
+    def _remap(self) -> None:
+        # the old map is closed unless a running compaction still reads from it
+        old = self._map
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self._size else None
+        if old is not None and old is not self._compactionMap:
+            old.close()
+
+    def _read(self, entry: tuple[int, int] | bytes) -> dict:
+        if isinstance(entry, bytes):
+            # written in the open transaction, not appended yet
+            return json.loads(entry)["doc"]
+        offset, length = entry
+        return json.loads(self._map[offset : offset + length])["doc"]
+
+    def _load(self) -> None:
+        """
+        Rebuilds the indexes of all tables with one scan of the file.
+        """
+        for table in self._tables.values():
+            table._reset()
+        self._size = os.fstat(self._file.fileno()).st_size
+        self._remap()
+
+        pos = 0
+        committed = 0
+        self._lines = 0
+        pending = []
+        data = self._map
+        while pos < self._size:
+            end = data.find(b"\n", pos)
+            if end == -1:
+                break
+            try:
+                record = json.loads(data[pos:end])
+            except ValueError:
+                break
+            if "commit" in record:
+                for change, offset, length in pending:
+                    self._replay(change, (offset, length))
+                self._lines += len(pending) + 1
+                pending = []
+                committed = end + 1
+            else:
+                pending.append((record, pos, end + 1 - pos))
+            pos = end + 1
+
+        if committed < self._size:
+            # cut off the interrupted write
+            self._file.truncate(committed)
+            self._size = committed
+            self._remap()
+
+    def _replay(self, record: dict, entry: tuple[int, int]) -> None:
+        table = self.table(record["t"])
+        if "truncate" in record:
+            table._clear()
+        elif "next" in record:
+            table._nextId = max(table._nextId, record["next"])
+        elif "doc" in record:
+            table._set(record["id"], entry, record["doc"])
+        else:
+            table._delete(record["id"])
+
+    # writing
+
+    @property
+    def inTransaction(self) -> bool:
+        return self._depth > 0
+
+    def begin(self) -> None:
+        """
+        Opens a (nested) transaction.
+        """
+        with self._lock:
+            if self._depth == 0:
+                self._buffer = []
+                self._committed = {}
+                self._aborted = False
+            self._depth += 1
+
+    def commit(self) -> None:
+        """
+        Closes a transaction. Leaving the outermost transaction appends the changes with one write.
+
+        Raises:
+        RuntimeError: if a nested transaction was rolled back, nothing is written
+        """
+        with self._lock:
+            if self._depth == 0:
+                raise RuntimeError("commit without an open transaction")
+            self._depth -= 1
+            if self._depth == 0 and self._aborted:
+                self._aborted = False
+                self._discard()
+                raise RuntimeError("A nested transaction was rolled back, nothing was written.")
+            if self._depth > 0 or not self._buffer:
+                return
+
+            buffer, self._buffer = self._buffer, []
+            self._committed = {}
+            data = b"".join(line for _, _, line in buffer) + _COMMIT
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+            pos = self._size
+            for table, docId, line in buffer:
+                if docId is not None and table._entries.get(docId) is line:
+                    table._entries[docId] = (pos, len(line))
+                pos += len(line)
+            self._size += len(data)
+            self._lines += len(buffer) + 1
+            self._remap()
+            self.writes += 1
+
+        self._maybeCompact()
+
+    def rollback(self) -> None:
+        """
+        Closes a transaction and discards all changes of the outermost transaction, the indexes
+        are rebuilt from the file. Inside an outer transaction the outer one stays open but can
+        not be committed anymore: its changes are discarded and its commit raises a RuntimeError.
+        """
+        with self._lock:
+            if self._depth == 0:
+                return
+            self._depth -= 1
+            self._aborted = self._depth > 0
+            self._discard()
+
+    def _discard(self) -> None:
+        # drops the buffered changes, the documents are read again from the committed lines
+        self._buffer = []
+        self._committed = {}
+        self._load()
+
+    def _write(self, table: "JournalTable", records: list[tuple[int | None, dict | None]]) -> None:
+        # records: (doc_id, document) pairs, no document removes it, no doc_id truncates the table
+        with self._lock:
+            self.begin()
+            try:
+                for docId, doc in records:
+                    self._keepCommitted(table, docId)
+                    if docId is None:
+                        line = _encode({"t": table.name, "truncate": 1})
+                        table._clear()
+                    elif doc is None:
+                        line = _encode({"t": table.name, "id": docId})
+                        table._delete(docId)
+                    else:
+                        line = _encode({"t": table.name, "id": docId, "doc": doc})
+                        table._set(docId, line, doc)
+                    self._buffer.append((table, docId, line))
+            except BaseException:
+                self.rollback()
+                raise
+            self.commit()
+
+    def _keepCommitted(self, table: "JournalTable", docId: int | None) -> None:
+        # remembers the committed entries before the open transaction changes them
+        docIds = table._entries if docId is None else (docId,)
+        for changed in docIds:
+            key = (table.name, changed)
+            if key not in self._committed:
+                entry = table._entries.get(changed)
+                self._committed[key] = None if isinstance(entry, bytes) else entry
+
+    # compaction
+
+    @property
+    def deadRatio(self) -> float:
+        """
+        The share of the lines in the file that are outdated.
+        """
+        if not self._lines:
+            return 0.0
+        live = sum(len(table._entries) for table in self._tables.values())
+        return (self._lines - live) / self._lines
+
+    def _maybeCompact(self) -> None:
+        if self._lines < self.compactMinimum or self.deadRatio < self.compactRatio:
+            return
+        if not self.background:
+            self.compact()
+        elif self._compaction is None or not self._compaction.is_alive():
+            self._compaction = threading.Thread(target=self.compact, daemon=True)
+            self._compaction.start()
+
+    def compact(self) -> None:
+        """
+        Rewrites the file with only the newest line of every document. The documents are copied
+        without holding the lock, changes committed meanwhile are appended at the end.
+        """
+        with self._compactLock:
+            with self._lock:
+                if self._file.closed or not self._size:
+                    return
+                data, end, lines = self._map, self._size, self._lines
+                self._compactionMap = data
+                # the committed state, without the changes of an open transaction
+                committed = {
+                    (table.name, docId): entry for table in self._tables.values() for docId, entry in table._entries.items()
+                }
+                committed.update(self._committed)
+                snapshot = [
+                    (name, docId, entry)
+                    for (name, docId), entry in sorted(committed.items())
+                    if entry is not None and not isinstance(entry, bytes)
+                ]
+                meta = b"".join(
+                    _encode({"t": table.name, "next": table._nextId}) for table in self._tables.values()
+                )
+
+            tempPath = self.path + ".compact"
+            moved = {}
+            with open(tempPath, "wb") as out:
+                pos = 0
+                for name, docId, (offset, length) in snapshot:
+                    out.write(data[offset : offset + length])
+                    moved[(name, docId)] = pos
+                    pos += length
+                out.write(meta + _COMMIT)
+                pos += len(meta) + len(_COMMIT)
+
+            with self._lock:
+                # commits done while copying
+                tail = self._map[end : self._size] if self._size > end else b""
+                with open(tempPath, "ab") as out:
+                    out.write(tail)
+                    out.flush()
+                    os.fsync(out.fileno())
+
+                shift = pos - end
+
+                def relocate(name: str, docId: int, entry: tuple[int, int]) -> tuple[int, int]:
+                    offset, length = entry
+                    if offset >= end:
+                        return (offset + shift, length)
+                    return (moved[(name, docId)], length)
+
+                for table in self._tables.values():
+                    for docId, entry in table._entries.items():
+                        if not isinstance(entry, bytes):
+                            table._entries[docId] = relocate(table.name, docId, entry)
+                for (name, docId), entry in self._committed.items():
+                    if entry is not None:
+                        self._committed[(name, docId)] = relocate(name, docId, entry)
+
+                # a mapped file can not be replaced on Windows
+                self._compactionMap = None
+                if data is not self._map:
+                    data.close()
+                self._map.close()
+                self._map = None
+                self._file.close()
+                os.replace(tempPath, self.path)
+                self._file = open(self.path, "a+b")
+                self._lines = len(snapshot) + len(meta.splitlines()) + 1 + self._lines - lines
+                self._size = pos + len(tail)
+                self._remap()
+                self.compactions += 1
+
+    def close(self) -> None:
+        if self._compaction is not None:
+            self._compaction.join()
+        with self._lock:
+            if self._depth and self._buffer and not self._aborted:
+                # like the TransactionMiddleware, pending changes are written
+                self._depth = 1
+                self.commit()
+            self._depth = 0
+            self._aborted = False
+            if self._map is not None:
+                self._map.close()
+            self._map = None
+            self._file.close()
+
+
+class JournalTable:
+    """
+    A table of the journal backend with the api of a tinyDB Table. Queries with == or one_of
+    on an indexed field and comparisons on an indexed date only read the matching documents.
+    """
+
+    def __init__(self, journal: Journal, name: str, indexes: tuple[str, ...] = ()):
+        self.storage = journal
+        self.name = name
+        self._indexes = tuple(indexes)
+        self._reset()
+
+    def _reset(self) -> None:
+        # doc_id -> (offset, length) of the newest line or the line of the open transaction
+        self._entries: dict[int, tuple[int, int] | bytes] = {}
+        # field -> value -> doc_ids
+        self._byValue: dict[str, dict] = {field: {} for field in self._indexes}
+        self._values: dict[int, tuple] = {}
+        # (date, doc_id) sorted and the documents with a date that is not a string
+        self._dates: list[tuple[str, int]] = []
+        self._otherDates: set[int] = set()
+        self._nextId = 1
+
+    def __repr__(self) -> str:
+        return f"<JournalTable name='{self.name}', total={len(self)}>"
+
+    # index maintenance
+
+    def _set(self, docId: int, entry: tuple[int, int] | bytes, doc: dict) -> None:
+        if docId in self._entries:
+            self._unindex(docId)
+        self._entries[docId] = entry
+        self._nextId = max(self._nextId, docId + 1)
+
+        values = tuple(doc.get(field, _MISSING) for field in self._indexes)
+        self._values[docId] = values
+        for field, value in zip(self._indexes, values):
+            try:
+                self._byValue[field].setdefault(value, set()).add(docId)
+            except TypeError:
+                # lists and dicts can not be looked up
+                pass
+            if field == "date":
+                if isinstance(value, str):
+                    insort(self._dates, (value, docId))
+                else:
+                    self._otherDates.add(docId)
+
+    def _unindex(self, docId: int) -> None:
+        for field, value in zip(self._indexes, self._values.pop(docId)):
+            try:
+                docIds = self._byValue[field].get(value)
+            except TypeError:
+                docIds = None
+            if docIds is not None:
+                docIds.discard(docId)
+                if not docIds:
+                    del self._byValue[field][value]
+            if field == "date":
+                if isinstance(value, str):
+                    del self._dates[bisect_left(self._dates, (value, docId))]
+                else:
+                    self._otherDates.discard(docId)
+
+    def _delete(self, docId: int) -> None:
+        if docId in self._entries:
+            self._unindex(docId)
+            del self._entries[docId]
+
+    def _clear(self) -> None:
+        nextId = self._nextId
+        self._reset()
+        self._nextId = nextId
+
+    def _candidates(self, queryHash: tuple) -> set[int] | None:
+        """
+        The doc_ids that can match the query or None if the indexes do not help.
+        """
+        op = queryHash[0]
+        if op in ("and", "or"):
+            parts = [self._candidates(part) for part in queryHash[1]]
+            if op == "or":
+                return None if not parts or None in parts else set().union(*parts)
+            parts = [part for part in parts if part is not None]
+            return set.intersection(*parts) if parts else None
+
+        if len(queryHash) < 3 or len(queryHash[1]) != 1 or queryHash[1][0] not in self._indexes:
+            return None
+        field, value = queryHash[1][0], queryHash[2]
+        try:
+            if op == "==":
+                return set(self._byValue[field].get(value, ()))
+            if op == "one_of":
+                return set().union(*(self._byValue[field].get(item, ()) for item in value))
+        except TypeError:
+            return None
+        if field == "date" and isinstance(value, str) and op in ("<", "<=", ">", ">="):
+            # (value, 0) sorts before and (value, inf) after all entries on value
+            first = bisect_left(self._dates, (value, 0))
+            last = bisect_right(self._dates, (value, float("inf")))
+            lo, hi = {"<": (0, first), "<=": (0, last), ">": (last, None), ">=": (first, None)}[op]
+            # tinyDB raises for dates that are not strings, so they are always checked
+            return {docId for _, docId in self._dates[lo:hi]} | self._otherDates
+        return None
+
+    # reading
+
+    def _documents(self, docIds) -> list[Document]:
+        journal = self.storage
+        return [Document(journal._read(self._entries[docId]), docId) for docId in sorted(docIds)]
+
+    def _find(self, cond=None, doc_ids=None) -> list[Document]:
+        with self.storage._lock:
+            if doc_ids is not None:
+                docs = self._documents(docId for docId in set(doc_ids) if docId in self._entries)
+            elif cond is None:
+                return self._documents(self._entries)
+            else:
+                candidates = None
+                if getattr(cond, "_hash", None) is not None:
+                    candidates = self._candidates(cond._hash)
+                docs = self._documents(self._entries if candidates is None else candidates)
+        return [doc for doc in docs if _matches(cond, doc)] if cond is not None else docs
+
+    def all(self) -> list[Document]:
+        return self._find()
+
+    def search(self, cond) -> list[Document]:
+        """
+        Returns the documents matching the tinyDB query.
+        """
+        return self._find(cond)
+
+    def get(self, cond=None, doc_id: int | None = None, doc_ids: list[int] | None = None):
+        if doc_id is not None:
+            docs = self._find(doc_ids=[doc_id])
+            return docs[0] if docs else None
+        if doc_ids is not None:
+            return self._find(doc_ids=doc_ids)
+        if cond is None:
+            raise RuntimeError("You have to pass either cond or doc_id or doc_ids")
+        docs = self._find(cond)
+        return docs[0] if docs else None
+
+    def contains(self, cond=None, doc_id: int | None = None) -> bool:
+        if doc_id is not None:
+            return doc_id in self._entries
+        if cond is None:
+            raise RuntimeError("You have to pass either cond or doc_id")
+        return self.get(cond) is not None
+
+    def count(self, cond) -> int:
+        return len(self.search(cond))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self.all())
+
+    # writing
+
+    def insert(self, document: dict) -> int:
+        """
+        Appends a document and returns its doc_id.
+        """
+        return self.insert_multiple([document])[0]
+
+    def insert_multiple(self, documents) -> list[int]:
+        """
+        Appends the documents with one write and returns their doc_ids.
+        """
+        with self.storage._lock:
+            records = []
+            nextId = self._nextId
+            for document in documents:
+                if not isinstance(document, Mapping):
+                    raise ValueError("Document is not a Mapping")
+                if isinstance(document, Document):
+                    docId = document.doc_id
+                    if docId in self._entries:
+                        raise ValueError(f"Document with ID {docId} already exists")
+                else:
+                    docId = nextId
+                nextId = max(nextId, docId + 1)
+                records.append((docId, dict(document)))
+            self.storage._write(self, records)
+        return [docId for docId, _ in records]
+
+    def update(self, fields, cond=None, doc_ids: list[int] | None = None) -> list[int]:
+        """
+        Updates the documents matching the query or doc_ids (all documents if neither is given).
+        fields is a dict of new values or a function changing the document in place.
+        """
+        with self.storage._lock:
+            docs = self._find(cond, doc_ids)
+            for doc in docs:
+                if callable(fields):
+                    fields(doc)
+                else:
+                    doc.update(fields)
+            if docs:
+                self.storage._write(self, [(doc.doc_id, dict(doc)) for doc in docs])
+        return [doc.doc_id for doc in docs]
+
+    def remove(self, cond=None, doc_ids: list[int] | None = None) -> list[int]:
+        """
+        Removes the documents matching the query or doc_ids.
+        """
+        if cond is None and doc_ids is None:
+            raise RuntimeError("Use truncate() to remove all documents")
+        with self.storage._lock:
+            docIds = [doc.doc_id for doc in self._find(cond, doc_ids)]
+            if docIds:
+                self.storage._write(self, [(docId, None) for docId in docIds])
+        return docIds
+
+    def truncate(self) -> None:
+        self.storage._write(self, [(None, None)])
+
+    def clear_cache(self) -> None:
+        # documents are not cached, they are read from the memory map
+        pass
@@ -0,0 +1,32 @@
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazyImport(name: str) -> ModuleType:
+    """
+    Imports a module on first use instead of now, for dependencies that are slow to import
+    (e.g. fpdf) but not needed by every run. The module is loaded when one of its attributes
+    is read for the first time.
+
+    Args:
+    name (str): the name of the module, as for import
+
+    Returns:
+    ModuleType: the module, loaded on first attribute access
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    parent, _, child = name.rpartition(".")
+    if parent:
+        # like import, so "import a.b" elsewhere finds b on a
+        setattr(importlib.import_module(parent), child, module)
+    return module
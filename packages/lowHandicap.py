@@ -0,0 +1,153 @@
+"""
+The Low Handicap Index (WHS 5.7): the lowest index of the 365 days before the newest round,
+together with the index in effect at the start of that time. It is needed for the soft and hard
+cap on every new index, see handicapWHS.capIncrease.
+
+RollingLow keeps it in a monotonic deque: hcLog entries are appended in date order, the window
+start only moves forward, so every entry is added and dropped once and a lookup is amortized O(1)
+instead of a min over all entries of the year (see Helper.getHCLog).
+
+LogIndex is the DateIndex of the hcLog with a RollingLow maintained as entries are written to
+the end of the log. Any other change (an entry of the same day replaced, a recalculation)
+drops it, it is rebuilt from the entries of the window with one pass on the next lookup. The
+same happens after a restart, so nothing is stored in the db.
+"""
+
+from collections import deque
+from datetime import datetime, timedelta
+
+from dateIndex import DateIndex, toDatetime
+
+WINDOW = timedelta(days=365)
+
+
+class RollingLow:
+    """
+    The lowest WHS index of a sliding window over hcLog entries appended in date order.
+    """
+
+    def __init__(self, entries=()):
+        """
+        Args:
+        entries (iterable[tuple[datetime, float]]): (date, whs) of the entries to start with, oldest first
+        """
+        # the candidates for the lowest index dated after the window start, ascending indexes
+        self._low = deque()
+        # every entry since the one in effect at the window start
+        self._entries = deque()
+        self.windowStart = datetime.min
+        for entryDate, index in entries:
+            self.append(entryDate, index)
+
+    @property
+    def newest(self) -> datetime | None:
+        """
+        The date of the newest entry, None if there is none.
+        """
+        return self._entries[-1][0] if self._entries else None
+
+    def append(self, entryDate: datetime, index: float) -> None:
+        """
+        Adds the next entry. Entries have to be added in date order.
+
+        Args:
+        entryDate (datetime): the date of the entry
+        index (float): its WHS index
+        """
+        if self._entries and entryDate < self._entries[-1][0]:
+            raise ValueError(f"The entry of {entryDate} is older than the newest one.")
+        # an older entry with a higher index can never be the lowest again
+        while self._low and self._low[-1][1] >= index:
+            self._low.pop()
+        self._low.append((entryDate, index))
+        self._entries.append((entryDate, index))
+
+    def low(self, gameDate: datetime) -> float | None:
+        """
+        The Low Handicap Index for a round on gameDate, the lowest index of the entries of the
+        365 days before it and the one in effect at their start. The entries must not be newer
+        than gameDate and the window can only move forward.
+
+        Args:
+        gameDate (datetime): the date of the newest round
+
+        Returns:
+        float | None: the Low Handicap Index or None if there is no entry
+        """
+        windowStart = gameDate - WINDOW
+        if windowStart < self.windowStart:
+            raise ValueError(f"The window can not move back from {self.windowStart} to {windowStart}.")
+        self.windowStart = windowStart
+
+        while self._low and self._low[0][0] <= windowStart:
+            self._low.popleft()
+        # only the newest entry up to the window start is kept, it is the one in effect
+        while len(self._entries) > 1 and self._entries[1][0] <= windowStart:
+            self._entries.popleft()
+
+        low = self._low[0][1] if self._low else None
+        if self._entries and self._entries[0][0] <= windowStart:
+            effective = self._entries[0][1]
+            low = effective if low is None else min(low, effective)
+        return low
+
+
+class LogIndex(DateIndex):
+    """
+    The DateIndex of the hcLog, with the Low Handicap Index of the newest entries, see low.
+    """
+
+    def __init__(self, docs: list[dict] = (), key: str = "date"):
+        super().__init__(docs, key)
+        self._rolling = None
+
+    def insert(self, doc: dict) -> None:
+        super().insert(doc)
+        if self._rolling is None:
+            return
+        if self._docs[-1] is doc:
+            self._rolling.append(self._keys[-1][0], doc["whs"])
+        else:
+            # inserted before newer entries
+            self._rolling = None
+
+    def remove(self, docId: int) -> dict | None:
+        removed = super().remove(docId)
+        if removed is not None:
+            self._rolling = None
+        return removed
+
+    def low(self, gameDate: datetime | str) -> float | None:
+        """
+        The Low Handicap Index for a round on gameDate, the lowest WHS index of
+        Helper.getHCLog(startDate=gameDate).
+
+        Amortized O(1) for rounds on or after the newest entry in date order, like every new round.
+        For older rounds the entries of their window are read from the index.
+
+        Args:
+        gameDate (datetime | str): the date of the newest round
+
+        Returns:
+        float | None: the Low Handicap Index or None if there is no entry
+        """
+        gameDate = toDatetime(gameDate)
+        if not self._docs:
+            return None
+        windowStart = gameDate - WINDOW
+        if gameDate < self._keys[-1][0]:
+            docs = self.between(windowStart, gameDate, inclusiveStart=False)
+            previous = self.before(windowStart)
+            if previous is not None:
+                docs.append(previous)
+            return min((doc["whs"] for doc in docs), default=None)
+
+        if self._rolling is None or windowStart < self._rolling.windowStart:
+            self._rolling = RollingLow(self._window(windowStart))
+        return self._rolling.low(gameDate)
+
+    def _window(self, windowStart: datetime):
+        # (date, whs) of the entries after windowStart and the one in effect at it, oldest first
+        start = self._lowerBound(windowStart, False)
+        for pos in range(max(0, start - 1), len(self._docs)):
+            yield self._keys[pos][0], self._docs[pos]["whs"]
@@ -0,0 +1,151 @@
+"""
+The playing conditions calculation (WHS 5.6). Instead of entering the pcc by hand it is derived
+from all rounds played on a course on a day: every acceptable round is compared with the score
+expected from the player's handicap index and the mean difference of the field gives the pcc.
+
+The field of all courses and days is calculated at once with numpy (see batchWHS.py).
+updatePending writes the pcc to the queued rounds before the nightly revision adds them
+(see revision.py), so their handicap differentials use it.
+"""
+
+from collections import defaultdict
+from contextlib import ExitStack
+from datetime import date, datetime
+
+import numpy as np
+import batchWHS
+from dateIndex import toDatetime
+
+# only rounds of players with a handicap index up to this value are acceptable
+MAXIMUM_INDEX = 36.0
+# a pcc is only calculated for fields with at least this many acceptable rounds
+MINIMUM_SCORES = 8
+# the pcc is -1 below the first threshold and 0, +1, +2, +3 from the following ones on,
+# compared with the mean difference of the field to the expected differential
+PCC_THRESHOLDS = np.array([-1.0, 1.0, 2.0, 3.0])
+
+
+def expectedDifferentials(handicapIndex) -> np.ndarray:
+    """
+    The differential a player is expected to score on an 18 hole round, the same
+    expected score handicapDifferential uses to complete 9 hole rounds (WHS 5.1b).
+    """
+    return np.asarray(handicapIndex, dtype=np.float64) * 1.04 + 2.4
+
+
+def playingConditions(
+    differentials,
+    handicapIndex,
+    is9Hole,
+    fields,
+    minimumScores: int = MINIMUM_SCORES,
+    maximumIndex: float = MAXIMUM_INDEX,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Calculates the pcc of many fields at once.
+    Only 18 hole rounds of players with a handicap index up to maximumIndex are acceptable.
+
+    Args:
+    differentials (array R): the handicap differentials of the rounds calculated without pcc
+    handicapIndex (array R): the handicap index of the player at the time of the round
+    is9Hole (array R): True for 9 hole rounds
+    fields (array R): the number of the field (course and day) of every round, 0 to F - 1
+    minimumScores (int): the number of acceptable rounds a field needs for a pcc
+    maximumIndex (float): the highest handicap index of an acceptable round
+
+    Returns:
+    tuple[np.ndarray, np.ndarray]: the pcc of every field and whether the field had enough
+        acceptable rounds. Fields without enough rounds have a pcc of 0
+    """
+    differentials = np.asarray(differentials, dtype=np.float64)
+    handicapIndex = np.asarray(handicapIndex, dtype=np.float64)
+    is9Hole = np.asarray(is9Hole, dtype=bool)
+    fields = np.asarray(fields, dtype=np.int64)
+    fieldCount = int(fields.max()) + 1 if len(fields) else 0
+
+    acceptable = ~is9Hole & (handicapIndex <= maximumIndex)
+    difference = differentials - expectedDifferentials(handicapIndex)
+    counts = np.bincount(fields[acceptable], minlength=fieldCount)
+    totals = np.bincount(fields[acceptable], weights=difference[acceptable], minlength=fieldCount)
+    mean = np.divide(totals, counts, out=np.zeros(fieldCount), where=counts > 0)
+
+    calculated = counts >= minimumScores
+    pcc = np.searchsorted(PCC_THRESHOLDS, mean, side="right") - 1
+    return np.where(calculated, pcc, 0).astype(np.float64), calculated
+
+
+def fieldPCC(rounds: list[dict], courses: dict[str, dict], handicapIndex: list[float]) -> dict[tuple[str, date], float]:
+    """
+    Calculates the pcc of every course and day the rounds were played on.
+
+    Args:
+    rounds (list[dict]): the rounds of all players
+    courses (dict[str, dict]): the courses by courseID
+    handicapIndex (list[float]): the handicap index of the player at the start of the day of every round
+
+    Returns:
+    dict[tuple[str, date], float]: the pcc by (courseID, day) of the fields with enough acceptable rounds
+    """
+    if not rounds:
+        return {}
+    keys = [(doc["courseID"], toDatetime(doc["date"]).date()) for doc in rounds]
+    fieldKeys = list(dict.fromkeys(keys))
+    number = {key: i for i, key in enumerate(fieldKeys)}
+
+    arrays = batchWHS.gamesToArrays(rounds, courses, handicapIndex)
+    arrays["pcc"] = np.zeros(len(rounds))
+    differentials, _ = batchWHS.handicapDifferentials(**arrays)
+    pcc, calculated = playingConditions(
+        differentials, arrays["handicapIndex"], arrays["is9Hole"], [number[key] for key in keys]
+    )
+    return {key: float(value) for key, value, ok in zip(fieldKeys, pcc, calculated) if ok}
+
+
+def updatePending(helpers: list, today: date | None = None) -> dict[tuple[str, date], float]:
+    """
+    Calculates the pcc of the rounds of all players that wait for the nightly revision
+    and writes it to the pending tables in one transaction. Rounds of fields without enough
+    acceptable rounds keep the pcc they were posted with.
+
+    Args:
+    helpers (list[Helper]): the helpers of all players, e.g. of every player of a club
+    today (date | None): rounds played on or after this day are not revised yet. By default today
+
+    Returns:
+    dict[tuple[str, date], float]: the pcc by (courseID, day)
+    """
+    today = date.today() if today is None else today
+    rounds, owners, handicapIndex = [], [], []
+    for helper in helpers:
+        if helper.pending is None:
+            continue
+        startIndex = {}
+        for doc in helper.pending.all():
+            day = toDatetime(doc["date"]).date()
+            if day >= today:
+                continue
+            if day not in startIndex:
+                previous = helper.logIndex.before(datetime.combine(day, datetime.min.time()), inclusive=False)
+                startIndex[day] = 54.0 if previous is None else previous["whs"]
+            rounds.append(doc)
+            owners.append(helper)
+            handicapIndex.append(startIndex[day])
+
+    courses = {course["courseID"]: course for course in helpers[0].getCourses(rounds)} if rounds else {}
+    result = fieldPCC(rounds, courses, handicapIndex)
+
+    # one update per table and value
+    changes = defaultdict(list)
+    for doc, helper in zip(rounds, owners):
+        pcc = result.get((doc["courseID"], toDatetime(doc["date"]).date()))
+        if pcc is not None and doc["pcc"] != pcc:
+            changes[(id(helper), pcc)].append(doc.doc_id)
+    byId = {id(helper): helper for helper in owners}
+
+    with ExitStack() as stack:
+        # nested transactions of the same storage are written once
+        for helper in byId.values():
+            stack.enter_context(helper.transaction())
+        for (helperId, pcc), docIds in changes.items():
+            byId[helperId].pending.update({"pcc": pcc}, doc_ids=docIds)
+    return result
@@ -0,0 +1,273 @@
+"""
+What-if projections for the next round: the WHS handicap index and the EGA handicap a player
+would get for every gross score they could shoot on a course, e.g. to show what they need to
+shoot to cut their handicap. A course is one tee (its own ratings, par and stroke index).
+
+prepare reads everything a projection needs from the player's record once: the sorted
+differentials of the 19 newest games (the new round pushes the oldest of the 20 out), the Low
+Handicap Index and the current handicaps. project then calculates all scores of a course at once
+with numpy, without touching the db or the game dicts, so it is cheap enough to run on every
+keystroke:
+
+    state = helper.projectionState()
+    result = projection.project(state, course, is9Hole=False)
+    result["thresholds"]["whs"]  # the highest score that still gives each index
+
+Every gross score stands for one round: the shots are spread over the holes like the handicap
+strokes, starting from the par including the player's handicap strokes, and the strokes over
+or under it go to the holes with the lowest stroke index first. The results are the same as
+adding that round with Helper.addGame.
+"""
+
+import numpy as np
+import batchWHS
+import handicapEGA as ega
+import handicapWHS as whs
+from course import compileCourse
+
+# the number of lowest differentials that are averaged and the adjustment in tenths by number
+# of games, the same as handicapWHS.handicap (WHS 5.2a)
+AVERAGED = {
+    1: (1, -20), 2: (1, -20), 3: (1, -20), 4: (1, -10), 5: (1, 0), 6: (2, -10), 7: (2, 0),
+    8: (2, 0), 9: (3, 0), 10: (3, 0), 11: (3, 0), 12: (4, 0), 13: (4, 0), 14: (4, 0),
+    15: (5, 0), 16: (5, 0), 17: (6, 0), 18: (6, 0), 19: (7, 0), 20: (8, 0),
+}
+# an index needs at least this many holes, see handicapWHS.handicap
+MINIMUM_HOLES = 54
+MAXIMUM_TENTHS = 540
+
+
+def prepare(
+    previousGames: list[dict],
+    lowHandicap: float | None,
+    handicapIndex: float | None,
+    egaHandicap: float | None,
+) -> dict:
+    """
+    Collects what project needs from the record of a player.
+
+    Args:
+    previousGames (list[dict]): the games that stay in the window of 20 with the new round,
+        the 19 newest, newest first (see Helper.getLastGames(0, 18))
+    lowHandicap (float | None): the Low Handicap Index of the year before the new round
+    handicapIndex (float | None): the current WHS index, None if the player has none yet
+    egaHandicap (float | None): the current EGA handicap, None if the player has none yet
+
+    Returns:
+    dict: the state passed to project
+    """
+    if len(previousGames) > 19:
+        raise ValueError(f"Invalid parameter: len(previousGames) = {len(previousGames)}. Only 19 games stay in the window.")
+    differentials = np.sort(np.array(whs.reducedDifferentials(previousGames), dtype=np.int64))
+    return {
+        "differentials": differentials,
+        "prefix": np.concatenate(([0], np.cumsum(differentials))),
+        "holes": sum(len(game["shots"]) for game in previousGames),
+        "lowHandicap": None if lowHandicap is None else round(lowHandicap * 10),
+        # players without an index play with the maximum, like in addGame
+        "handicapIndex": 54.0 if handicapIndex is None else handicapIndex,
+        "egaHandicap": egaHandicap,
+    }
+
+
+def candidateRounds(
+    course: dict, is9Hole: bool, handicapIndex: float, handicapAllowance: float | None = None
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    One round per gross score, from the lowest score without a hole in less than one shot to
+    the score where every hole is at the net double bogey limit. Higher scores are adjusted
+    to the same round.
+
+    Returns:
+    tuple[np.ndarray, np.ndarray, np.ndarray]: the gross scores (S), the shots of their rounds
+        (S x 18) and the net double bogey limit of every hole played
+    """
+    compiled = compileCourse(course)
+    holes = 9 if is9Hole else 18
+    if holes > len(compiled.par):
+        raise ValueError("A round has more holes than its course.")
+    playingHandicap = whs.calcPlayingHandicap(
+        {"is9Hole": is9Hole, "handicap_allowance": handicapAllowance}, compiled, handicapIndex
+    )
+    start = np.array(compiled.spread(playingHandicap, is9Hole)[:holes], dtype=np.int64)
+    # implements 3.1, see handicapWHS.adjustGrossScore
+    if handicapIndex == 54:
+        limit = np.array(compiled.par[:holes], dtype=np.int64) + 5
+    else:
+        limit = start + 2
+
+    scores = np.arange(holes, start.sum() + holes * max(1, (limit - start).max()) + 1)
+    over = scores - start.sum()
+    # the holes by stroke index, the hardest get the remaining strokes first
+    rank = np.empty(holes, dtype=np.int64)
+    rank[np.argsort(compiled.strokeIndex[:holes], kind="stable")] = np.arange(holes)
+    shots = start[None, :] + (over // holes)[:, None] + (rank[None, :] < (over % holes)[:, None])
+
+    possible = shots.min(axis=1) >= 1
+    shots = np.pad(shots[possible], ((0, 0), (0, batchWHS.MAX_HOLES - holes)))
+    return scores[possible], shots, limit
+
+
+def project(
+    state: dict,
+    course: dict,
+    is9Hole: bool,
+    pcc: float = 0,
+    cba: int = 0,
+    handicapAllowance: float | None = None,
+) -> dict:
+    """
+    Projects the handicaps after the next round for every gross score on a course.
+
+    Args:
+    state (dict): the record of the player, see prepare
+    course (dict): the course (tee) the round is played on
+    is9Hole (bool): True for a 9 hole round
+    pcc (float): The playing conditions calculation of the round
+    cba (int): The buffer adjustment for EGA
+    handicapAllowance (float | None): The handicap allowance of the round, by default 1
+
+    Returns:
+    dict: {"scores", "shots", "differentials", "reductions", "whs", "ega" as arrays with one
+        entry per score, "thresholds": {"whs", "ega"} see thresholds}
+    """
+    if not (-1 <= pcc <= 3):
+        raise ValueError(f"PCC can only be between -1 and +3. Given value was { pcc }")
+    if not (-2 <= cba <= 1):
+        raise ValueError(f"CBA can only be between -2 and +1. Given value was { cba }")
+
+    handicapIndex = state["handicapIndex"]
+    scores, shots, limit = candidateRounds(course, is9Hole, handicapIndex, handicapAllowance)
+    count = len(scores)
+    par, strokeIndex = batchWHS._padded([course["par"], course["handicap_stroke_index"]])
+    differentials, reductions = batchWHS.handicapDifferentials(
+        shots,
+        np.full(count, is9Hole),
+        np.full(count, course["course_rating"], dtype=np.float64),
+        np.full(count, course["slope_rating"], dtype=np.float64),
+        np.broadcast_to(par, shots.shape),
+        np.broadcast_to(strokeIndex, shots.shape),
+        np.full(count, handicapIndex),
+        np.full(count, pcc, dtype=np.float64),
+        None if handicapAllowance is None else np.full(count, handicapAllowance, dtype=np.float64),
+    )
+    holes = 9 if is9Hole else 18
+    whsIndex = projectWHS(state, differentials, reductions, holes)
+    # like in addGame the EGA handicap is calculated from the adjusted shots
+    egaHandicap = projectEGA(state, course, np.minimum(shots[:, :holes], limit), is9Hole, cba)
+    return {
+        "scores": scores,
+        "shots": shots[:, :holes],
+        "differentials": differentials,
+        "reductions": reductions,
+        "whs": whsIndex,
+        "ega": egaHandicap,
+        "thresholds": {"whs": thresholds(scores, whsIndex), "ega": thresholds(scores, egaHandicap)},
+    }
+
+
+def projectWHS(state: dict, differentials: np.ndarray, reductions: np.ndarray, holes: int) -> np.ndarray:
+    """
+    The handicap index after a round for many possible rounds at once, the same as
+    handicapWHS.handicap with the round added to the window. Calculated in integer tenths, so
+    the averages and the soft cap are exact.
+
+    Args:
+    state (dict): the record of the player, see prepare
+    differentials (array S): the handicap differentials of the rounds
+    reductions (array S): the exceptional score reductions of the rounds
+    holes (int): the number of holes of the rounds
+
+    Returns:
+    np.ndarray: the handicap index after each round
+    """
+    previous = state["differentials"]
+    numGames = len(previous) + 1
+    k, adjustment = AVERAGED[numGames]
+
+    new = np.rint(np.asarray(differentials) * 10).astype(np.int64)
+    if k <= len(previous):
+        # the new differential replaces the highest of the k lowest if it is lower
+        total = state["prefix"][k - 1] + np.minimum(new, previous[k - 1])
+    else:
+        total = new
+    # implements 5.9, the reduction applies to every game in the window
+    total = total + k * np.rint(np.asarray(reductions) * 10).astype(np.int64)
+
+    # in units of a 20th of a tenth per averaged game, so halving the difference stays exact
+    unit = 20 * k
+    value = 20 * total + adjustment * unit
+    low = state["lowHandicap"]
+    if numGames == 20 and low is not None:
+        # implements 5.7+8, see handicapWHS.capIncrease
+        low *= unit
+        dif = value - low
+        capped = np.minimum(low + 30 * unit + (dif - 30 * unit) // 2, low + 50 * unit)
+        value = np.where(dif > 30 * unit, capped, value)
+
+    # round half up to tenths
+    tenths = (value + unit // 2) // unit
+    # implements 5.3
+    tenths = np.where(value > MAXIMUM_TENTHS * unit, MAXIMUM_TENTHS, tenths)
+    if state["holes"] + holes < MINIMUM_HOLES:
+        tenths = np.full_like(tenths, MAXIMUM_TENTHS)
+    return tenths / 10
+
+
+def projectEGA(state: dict, course: dict, shots: np.ndarray, is9Hole: bool, cba: int) -> np.ndarray:
+    """
+    The EGA handicap after a round for many possible rounds at once, the same as
+    handicapEGA.calculateNewHandicap.
+
+    Args:
+    state (dict): the record of the player, see prepare
+    course (dict): the course played on
+    shots (array S x holes): the shots of the rounds
+    is9Hole (bool): True for 9 hole rounds
+    cba (int): The buffer adjustment
+
+    Returns:
+    np.ndarray: the EGA handicap after each round
+    """
+    compiled = compileCourse(course)
+    holes = shots.shape[1]
+    previous = state["egaHandicap"]
+    if previous is None:
+        stableford = _stableford(shots, compiled.par[:holes])
+        return _byValue(stableford, lambda points: ega.initialHandicap(points, is9Hole))
+
+    # implements p.24 3.9.7
+    adjustedPar = compiled.spread(compiled.egaPlayingHandicap(is9Hole, previous), is9Hole)
+    stableford = _stableford(shots, adjustedPar[:holes])
+    if is9Hole:
+        stableford += 18
+    return _byValue(
+        stableford, lambda points: round(previous + ega.calculateAdjustment(points, previous, cba, is9Hole), 1)
+    )
+
+
+def _stableford(shots: np.ndarray, adjustedPar) -> np.ndarray:
+    # vectorized handicapEGA.convertToStableford
+    return np.maximum(0, 2 - (shots - np.asarray(adjustedPar, dtype=np.int64)[None, :])).sum(axis=1)
+
+
+def _byValue(values: np.ndarray, func) -> np.ndarray:
+    # calls func once per distinct value, there are far fewer point totals than scores
+    distinct, inverse = np.unique(values, return_inverse=True)
+    return np.array([func(int(value)) for value in distinct], dtype=np.float64)[inverse]
+
+
+def thresholds(scores: np.ndarray, handicaps: np.ndarray) -> list[dict]:
+    """
+    The scores at which the projected handicap changes.
+
+    Args:
+    scores (array S): the gross scores in ascending order
+    handicaps (array S): the projected handicap for each score
+
+    Returns:
+    list[dict]: {"max_score", "handicap"} for every handicap that can be reached, the highest
+        score that still gives it. Ordered by score, the last one holds for all higher scores
+    """
+    last = np.flatnonzero(np.append(handicaps[1:] != handicaps[:-1], True))
+    return [{"max_score": int(scores[i]), "handicap": float(handicaps[i])} for i in last]
@@ -0,0 +1,133 @@
+"""
+Recalculates the handicaps after a past round was corrected or deleted or the rating of a course
+was fixed. Every later handicap differential, exceptional reduction and hcLog entry may change.
+
+Instead of replaying the whole history, every CHECKPOINT_INTERVAL-th hcLog entry carries a
+checkpoint: the differentials of the 19 newest games (the next game pushes the oldest of the 20
+out of the window) and their exceptional reductions, newest first. The reductions are the ones
+stored with the games, unless the games were stored before the reductions of later games were
+events and still carry those (see handicapWHS.reducedDifferentials). Together with the WHS index
+and the EGA handicap of the entry itself and the hcLog entries before it (they do not change)
+that is everything needed to continue the calculation after the checkpoint.
+
+A recalculation starts at the newest checkpoint before the day of the change, replays the later
+games day by day like the nightly revision (see revision.py, all rounds of a day use the index
+in effect at the start of the day) and writes the games and hcLog entries that changed in one
+transaction, see Helper.recalculate.
+
+addGame stores the shots adjusted to net double bogey, so the replayed games are adjusted again
+from those: a hole above the limit of the old index stays at that limit. The adjustment is done
+on copies, only the differentials and reductions are written back, so the stored shots do not
+change with every recalculation.
+"""
+
+from itertools import groupby
+
+import handicapEGA as ega
+import handicapWHS as whs
+from dateIndex import toDatetime
+from lowHandicap import RollingLow
+
+# every this many hcLog entries one carries a checkpoint
+CHECKPOINT_INTERVAL = 20
+# the number of games the WHS index is calculated from
+WINDOW = 20
+
+
+def checkpoint(games: list[dict]) -> dict:
+    """
+    The checkpoint of the state after a day.
+
+    Args:
+    games (list[dict]): the newest games, newest first (see Helper.getLastGames)
+
+    Returns:
+    dict: {"differentials", "reductions"} of the 19 newest games, newest first
+    """
+    games = games[: WINDOW - 1]
+    return {
+        "differentials": [game["handicap_dif"] for game in games],
+        "reductions": [game["exceptional_reduction"] for game in games],
+    }
+
+
+def checkpointDue(recent: list[dict]) -> bool:
+    """
+    Whether the next hcLog entry gets a checkpoint.
+
+    Args:
+    recent (list[dict]): the newest hcLog entries before the day of the next one, newest first
+
+    Returns:
+    bool: True if none of the last CHECKPOINT_INTERVAL - 1 entries has one
+    """
+    return not any("checkpoint" in entry for entry in recent[: CHECKPOINT_INTERVAL - 1])
+
+
+def matches(entry: dict, games: list[dict]) -> bool:
+    """
+    Checks that the games before a checkpoint are still the ones it was taken from,
+    e.g. that no game before it was changed without a recalculation.
+
+    Args:
+    entry (dict): the hcLog entry with the checkpoint
+    games (list[dict]): the newest games up to the entry, newest first
+
+    Returns:
+    bool: True if the checkpoint can be used
+    """
+    return [game["handicap_dif"] for game in games[: WINDOW - 1]] == entry["checkpoint"]["differentials"]
+
+
+def replay(
+    window: list[dict],
+    rounds: list[dict],
+    courses: dict[str, dict],
+    log: list[dict],
+    handicapIndex: float | None,
+    egaHandicap: float | None,
+) -> list[dict]:
+    """
+    Calculates the handicaps of a date ordered sequence of games after a checkpoint, one hcLog
+    entry per day. Nothing is read from or written to the db.
+
+    Args:
+    window (list[dict]): the newest games before the first round, oldest first, with their
+        exceptional reductions at the checkpoint
+    rounds (list[dict]): the games to replay, oldest first. Get their handicap_dif,
+        exceptional_reduction, reduction_event and the shots adjusted to net double bogey like in addGame
+    courses (dict[str, dict]): the courses by courseID
+    log (list[dict]): the hcLog entries before the first round, oldest first, at least those of
+        the year before it and the one in effect at its start
+    handicapIndex (float | None): the WHS index before the first round, None if there is none
+    egaHandicap (float | None): the EGA handicap before the first round, None if there is none
+
+    Returns:
+    list[dict]: the hcLog entries, oldest first
+    """
+    window = list(window)
+    low = RollingLow((toDatetime(entry["date"]), entry["whs"]) for entry in log)
+    recent = log[::-1][: CHECKPOINT_INTERVAL - 1]
+    entries = []
+
+    for _, day in groupby(rounds, key=lambda game: toDatetime(game["date"]).date()):
+        day = list(day)
+        # all rounds of a day are calculated with the index at the start of the day
+        dayIndex = 54.0 if handicapIndex is None else handicapIndex
+        for game in day:
+            course = courses[game["courseID"]]
+            whs.handicapDifferential(game, course, dayIndex)
+            window.append(game)
+            del window[:-WINDOW]
+            egaHandicap = ega.calculateNewHandicap(game, int(game["cba"]), egaHandicap, course)
+
+        gameDate = toDatetime(day[-1]["date"])
+        handicapIndex = whs.handicap(window[::-1], low.low(gameDate))
+        entry = {"whs": handicapIndex, "ega": egaHandicap, "date": gameDate.isoformat()}
+        if checkpointDue(recent):
+            entry["checkpoint"] = checkpoint(window[::-1])
+        entries.append(entry)
+        low.append(gameDate, handicapIndex)
+        recent.insert(0, entry)
+        del recent[CHECKPOINT_INTERVAL - 1 :]
+    return entries
@@ -0,0 +1,187 @@
+# compact in memory representation of the games and hcLog documents
+from array import array
+from collections.abc import Mapping, MutableMapping
+from datetime import datetime, timedelta
+
+# the ways an iso-string can be written, a date is stored with the one that gives back the original string
+_DATE_FORMATS = [
+    lambda dt: dt.date().isoformat(),
+    lambda dt: dt.isoformat(),
+    lambda dt: dt.isoformat(timespec="microseconds"),
+    lambda dt: dt.isoformat(timespec="seconds"),
+    lambda dt: dt.isoformat(timespec="minutes"),
+]
+
+
+class _Record(MutableMapping):
+    """
+    Base class of the records. The fields in _FIELDS are stored in slots of the same name,
+    the date as ordinal day and microseconds of the day, all other fields in extra.
+    A record can be used like the document dict it was created from.
+    """
+
+    __slots__ = ("doc_id", "extra", "_dateOrdinal", "_dateMicros", "_dateFormat", "_dateText")
+    _FIELDS: tuple = ()
+    _FIELD_SET: frozenset = frozenset()
+
+    def __init__(self, doc: dict, doc_id: int | None = None):
+        self.doc_id = getattr(doc, "doc_id", doc_id)
+        self.extra = None
+        self._dateText = None
+        for key, value in doc.items():
+            self[key] = value
+
+    @classmethod
+    def fromDoc(cls, doc: dict, doc_id: int | None = None):
+        """
+        Creates the record from a document (dict or tinyDB Document).
+        """
+        return cls(doc, doc_id)
+
+    def toDoc(self) -> dict:
+        """
+        Returns:
+        dict: the document the record was created from
+        """
+        return {key: self._export(key) for key in self}
+
+    def _export(self, key: str):
+        return self[key]
+
+    @property
+    def date(self) -> datetime:
+        """
+        The date as datetime (without parsing the iso-string)
+        """
+        return datetime.fromordinal(self._dateOrdinal) + timedelta(microseconds=self._dateMicros)
+
+    @property
+    def dateOrdinal(self) -> int:
+        return self._dateOrdinal
+
+    def _setDate(self, value: str) -> None:
+        dt = datetime.fromisoformat(value)
+        self._dateOrdinal = dt.toordinal()
+        self._dateMicros = (
+            (dt.hour * 3600 + dt.minute * 60 + dt.second) * 1_000_000 + dt.microsecond
+        )
+        self._dateText = None
+        if dt.tzinfo is None:
+            for i, dateFormat in enumerate(_DATE_FORMATS):
+                if dateFormat(dt) == value:
+                    self._dateFormat = i
+                    return
+        # keep strings that can not be written again the same way (e.g. time zones)
+        self._dateText = value
+
+    def _getDate(self) -> str:
+        if self._dateText is not None:
+            return self._dateText
+        return _DATE_FORMATS[self._dateFormat](self.date)
+
+    def __getitem__(self, key: str):
+        if key == "date":
+            try:
+                return self._getDate()
+            except AttributeError:
+                raise KeyError(key)
+        if key in self._FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value) -> None:
+        if key == "date":
+            self._setDate(value)
+        elif key in self._FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        if key == "date":
+            del self._dateOrdinal, self._dateMicros
+            self._dateText = None
+        elif key in self._FIELD_SET:
+            delattr(self, key)
+        else:
+            del self.extra[key]
+
+    def __contains__(self, key: str) -> bool:
+        if key == "date":
+            return hasattr(self, "_dateOrdinal")
+        if key in self._FIELD_SET:
+            return hasattr(self, key)
+        return self.extra is not None and key in self.extra
+
+    def __iter__(self):
+        if hasattr(self, "_dateOrdinal"):
+            yield "date"
+        for key in self._FIELDS:
+            if hasattr(self, key):
+                yield key
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, _Record):
+            other = other.toDoc()
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return self.toDoc() == dict(other)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.toDoc()!r})"
+
+
+class Game(_Record):
+    """
+    A game with the shots stored as array("b") and the date as ordinal integers.
+    """
+
+    __slots__ = (
+        "game_id",
+        "courseID",
+        "shots",
+        "pcc",
+        "cba",
+        "is9Hole",
+        "handicap_dif",
+        "exceptional_reduction",
+        "reduction_event",
+        "handicap_allowance",
+    )
+    _FIELDS = __slots__
+    _FIELD_SET = frozenset(__slots__)
+
+    def __setitem__(self, key: str, value) -> None:
+        if key == "shots":
+            value = array("b", value)
+        super().__setitem__(key, value)
+
+    def _export(self, key: str):
+        value = self[key]
+        return value.tolist() if key == "shots" else value
+
+
+class HandicapLogEntry(_Record):
+    """
+    A hcLog entry with the date stored as ordinal integers.
+    """
+
+    __slots__ = ("whs", "ega")
+    _FIELDS = __slots__
+    _FIELD_SET = frozenset(__slots__)
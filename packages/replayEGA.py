@@ -0,0 +1,74 @@
+# replays a player's whole history through the EGA calculation, e.g. after a course rating was corrected
+from collections.abc import Iterable, Iterator
+
+from course import Course, compileCourse
+from handicapEGA import calculateAdjustment, convertToStableford, initialHandicap
+
+
+class _CourseCache:
+    """
+    Looks up and compiles every course once.
+    """
+
+    def __init__(self, courses: dict[str, dict] | Iterable[dict]):
+        if not isinstance(courses, dict):
+            courses = {course["courseID"]: course for course in courses}
+        self._courses = courses
+        self._compiled = {}
+
+    def get(self, courseID: str) -> Course:
+        course = self._compiled.get(courseID)
+        if course is None:
+            doc = self._courses.get(courseID)
+            if doc is None:
+                raise KeyError(f"Could not find the course {courseID}.")
+            course = compileCourse(doc)
+            self._compiled[courseID] = course
+        return course
+
+
+def replay(
+    rounds: Iterable[dict],
+    courses: dict[str, dict] | Iterable[dict],
+    handicap: float | None = None,
+) -> Iterator[dict]:
+    """
+    Calculates the EGA handicap after every round of a date ordered sequence of rounds.
+    Gives the same results as calling calculateNewHandicap round by round, but every
+    course is only looked up and compiled once and nothing is read from or written to the db.
+
+    Args:
+    rounds (Iterable[dict]): the games, oldest first
+    courses (dict[str, dict] | Iterable[dict]): the courses by courseID or a list of courses
+    handicap (float | None): the handicap before the first round. None if the player has no handicap yet
+
+    Yields:
+    dict: {"game_id", "date", "ega"} the handicap after each round
+    """
+    cache = _CourseCache(courses)
+    for game in rounds:
+        course = cache.get(game["courseID"])
+        is9Hole = game["is9Hole"]
+
+        if handicap is None:
+            handicap = initialHandicap(convertToStableford(game["shots"], course.par), is9Hole)
+        else:
+            handicapStrokes = course.egaPlayingHandicap(is9Hole, handicap)
+            adjustedPar = course.spread(handicapStrokes, is9Hole)
+            stableford = convertToStableford(game["shots"], adjustedPar)
+            if is9Hole:
+                stableford += 18
+            handicap = round(handicap + calculateAdjustment(stableford, handicap, int(game["cba"]), is9Hole), 1)
+
+        yield {"game_id": game.get("game_id"), "date": game["date"], "ega": handicap}
+
+
+def replayHandicap(
+    rounds: Iterable[dict],
+    courses: dict[str, dict] | Iterable[dict],
+    handicap: float | None = None,
+) -> list[dict]:
+    """
+    Same as replay but returns the whole trajectory as a list.
+    """
+    return list(replay(rounds, courses, handicap))
@@ -0,0 +1,190 @@
+"""
+The nightly WHS revision. Rounds posted with Helper.queueGame wait in the pending table,
+the revision adds all rounds of the days before today in date order and writes one hcLog
+entry per day, so posting a round stays cheap and the WHS calculation runs once a day.
+
+Every day is revised in one transaction and its rounds are removed from the pending table
+in the same transaction. If the job is interrupted it continues with the first day that is
+still pending when it is started again; rounds that are already in the games table are not
+added twice.
+
+The standalone job first derives the pcc of the queued rounds from the whole field of every
+course and day (see playingConditions.py).
+
+The revision only has to run once a day, afterwards every pending round was played today.
+markRevised leaves a stamp with the date in the db directory, so main.py can skip the revision
+(and opening the db) when it is started again on the same day.
+
+Runs when main.py is started or standalone (e.g. from cron) with:
+    python packages/revision.py [--db ./db] [--backend tinydb] [--today 2025-01-31]
+"""
+
+import argparse
+from collections import defaultdict
+from datetime import date, datetime
+import os
+
+from tinydb import where
+import handicapEGA as ega
+from dateIndex import toDatetime
+from helper import Helper
+from lazyImport import lazyImport
+
+# loads numpy, which main.py only needs on the first start of a day
+playingConditions = lazyImport("playingConditions")
+
+# the name of the stamp file written by markRevised
+STAMP = ".revised"
+
+
+def pendingDays(helper: Helper, today: date | None = None) -> dict[date, list[dict]]:
+    """
+    Returns the pending rounds played before today by day, oldest day first.
+
+    Args:
+    helper (Helper): the helper with the pending table
+    today (date | None): rounds played on or after this day stay pending. By default today
+
+    Returns:
+    dict[date, list[dict]]: the rounds of every day in date order
+    """
+    today = date.today() if today is None else today
+    days = defaultdict(list)
+    for doc in helper.pending.all():
+        day = toDatetime(doc["date"]).date()
+        if day < today:
+            days[day].append(doc)
+    return {
+        day: sorted(days[day], key=lambda doc: (toDatetime(doc["date"]), doc.doc_id))
+        for day in sorted(days)
+    }
+
+
+def reviseDay(helper: Helper, rounds: list[dict]) -> dict:
+    """
+    Adds the rounds of one day and writes the hcLog entry of the day. All rounds of the day
+    use the handicap index in effect at the start of the day.
+
+    Args:
+    helper (Helper): the helper of the player
+    rounds (list[dict]): the pending rounds of the day in date order
+
+    Returns:
+    dict: the hcLog entry of the day
+    """
+    dayStart = datetime.combine(toDatetime(rounds[0]["date"]).date(), datetime.min.time())
+    previous = helper.logIndex.before(dayStart, inclusive=False)
+    handicapIndex = 54.0 if previous is None else previous["whs"]
+    egaHC = None if previous is None else previous["ega"]
+
+    courses = {course["courseID"]: course for course in helper.getCourses(rounds)}
+    gameIDs = [doc["game_id"] for doc in rounds]
+    # added by a run that was interrupted before it could remove them from the pending table
+    revised = {doc["game_id"] for doc in helper.games.search(where("game_id").one_of(gameIDs))}
+
+    with helper.transaction():
+        for doc in rounds:
+            game = dict(doc)
+            course = courses[game["courseID"]]
+            if game["game_id"] not in revised:
+                helper._insertGame(game, course, handicapIndex)
+            egaHC = ega.calculateNewHandicap(game, int(game["cba"]), egaHC, course)
+
+        entry = helper._logHandicap(helper.calculateWHS(), egaHC, toDatetime(rounds[-1]["date"]))
+        helper.pending.remove(doc_ids=[doc.doc_id for doc in rounds])
+    return entry
+
+
+def revise(helper: Helper, today: date | None = None) -> dict:
+    """
+    Revises the handicaps with all pending rounds played before today.
+
+    Args:
+    helper (Helper): the helper of the player
+    today (date | None): rounds played on or after this day stay pending. By default today
+
+    Returns:
+    dict: {"days": number of revised days, "rounds": number of added rounds}
+    """
+    report = {"days": 0, "rounds": 0}
+    if helper.pending is None:
+        return report
+    for rounds in pendingDays(helper, today).values():
+        reviseDay(helper, rounds)
+        report["days"] += 1
+        report["rounds"] += len(rounds)
+    return report
+
+
+def needsRevision(directory: str, today: date | None = None) -> bool:
+    """
+    Checks whether the db in directory was not revised today yet, see markRevised.
+
+    Args:
+    directory (str): the directory of the database
+    today (date | None): the day of the revision. By default today
+
+    Returns:
+    bool: True if the revision has to run
+    """
+    today = date.today() if today is None else today
+    try:
+        with open(os.path.join(directory, STAMP)) as file:
+            return file.read().strip() != today.isoformat()
+    except (FileNotFoundError, NotADirectoryError):
+        return True
+
+
+def markRevised(directory: str, today: date | None = None) -> None:
+    """
+    Stamps the db in directory as revised on today.
+    """
+    today = date.today() if today is None else today
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, STAMP), "w") as file:
+        file.write(today.isoformat())
+
+
+def reviseClub(club, today: date | None = None) -> dict[str, dict]:
+    """
+    Revises the handicaps of every player of a club (see club.py).
+
+    Returns:
+    dict[str, dict]: the report of revise by playerID
+    """
+    return {playerID: revise(club.player(playerID), today) for playerID in club.playerIDs()}
+
+
+def main(argv: list[str] | None = None) -> dict:
+    from backend import openBackend
+    from club import Club
+
+    parser = argparse.ArgumentParser(description="Revises the WHS handicaps with the pending rounds.")
+    parser.add_argument("--db", default="./db", help="the directory of the database")
+    parser.add_argument(
+        "--backend", default=os.environ.get("MAUER_DB_BACKEND", "tinydb"), help="tinydb, sqlite or journal"
+    )
+    parser.add_argument("--today", type=date.fromisoformat, default=None, help="revise the rounds before this day")
+    args = parser.parse_args(argv)
+
+    backend = openBackend(args.backend, args.db)
+    try:
+        games, courses, hcLog = backend.tables()
+        club = Club(backend)
+        helpers = {"": Helper(games, courses, hcLog, pending=backend.table("pending"))}
+        helpers.update((playerID, club.player(playerID)) for playerID in club.playerIDs())
+        # the pcc is calculated from the rounds of all players before any of them is added
+        playingConditions.updatePending(list(helpers.values()), args.today)
+        report = {playerID: revise(helper, args.today) for playerID, helper in helpers.items()}
+        markRevised(args.db, args.today)
+    finally:
+        backend.close()
+
+    for playerID, result in report.items():
+        if result["rounds"]:
+            print(f"{playerID or "default"}: {result["rounds"]} rounds on {result["days"]} days revised")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+from datetime import datetime
+
+NUMBER = (int, float)
+
+# required fields of the documents, see test/real_data for examples
+GAME_SCHEMA = {
+    "game_id": str,
+    "courseID": str,
+    "date": str,
+    "shots": list,
+    "pcc": NUMBER,
+    "cba": NUMBER,
+    "is9Hole": bool,
+}
+
+COURSE_SCHEMA = {
+    "courseID": str,
+    "course_rating": NUMBER,
+    "slope_rating": NUMBER,
+    "par": list,
+    "handicap_stroke_index": list,
+}
+
+
+def _checkFields(doc: dict, schema: dict) -> None:
+    if not isinstance(doc, dict):
+        raise ValueError(f"Expected a JSON object but got {type(doc).__name__}.")
+    for field, types in schema.items():
+        if field not in doc:
+            raise ValueError(f"Missing field: {field}")
+        value = doc[field]
+        # bool is a subclass of int but never a valid number here
+        if not isinstance(value, types) or (types is NUMBER and isinstance(value, bool)):
+            raise ValueError(f"Invalid type of field {field}: {type(value).__name__}")
+
+
+def _checkHoles(values: list, field: str) -> None:
+    if len(values) not in (9, 18):
+        raise ValueError(f"{field} needs 9 or 18 holes but has {len(values)}.")
+    if not all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+        raise ValueError(f"{field} may only contain whole numbers.")
+
+
+def validateGame(doc: dict) -> None:
+    """
+    Checks that a game document has all the fields used by the helper and handicap packages.
+
+    Args:
+    doc (dict): the game
+
+    Raises:
+    ValueError: if the game is invalid
+    """
+    _checkFields(doc, GAME_SCHEMA)
+    _checkHoles(doc["shots"], "shots")
+    if not all(shot > 0 for shot in doc["shots"]):
+        raise ValueError("shots have to be positive.")
+    if doc["is9Hole"] != (len(doc["shots"]) == 9):
+        raise ValueError(f"is9Hole is {doc["is9Hole"]} but {len(doc["shots"])} holes were played.")
+    if not (-1 <= doc["pcc"] <= 3):
+        raise ValueError(f"PCC can only be between -1 and +3. Given value was {doc["pcc"]}")
+    if not (-2 <= doc["cba"] <= 1):
+        raise ValueError(f"CBA can only be between -2 and +1. Given value was {doc["cba"]}")
+    try:
+        datetime.fromisoformat(doc["date"])
+    except ValueError:
+        raise ValueError(f"Invalid date: {doc["date"]}")
+
+
+def validateCourse(doc: dict) -> None:
+    """
+    Checks that a course document has all the fields used by the helper and handicap packages.
+
+    Args:
+    doc (dict): the course
+
+    Raises:
+    ValueError: if the course is invalid
+    """
+    _checkFields(doc, COURSE_SCHEMA)
+    _checkHoles(doc["par"], "par")
+    if not (55 <= doc["slope_rating"] <= 155):
+        raise ValueError(f"Invalid slope rating: {doc["slope_rating"]}. Must be between 55 and 155.")
+    strokeIndex = doc["handicap_stroke_index"]
+    _checkHoles(strokeIndex, "handicap_stroke_index")
+    if len(strokeIndex) != len(doc["par"]):
+        raise ValueError("handicap_stroke_index and par need the same amount of holes.")
+    # 9 hole courses may keep the stroke indexes of the 18 hole course
+    if len(set(strokeIndex)) != len(strokeIndex) or not all(1 <= i <= 18 for i in strokeIndex):
+        raise ValueError("handicap_stroke_index has to contain unique numbers from 1 to 18.")
@@ -0,0 +1,318 @@
+"""
+The scorecards: Helper.export_scorecard prints one, prepareCards and exportScorecards print the
+scorecards of a whole tournament at once.
+
+The table rows are cached by course version and playing handicap, and the parts of a page that
+are the same for every player of a course (title, ratings, holes, par, stroke index and the grid)
+are laid out once per course as a template. A card only draws the template and adds the date,
+the handicap, the name and the handicap strokes of the player. Call invalidateScorecards after
+changing a course; export_scorecard does so when it stores overrides.
+
+For a tournament all handicap indexes and table rows are resolved before the first page is
+rendered and nothing is written to the db. The cards are rendered into one multi page pdf or
+into one pdf per card by worker processes, which are streamed into a zip archive as they are finished.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import re
+import time
+import zipfile
+
+import handicapEGA as ega
+from course import compileCourse
+from lazyImport import lazyImport
+
+# only loaded when the first card is rendered
+fpdf = lazyImport("fpdf")
+
+_UNSAFE = re.compile(r"[^\w.-]+")
+
+# the table rows by courseID, keyed by (course version, playing handicap)
+_rows: dict[str, dict[tuple, list[tuple]]] = {}
+# the page templates by courseID, keyed by the course version
+_templates: dict[str, dict[tuple, dict]] = {}
+
+COLUMNS = ("Loch", "Par", "HCP", "Vorgabe", "Schläge")
+COLUMN_WIDTHS = (3, 3, 3, 3, 5)
+ROW_HEIGHT = 8.0
+CELL_PADDING = 1.5
+FONT = "Helvetica"
+
+
+def courseVersion(course: dict) -> tuple:
+    """
+    The values of a course printed on its scorecards. A course with overridden values
+    (see Helper.scorecard_course) is a different version of the course.
+    """
+    return (
+        course["course_rating"],
+        course["slope_rating"],
+        tuple(course["par"]),
+        tuple(course["handicap_stroke_index"]),
+    )
+
+
+def invalidateScorecards(courseID: str) -> None:
+    """
+    Drops the cached table rows and the template of a course, e.g. after its ratings were overridden.
+    """
+    _rows.pop(courseID, None)
+    _templates.pop(courseID, None)
+
+
+def prepare_table_data(
+    course: dict, hci: float
+) -> list[tuple[str, str, str, str, str]]:
+    """Generates a tuple of tuples representing rows in the scorecard table
+
+    Args:
+        course (dict): The course played on
+        hci (float): The handicap of the player
+
+    Returns:
+        tuple[tuple[str, str, str, str, str], ...]:
+        A tuple of tuples representing the rows of the table
+    """
+    compiled = compileCourse(course)
+    # a 9 hole course is printed as a 9 hole round
+    is9Hole = len(compiled.par) == 9
+    hc_strokes = compiled.egaPlayingHandicap(is9Hole, hci)
+
+    # all players with the same playing handicap get the same rows
+    cache = _rows.setdefault(course.get("courseID"), {})
+    key = (courseVersion(course), hc_strokes)
+    rows = cache.get(key)
+    if rows is None:
+        rows = cache[key] = _tableRows(course, compiled, hc_strokes, is9Hole)
+    return list(rows)
+
+
+def _tableRows(course: dict, compiled, hc_strokes: int, is9Hole: bool) -> list[tuple]:
+    par = compiled.par
+    allocation_marker = "/"
+    if hc_strokes < 0:
+        allocation_marker = "="
+    strokes = ega.spreadPlayingHC(course, hc_strokes, is9Hole)
+    stroke_allocation = list(map(abs, [x - y for x, y in zip(strokes, par)]))
+
+    # Hole#, Par, HCP, hcp-strokes, shots taken (empty)
+    def hole(i: int) -> tuple:
+        return tuple(
+            map(
+                str,
+                (
+                    i + 1,
+                    par[i],
+                    course["handicap_stroke_index"][i],
+                    allocation_marker * stroke_allocation[i],
+                    "",
+                ),
+            )
+        )
+
+    rows = [hole(i) for i in range(0, 9)]
+    rows.append(("OUT", str(compiled.parFront), "", "", ""))
+
+    if len(course["par"]) == 18:
+        rows.extend(hole(i) for i in range(9, 18))
+        rows.append(("IN", str(compiled.parBack), "", "", ""))
+    rows.append(("GESAMT", str(compiled.parTotal), "", str(hc_strokes), ""))
+    return rows
+
+
+def scorecardTemplate(course: dict) -> dict:
+    """
+    Lays out the parts of the scorecard of a course that are the same for every player.
+
+    Returns:
+    dict: {"ops": the fpdf calls drawing the template, "headerX": where the player's header fields
+        start, "headerY": their baseline, "strokesX": the x of the handicap strokes column,
+        "baselines": the baseline of every table row}
+    """
+    cache = _templates.setdefault(course.get("courseID"), {})
+    version = courseVersion(course)
+    template = cache.get(version)
+    if template is not None:
+        return template
+
+    # only used to measure the texts
+    pdf = fpdf.FPDF()
+    pdf.add_page()
+    left, top = pdf.l_margin, pdf.t_margin
+    right = pdf.w - pdf.r_margin
+    ops = [("set_font", (FONT, "B", 22)), ("text", (left, top + 8, f"Kurs: {course["courseID"]}"))]
+
+    headerY = top + 20
+    headerX = left
+    for label, value in (("CR:", course["course_rating"]), ("SR:", course["slope_rating"]), ("PCC/CBA:", "____")):
+        headerX = _labelled(pdf, ops, headerX, headerY, label, value)
+    ops.append(("line", (left, headerY + 3, right, headerY + 3)))
+
+    # the table: a header row and one row per hole and sum
+    rows = prepare_table_data(course, 54.0)
+    total = sum(COLUMN_WIDTHS)
+    widths = [(right - left) * width / total for width in COLUMN_WIDTHS]
+    columnX = [left + sum(widths[:i]) for i in range(len(widths) + 1)]
+    tableTop = headerY + 8
+    rowTops = [tableTop + i * ROW_HEIGHT for i in range(len(rows) + 2)]
+    baselines = [rowTop + ROW_HEIGHT / 2 + 1.8 for rowTop in rowTops[:-1]]
+
+    ops.append(("set_font", (FONT, "B", 14)))
+    ops.extend(("text", (columnX[i] + CELL_PADDING, baselines[0], column)) for i, column in enumerate(COLUMNS))
+    ops.append(("set_font", (FONT, "", 14)))
+    for row, baseline in zip(rows, baselines[1:]):
+        # the handicap strokes and the shots are added per player
+        ops.extend(("text", (columnX[i] + CELL_PADDING, baseline, cell)) for i, cell in enumerate(row[:3]) if cell)
+    ops.extend(("line", (left, y, right, y)) for y in rowTops)
+    ops.extend(("line", (x, tableTop, x, rowTops[-1])) for x in columnX)
+
+    template = cache[version] = {
+        "ops": ops,
+        "headerX": headerX,
+        "headerY": headerY,
+        "strokesX": columnX[3] + CELL_PADDING,
+        "baselines": baselines[1:],
+    }
+    return template
+
+
+def _labelled(pdf: "fpdf.FPDF", ops: list, x: float, y: float, label: str, value) -> float:
+    # a bold label followed by its value, returns where the next field starts
+    pdf.set_font(FONT, "B", 14)
+    ops.append(("set_font", (FONT, "B", 14)))
+    ops.append(("text", (x, y, label)))
+    x += pdf.get_string_width(label + " ")
+    pdf.set_font(FONT, "", 14)
+    ops.append(("set_font", (FONT, "", 14)))
+    ops.append(("text", (x, y, str(value))))
+    return x + pdf.get_string_width(f"{value}   ")
+
+
+def render_scorecard_page(
+    pdf: "fpdf.FPDF", course: dict, hci: float, data: list[tuple], name: str | None = None, today: str | None = None
+) -> None:
+    """Adds a page with the scorecard to the pdf
+
+    Args:
+        pdf (fpdf.FPDF): The document the page is added to
+        course (dict): The course as returned by Helper.scorecard_course
+        hci (float): The handicap of the player
+        data (list[tuple]): The rows of the table, see prepare_table_data
+        name (str | None, optional): The name of the player. Defaults to None (left blank).
+        today (str | None, optional): The date printed on the card. Defaults to today.
+    """
+    template = scorecardTemplate(course)
+    pdf.add_page()
+    for method, args in template["ops"]:
+        getattr(pdf, method)(*args)
+
+    if today is None:
+        today = datetime.now().strftime("%x")  # uses local date format
+    ops = []
+    x, y = template["headerX"], template["headerY"]
+    for label, value in (("Datum:", today), ("HCI:", hci), ("Name:", "" if name is None else name)):
+        x = _labelled(pdf, ops, x, y, label, value)
+    for method, args in ops:
+        getattr(pdf, method)(*args)
+
+    strokesX = template["strokesX"]
+    for row, baseline in zip(data, template["baselines"]):
+        if row[3]:
+            pdf.text(strokesX, baseline, row[3])
+
+
+def prepareCards(pairs: list[tuple], is_whs: bool | None = None, use_last_values: bool | None = None) -> list[dict]:
+    """
+    Resolves everything printed on the scorecards, see Helper.export_scorecard.
+
+    Args:
+    pairs (list[tuple[str | None, Helper, dict]]): (name of the player, helper of the player, course)
+    is_whs (bool | None): print the WHS or the EGA handicap
+    use_last_values (bool | None): use the last values stored in the courses
+
+    Returns:
+    list[dict]: {"name", "course", "hci", "rows"} for every card
+    """
+    cards = []
+    for name, helper, course in pairs:
+        courseCopy = helper.scorecard_course(course, is_whs, use_last_values=use_last_values, write=False)
+        hci = helper.get_last_hci(courseCopy["is_whs_scorecard"])
+        # players without a handicap yet play with the maximum, like in addGame
+        hci = 54.0 if hci is None else hci
+        cards.append({"name": name, "course": courseCopy, "hci": hci, "rows": prepare_table_data(courseCopy, hci)})
+    return cards
+
+
+def renderCards(cards: list[dict], today: str | None = None) -> bytes:
+    """
+    Renders the cards into one pdf with one page per card.
+
+    Returns:
+    bytes: the pdf
+    """
+    pdf = fpdf.FPDF()
+    for card in cards:
+        render_scorecard_page(pdf, card["course"], card["hci"], card["rows"], card["name"], today)
+    return bytes(pdf.output())
+
+
+def cardFilename(number: int, card: dict) -> str:
+    name = _UNSAFE.sub("_", f"{card["name"] or "player"}_{card["course"]["courseID"]}")
+    return f"{number:04}_{name}.pdf"
+
+
+def _renderChunk(chunk: list[tuple[int, dict]], today: str) -> list[tuple[str, bytes]]:
+    # runs in the worker processes
+    return [(cardFilename(number, card), renderCards([card], today)) for number, card in chunk]
+
+
+def exportScorecards(
+    cards: list[dict],
+    output,
+    single: bool = False,
+    workers: int | None = None,
+    chunkSize: int = 16,
+) -> dict:
+    """
+    Renders the cards of prepareCards.
+
+    Args:
+    cards (list[dict]): the cards returned by prepareCards
+    output (str | file): the pdf (single) or the zip archive the cards are written to
+    single (bool): one multi page pdf instead of a zip archive with one pdf per card
+    workers (int | None): number of processes rendering the pdfs of the zip archive.
+        0 renders in this process, None uses as many processes as the machine has cpus
+    chunkSize (int): number of cards a worker renders per task
+
+    Returns:
+    dict: {"cards", "seconds", "cards_per_second"}
+    """
+    start = time.perf_counter()
+    today = datetime.now().strftime("%x")
+
+    if single:
+        data = renderCards(cards, today)
+        if isinstance(output, str):
+            with open(output, "wb") as file:
+                file.write(data)
+        else:
+            output.write(data)
+    else:
+        numbered = list(enumerate(cards))
+        chunks = [numbered[i : i + chunkSize] for i in range(0, len(numbered), chunkSize)]
+        # the pdfs are compressed already
+        with zipfile.ZipFile(output, "w", zipfile.ZIP_STORED) as archive:
+            if workers == 0 or len(chunks) < 2:
+                for chunk in chunks:
+                    for filename, data in _renderChunk(chunk, today):
+                        archive.writestr(filename, data)
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    # written in order as soon as the next chunk is finished
+                    for files in executor.map(_renderChunk, chunks, [today] * len(chunks)):
+                        for filename, data in files:
+                            archive.writestr(filename, data)
+
+    seconds = time.perf_counter() - start
+    return {"cards": len(cards), "seconds": seconds, "cards_per_second": len(cards) / seconds if seconds else 0.0}
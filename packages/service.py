@@ -0,0 +1,457 @@
+"""
+A local HTTP/JSON service around the Helper, so the UI, the clubhouse terminals and the scoring
+app can use the same database at the same time.
+
+    GET  /games?n=0&m=19              getLastGames
+    GET  /hclog?n=0&m=365&startDate=  getHCLog
+    GET  /hci?whs=true                get_last_hci
+    POST /games                       addGame   {"courseID", "shots", "is9Hole", "pcc", "cba", "date"}
+    POST /courses                     addCourse {"courseID", "courseRating", "slopeRating", "par", "strokeIndex"}
+    POST /scorecard                   export_scorecard {"courseID", "is_whs", ...}, answers with the pdf
+    GET  /metrics                     the latency (p50/p99) of every route and the number of flushes
+
+Reads are answered directly from the in memory indexes of the Helper. All changes go through
+one writer task: the posts that arrive while it is busy are applied together in one transaction,
+so a burst of posts is written with one flush. The writer runs in the event loop as well, so a
+read never sees half of a change (the indexes are changed in place, a thread would need locks
+around every read). The price is that no request is answered while a batch is written, including
+its flush and the pdf of a scorecard. /metrics reports these pauses as "writer": with 50 clients
+and a fifth of the requests posts (see benchmark.benchService) a batch takes 2.3 ms (p50) and
+7 ms (p99) on the journal and SQLite backend, 33 / 68 ms on tinyDB, which rewrites its file.
+
+Start the service and drive it with the load generator with:
+    python packages/service.py serve [--db ./db] [--backend journal] [--port 8080]
+    python packages/service.py load [--port 8080] [--clients 20] [--requests 200]
+"""
+
+import argparse
+import asyncio
+from collections import defaultdict, deque
+from datetime import datetime
+from io import BytesIO
+import json
+import math
+import os
+import random
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from helper import Helper
+
+# the number of posts that are written with one flush at most
+MAX_BATCH = 256
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+
+
+class LatencyMetrics:
+    """
+    Keeps the newest latencies of every route for the p50/p99 report.
+    """
+
+    def __init__(self, size: int = 10_000):
+        self._samples = defaultdict(lambda: deque(maxlen=size))
+        self._counts = defaultdict(int)
+
+    def record(self, route: str, seconds: float) -> None:
+        self._samples[route].append(seconds)
+        self._counts[route] += 1
+
+    def report(self) -> dict[str, dict]:
+        """
+        Returns:
+        dict[str, dict]: {"count", "p50_ms", "p99_ms"} by route
+        """
+        return {
+            route: {
+                "count": self._counts[route],
+                "p50_ms": percentile(samples, 50) * 1e3,
+                "p99_ms": percentile(samples, 99) * 1e3,
+            }
+            for route, samples in sorted(self._samples.items())
+        }
+
+
+def percentile(samples, p: float) -> float:
+    """
+    The nearest-rank percentile of the samples, 0 if there are none.
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+class RequestError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class Service:
+    def __init__(self, helper: Helper, maxBatch: int = MAX_BATCH):
+        """
+        Args:
+        helper (Helper): the helper the requests are answered with
+        maxBatch (int): the number of posts that are written with one flush at most
+        """
+        self.helper = helper
+        self.maxBatch = maxBatch
+        self.metrics = LatencyMetrics()
+        self.posts = 0
+        self.flushes = 0
+        self.server = None
+        self._queue = None
+        self._writer = None
+        self._routes = {
+            ("GET", "/games"): self._getLastGames,
+            ("GET", "/hclog"): self._getHCLog,
+            ("GET", "/hci"): self._getLastHCI,
+            ("GET", "/metrics"): self._getMetrics,
+            ("POST", "/games"): self._addGame,
+            ("POST", "/courses"): self._addCourse,
+            ("POST", "/scorecard"): self._exportScorecard,
+        }
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> asyncio.Server:
+        """
+        Starts the writer and the server. Port 0 picks a free port, see port.
+        """
+        # built now, so no read has to scan a table
+        self.helper.gameIndex, self.helper.logIndex
+        self._queue = asyncio.Queue()
+        self._writer = asyncio.create_task(self._writeLoop())
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server
+
+    @property
+    def port(self) -> int:
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """
+        Stops the server after the posts already received are written.
+        """
+        self.server.close()
+        await self.server.wait_closed()
+        await self._queue.join()
+        self._writer.cancel()
+
+    async def submit(self, func, *args, **kwargs):
+        """
+        Lets the writer task call func and returns its result once it is written.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((future, func, args, kwargs))
+        return await future
+
+    async def _writeLoop(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            # the handlers that are ready to run may add their posts to this batch
+            await asyncio.sleep(0)
+            while len(batch) < self.maxBatch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            # blocks the event loop, see the module docstring; reported as "writer" in /metrics
+            start = time.perf_counter()
+            self._writeBatch(batch)
+            self.metrics.record("writer", time.perf_counter() - start)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _writeBatch(self, batch: list[tuple]) -> None:
+        # writes all calls at once; if one fails nothing was written and they are repeated one by one
+        self.posts += len(batch)
+        results = None
+        if self.helper.transactional and len(batch) > 1:
+            try:
+                with self.helper.transaction():
+                    results = [(True, func(*args, **kwargs)) for _, func, args, kwargs in batch]
+                self.flushes += 1
+            except Exception:
+                results = None
+
+        if results is None:
+            results = []
+            for _, func, args, kwargs in batch:
+                try:
+                    with self.helper.transaction():
+                        results.append((True, func(*args, **kwargs)))
+                    self.flushes += 1
+                except Exception as e:
+                    results.append((False, e))
+
+        for (future, *_), (ok, value) in zip(batch, results):
+            if future.cancelled():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await readMessage(reader, request=True)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                start = time.perf_counter()
+                url = urlsplit(target)
+                status, contentType, payload = await self.dispatch(method, url.path, parse_qs(url.query), body)
+                self.metrics.record(f"{method} {url.path}", time.perf_counter() - start)
+
+                keepAlive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                    f"Content-Type: {contentType}\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {"keep-alive" if keepAlive else "close"}\r\n\r\n".encode()
+                    + payload
+                )
+                await writer.drain()
+                if not keepAlive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method: str, path: str, query: dict, body: bytes) -> tuple[int, str, bytes]:
+        """
+        Answers one request.
+
+        Returns:
+        tuple[int, str, bytes]: the status, the content type and the body of the response
+        """
+        route = self._routes.get((method, path))
+        try:
+            if route is None:
+                raise RequestError(404, f"Unknown route {method} {path}.")
+            arguments = {key: values[-1] for key, values in query.items()}
+            if method == "POST":
+                try:
+                    arguments.update(json.loads(body or b"{}"))
+                except json.JSONDecodeError as e:
+                    raise RequestError(400, f"Invalid json: {e}")
+            result = await route(arguments)
+        except RequestError as e:
+            return e.status, "application/json", json.dumps({"error": str(e)}).encode()
+        except (KeyError, ValueError, TypeError, AttributeError) as e:
+            return 400, "application/json", json.dumps({"error": str(e)}).encode()
+        except Exception as e:
+            return 500, "application/json", json.dumps({"error": repr(e)}).encode()
+
+        if isinstance(result, bytes):
+            return 200, "application/pdf", result
+        return 200, "application/json", json.dumps(result).encode()
+
+    async def _getLastGames(self, arguments: dict) -> list[dict]:
+        games = self.helper.getLastGames(int(arguments.get("n", 0)), int(arguments.get("m", 19)))
+        return [toJSON(doc) for doc in games]
+
+    async def _getHCLog(self, arguments: dict) -> list[dict]:
+        startDate = arguments.get("startDate")
+        log = self.helper.getHCLog(
+            int(arguments.get("n", 0)),
+            int(arguments.get("m", 365)),
+            None if startDate is None else datetime.fromisoformat(startDate),
+        )
+        return [toJSON(doc) for doc in log]
+
+    async def _getLastHCI(self, arguments: dict) -> dict:
+        isWHS = str(arguments.get("whs", "true")).lower() in ("true", "1")
+        return {"hci": self.helper.get_last_hci(isWHS)}
+
+    async def _getMetrics(self, arguments: dict) -> dict:
+        return {"routes": self.metrics.report(), "posts": self.posts, "flushes": self.flushes}
+
+    async def _addGame(self, arguments: dict) -> dict:
+        def addGame() -> dict:
+            gameID = self.helper.addGame(
+                arguments["courseID"],
+                arguments["shots"],
+                arguments["is9Hole"],
+                arguments.get("pcc", 0),
+                arguments.get("cba", 0),
+                arguments.get("date") or datetime.now(),
+            )
+            # read before the next post of the batch changes them
+            return {"game_id": gameID, "whs": self.helper.get_last_hci(True), "ega": self.helper.get_last_hci(False)}
+
+        return await self.submit(addGame)
+
+    async def _addCourse(self, arguments: dict) -> dict:
+        await self.submit(
+            self.helper.addCourse,
+            arguments["courseID"],
+            arguments["courseRating"],
+            arguments["slopeRating"],
+            arguments["par"],
+            arguments["strokeIndex"],
+        )
+        return {"courseID": arguments["courseID"]}
+
+    async def _exportScorecard(self, arguments: dict) -> bytes:
+        courseID = arguments.pop("courseID")
+        courses = self.helper.getCourses([{"courseID": courseID}])
+        if not courses:
+            raise RequestError(404, f"Could not find the course {courseID}.")
+        pdf = BytesIO()
+        # goes through the writer because the overrides are stored in the course
+        await self.submit(self.helper.export_scorecard, pdf, courses[0], **arguments)
+        return pdf.getvalue()
+
+
+def toJSON(doc) -> dict:
+    # records (see records.py) convert themselves back to the document
+    return doc.toDoc() if hasattr(doc, "toDoc") else dict(doc)
+
+
+async def readMessage(reader: asyncio.StreamReader, request: bool) -> tuple | None:
+    """
+    Reads one http message (the subset used by the service and the load generator).
+
+    Returns:
+    tuple | None: (method, target, headers, body) of a request or (status, headers, body)
+        of a response. None if the connection was closed
+    """
+    startLine = await reader.readline()
+    if not startLine:
+        return None
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+    first, second, *_ = startLine.decode("latin-1").split()
+    if request:
+        return first, second, headers, body
+    return int(second), headers, body
+
+
+async def call(reader, writer, method: str, target: str, payload: dict | None = None) -> tuple[int, bytes]:
+    """
+    Sends one request on an open connection and returns the status and body of the response.
+    """
+    body = b"" if payload is None else json.dumps(payload).encode()
+    writer.write(
+        f"{method} {target} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode()
+        + body
+    )
+    await writer.drain()
+    status, _, responseBody = await readMessage(reader, request=False)
+    return status, responseBody
+
+
+async def loadTest(
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    clients: int = 20,
+    requests: int = 200,
+    writeRatio: float = 0.2,
+    courseID: str = "Runde 1",
+    seed: int = 0,
+) -> dict:
+    """
+    The load generator: every client sends its requests one after another on its own connection,
+    a share of writeRatio of them posts an 18 hole round on courseID, the others are reads.
+
+    Returns:
+    dict: {"requests", "errors", "seconds", "per_second", "p50_ms", "p99_ms"} measured by the
+        clients and the metrics of the service
+    """
+    rng = random.Random(seed)
+    latencies = []
+    errors = 0
+    reads = ["/games", "/hclog", "/hci?whs=true", "/hci?whs=false"]
+
+    async def client(number: int) -> None:
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for i in range(requests):
+                if rng.random() < writeRatio:
+                    payload = {
+                        "courseID": courseID,
+                        "shots": [rng.randint(3, 8) for _ in range(18)],
+                        "is9Hole": False,
+                        "date": datetime(2025, 1, 1, 8, number % 60, i % 60).isoformat(),
+                    }
+                    request = ("POST", "/games", payload)
+                else:
+                    request = ("GET", rng.choice(reads), None)
+                start = time.perf_counter()
+                status, _ = await call(reader, writer, *request)
+                latencies.append(time.perf_counter() - start)
+                errors += status != 200
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(number) for number in range(clients)))
+    seconds = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, metrics = await call(reader, writer, "GET", "/metrics")
+    writer.close()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": seconds,
+        "per_second": len(latencies) / seconds,
+        "p50_ms": percentile(latencies, 50) * 1e3,
+        "p99_ms": percentile(latencies, 99) * 1e3,
+        "service": json.loads(metrics),
+    }
+
+
+async def serve(helper: Helper, host: str, port: int) -> None:
+    service = Service(helper)
+    server = await service.start(host, port)
+    print(f"serving on {host}:{service.port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="The local HTTP/JSON service of the helper.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serveCommand = commands.add_parser("serve", help="start the service")
+    serveCommand.add_argument("--db", default="./db", help="the directory of the database")
+    serveCommand.add_argument(
+        "--backend", default=os.environ.get("MAUER_DB_BACKEND", "tinydb"), help="tinydb, sqlite or journal"
+    )
+    loadCommand = commands.add_parser("load", help="drive a running service with the load generator")
+    loadCommand.add_argument("--clients", type=int, default=20)
+    loadCommand.add_argument("--requests", type=int, default=200, help="requests per client")
+    loadCommand.add_argument("--write-ratio", type=float, default=0.2)
+    loadCommand.add_argument("--course", default="Runde 1", help="the course the rounds are posted on")
+    for command in (serveCommand, loadCommand):
+        command.add_argument("--host", default="127.0.0.1")
+        command.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args(argv)
+
+    if args.command == "load":
+        report = asyncio.run(
+            loadTest(args.host, args.port, args.clients, args.requests, args.write_ratio, args.course)
+        )
+        print(json.dumps(report, indent=2))
+        return
+
+    from backend import openBackend
+
+    backend = openBackend(args.backend, args.db)
+    try:
+        games, courses, hcLog = backend.tables()
+        asyncio.run(serve(Helper(games, courses, hcLog, pending=backend.table("pending")), args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        backend.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+from contextlib import contextmanager
+import json
+import os
+import sqlite3
+from tempfile import NamedTemporaryFile
+
+from tinydb.middlewares import Middleware
+from tinydb.storages import Storage, touch
+
+
+class AtomicJSONStorage(Storage):
+    """
+    JSON storage for TinyDB that never leaves a half written file behind.
+    Every write goes to a temporary file next to the database which is fsynced
+    and then renamed over the database file.
+    """
+
+    def __init__(self, path: str, create_dirs: bool = False, encoding: str = None, **kwargs):
+        self._path = path
+        self._encoding = encoding
+        self.kwargs = kwargs
+        # number of physical writes (fsyncs) done by this storage
+        self.writes = 0
+        touch(path, create_dirs=create_dirs)
+
+    def read(self) -> dict | None:
+        with open(self._path, "r", encoding=self._encoding) as file:
+            content = file.read()
+        if not content:
+            return None
+        return json.loads(content)
+
+    def write(self, data: dict) -> None:
+        directory = os.path.dirname(os.path.abspath(self._path))
+        with NamedTemporaryFile(
+            "w", dir=directory, delete=False, encoding=self._encoding, suffix=".tmp"
+        ) as file:
+            try:
+                json.dump(data, file, **self.kwargs)
+                file.flush()
+                os.fsync(file.fileno())
+            except BaseException:
+                file.close()
+                os.remove(file.name)
+                raise
+        os.replace(file.name, self._path)
+        self.writes += 1
+
+    def close(self) -> None:
+        pass
+
+
+class TransactionMiddleware(Middleware):
+    """
+    Buffers all writes done while a transaction is open and hands them to the
+    storage as one single write once the outermost transaction is committed.
+    Outside of a transaction reads and writes are passed through.
+
+    Usage:
+    db = TinyDB(path, storage=TransactionMiddleware(AtomicJSONStorage))
+    """
+
+    def __init__(self, storage_cls=AtomicJSONStorage):
+        super().__init__(storage_cls)
+        self._depth = 0
+        self._data = None
+        self._dirty = False
+        # a nested transaction was rolled back, the outermost one can not be committed
+        self._aborted = False
+
+    @property
+    def inTransaction(self) -> bool:
+        return self._depth > 0
+
+    def begin(self) -> None:
+        """
+        Opens a (nested) transaction.
+        """
+        if self._depth == 0:
+            self._data = None
+            self._dirty = False
+            self._aborted = False
+        self._depth += 1
+
+    def commit(self) -> None:
+        """
+        Closes a transaction. Leaving the outermost transaction writes the buffered data.
+
+        Raises:
+        RuntimeError: if a nested transaction was rolled back, nothing is written
+        """
+        if self._depth == 0:
+            raise RuntimeError("commit without an open transaction")
+        self._depth -= 1
+        if self._depth == 0:
+            if self._dirty and not self._aborted:
+                self.storage.write(self._data)
+            self._data = None
+            self._dirty = False
+            if self._aborted:
+                self._aborted = False
+                raise RuntimeError("A nested transaction was rolled back, nothing was written.")
+
+    def rollback(self) -> None:
+        """
+        Closes a transaction and discards all writes of the outermost transaction. Inside an
+        outer transaction the outer one stays open but can not be committed anymore: its writes
+        are discarded and its commit raises a RuntimeError.
+        """
+        if self._depth == 0:
+            return
+        self._depth -= 1
+        self._aborted = self._depth > 0
+        self._data = None
+        self._dirty = False
+
+    def read(self) -> dict | None:
+        if self._depth == 0:
+            return self.storage.read()
+        if self._data is None:
+            self._data = self.storage.read()
+        return self._data
+
+    def write(self, data: dict) -> None:
+        if self._depth == 0:
+            self.storage.write(data)
+            return
+        self._data = data
+        self._dirty = True
+
+    def close(self) -> None:
+        if self._dirty and not self._aborted:
+            self.storage.write(self._data)
+        self._depth = 0
+        self._data = None
+        self._dirty = False
+        self._aborted = False
+        self.storage.close()
+
+
+class SQLiteStorage:
+    """
+    The connection to a SQLite database used by the SQLite backend (see backend.py).
+    Offers the same transactions as the TransactionMiddleware: writes done inside
+    begin/commit are committed at once, writes outside of a transaction are committed
+    immediately. The database runs in WAL mode, so readers are not blocked by a writer.
+    """
+
+    def __init__(self, path: str, **kwargs):
+        # transactions are managed by begin/commit instead of the sqlite3 module
+        self.connection = sqlite3.connect(path, isolation_level=None, **kwargs)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        # every commit is fsynced like a write of the AtomicJSONStorage
+        self.connection.execute("PRAGMA synchronous=FULL")
+        # number of commits that changed the database
+        self.writes = 0
+        self._depth = 0
+        self._dirty = False
+        # a nested transaction was rolled back, the outermost one can not be committed
+        self._aborted = False
+
+    @property
+    def inTransaction(self) -> bool:
+        return self._depth > 0
+
+    def begin(self) -> None:
+        """
+        Opens a (nested) transaction.
+        """
+        if self._depth == 0:
+            self.connection.execute("BEGIN IMMEDIATE")
+            self._dirty = False
+            self._aborted = False
+        self._depth += 1
+
+    def commit(self) -> None:
+        """
+        Closes a transaction. Leaving the outermost transaction commits the changes.
+
+        Raises:
+        RuntimeError: if a nested transaction was rolled back, nothing is committed
+        """
+        if self._depth == 0:
+            raise RuntimeError("commit without an open transaction")
+        self._depth -= 1
+        if self._depth == 0:
+            if self._aborted:
+                self.connection.execute("ROLLBACK")
+                self._aborted = False
+                self._dirty = False
+                raise RuntimeError("A nested transaction was rolled back, nothing was committed.")
+            self.connection.execute("COMMIT")
+            if self._dirty:
+                self.writes += 1
+            self._dirty = False
+
+    def rollback(self) -> None:
+        """
+        Closes a transaction and discards all changes of the outermost transaction. Inside an
+        outer transaction the outer one stays open but can not be committed anymore: its changes
+        are discarded and its commit raises a RuntimeError.
+        """
+        if self._depth == 0:
+            return
+        if self.connection.in_transaction:
+            self.connection.execute("ROLLBACK")
+        self._depth -= 1
+        self._dirty = False
+        self._aborted = self._depth > 0
+        if self._aborted:
+            # later writes of the outer transaction must not be committed one by one
+            self.connection.execute("BEGIN IMMEDIATE")
+
+    @contextmanager
+    def writing(self):
+        """
+        Runs the statements of one table operation in the open transaction
+        or in a transaction of their own.
+        """
+        outermost = self._depth == 0
+        self.begin()
+        self._dirty = True
+        try:
+            yield self.connection
+        except BaseException:
+            if outermost:
+                self.rollback()
+            else:
+                self._depth -= 1
+            raise
+        self.commit()
+
+    def close(self) -> None:
+        if self.connection.in_transaction:
+            if self._aborted:
+                self.connection.execute("ROLLBACK")
+            else:
+                self.connection.execute("COMMIT")
+                self.writes += 1
+        self._depth = 0
+        self._dirty = False
+        self._aborted = False
+        self.connection.close()
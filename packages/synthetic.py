@@ -0,0 +1,311 @@
+"""
+Deterministic synthetic data for load tests: courses, player histories and club populations
+of any size.
+
+Everything is generated from a seed, the same seed gives the same data on every machine. Every
+player has a random generator of their own (seeded with the seed and the playerID), so a single
+player can be generated again without the players before them.
+
+The per hole scores are fitted from test/real_data: a round is the par plus the handicap strokes
+the player gets on every hole (so harder holes get more shots), the strokes players usually
+score above their playing handicap, the form of the day and a per hole deviation drawn from the
+deviations of the real rounds from their own average, separately for par 3, 4 and 5.
+
+The generators yield one document at a time, insertStream and writeJSONDir write them in batches,
+so a dataset never has to be held in memory at once:
+
+    courses = list(synthetic.courses(50))
+    insertStream(backend.courses, courses)
+    insertHistory(helper, synthetic.history(courses, 100_000))
+    writeJSONDir(synthetic.rounds(courses, 1_000), "games")  # for Helper.importFromDir
+"""
+
+from datetime import datetime, timedelta
+from itertools import islice
+import json
+import os
+import pathlib
+import random
+
+import handicapWHS as whs
+from course import compileCourse
+
+REAL_DATA = pathlib.Path(__file__).resolve().parent.parent / "test" / "real_data"
+# the 18 hole layouts by par, the holes are shuffled per course
+LAYOUTS = {
+    70: (3,) * 4 + (4,) * 12 + (5,) * 2,
+    71: (3,) * 4 + (4,) * 11 + (5,) * 3,
+    72: (3,) * 4 + (4,) * 10 + (5,) * 4,
+    73: (3,) * 3 + (4,) * 11 + (5,) * 4,
+}
+# share of the courses with 9 holes
+NINE_HOLE_SHARE = 0.2
+# the strokes an average round is above the playing handicap of the player
+NET_OVER = 3.0
+# the standard deviation of the form of the day in strokes per 18 holes
+FORM_SD = 3.0
+
+_deviations: dict[int, list[float]] | None = None
+
+
+def fitDeviations(directory: str | pathlib.Path = REAL_DATA) -> dict[int, list[float]]:
+    """
+    Fits the per hole deviations of the rounds in directory (with the subdirectories courses
+    and games): the shots over par of every hole minus the average over par of its round.
+
+    Returns:
+    dict[int, list[float]]: the deviations by par of the hole
+    """
+    directory = pathlib.Path(directory)
+    courses = {}
+    for file in sorted((directory / "courses").glob("*.json")):
+        with file.open() as f:
+            course = json.load(f)
+        courses[course["courseID"]] = course
+
+    deviations = {}
+    for file in sorted((directory / "games").glob("*.json")):
+        with file.open() as f:
+            game = json.load(f)
+        par = courses[game["courseID"]]["par"]
+        over = [shots - holePar for shots, holePar in zip(game["shots"], par)]
+        mean = sum(over) / len(over)
+        for value, holePar in zip(over, par):
+            deviations.setdefault(holePar, []).append(round(value - mean, 3))
+    return deviations
+
+
+def deviations() -> dict[int, list[float]]:
+    """
+    The deviations fitted from test/real_data, see fitDeviations. Fitted on first use.
+    """
+    global _deviations
+    if _deviations is None:
+        _deviations = fitDeviations()
+    return _deviations
+
+
+def course(rng: random.Random, courseID: str, nineHoles: bool = False) -> dict:
+    """
+    Creates a valid course (see schema.validateCourse).
+
+    Args:
+    rng (random.Random): the random generator
+    courseID (str): the id of the course
+    nineHoles (bool): a 9 hole course
+
+    Returns:
+    dict: the course
+    """
+    par = list(LAYOUTS[rng.choice(tuple(LAYOUTS))])
+    rng.shuffle(par)
+    slope = rng.randint(100, 145)
+    # harder courses are rated higher, a rating is about par - 1.5 on a course of average slope
+    rating = sum(par) - 1.5 + (slope - 113) * 0.08 + rng.uniform(-1.0, 1.0)
+    # odd stroke indexes on the front nine and even ones on the back nine
+    front = rng.sample(range(1, 19, 2), 9)
+    back = rng.sample(range(2, 19, 2), 9)
+    if rng.random() < 0.5:
+        front, back = back, front
+    strokeIndex = front + back
+    if nineHoles:
+        par, strokeIndex, rating = par[:9], strokeIndex[:9], rating * sum(par[:9]) / sum(par)
+    return {
+        "courseID": courseID,
+        "course_rating": round(rating, 1),
+        "slope_rating": slope,
+        "par": par,
+        "handicap_stroke_index": strokeIndex,
+    }
+
+
+def courses(count: int, seed: int = 0, nineHoleShare: float = NINE_HOLE_SHARE):
+    """
+    Yields count courses named "Synthetic <number>".
+    """
+    rng = random.Random(f"courses:{seed}")
+    for number in range(count):
+        yield course(rng, f"Synthetic {number}", rng.random() < nineHoleShare)
+
+
+def shots(rng: random.Random, course: dict, handicapIndex: float) -> list[int]:
+    """
+    The shots of a round of a player with the handicap index on the course.
+    """
+    compiled = compileCourse(course)
+    is9Hole = len(compiled.par) == 9
+    adjustedPar = compiled.spread(compiled.egaPlayingHandicap(is9Hole, handicapIndex), is9Hole)
+    # the strokes above the playing handicap and the form of the day, spread evenly
+    extra = (NET_OVER + rng.gauss(0.0, FORM_SD)) / 18
+    pools = deviations()
+    return [
+        max(1, round(hole + extra + rng.choice(pools.get(par, pools[4]))))
+        for hole, par in zip(adjustedPar, compiled.par)
+    ]
+
+
+def rounds(
+    courses: list[dict],
+    count: int,
+    seed: int = 0,
+    handicapIndex: float = 30.0,
+    start: datetime = datetime(2020, 1, 1, 8),
+    playerID: str = "",
+):
+    """
+    Yields count rounds of a player in date order, schema valid for Helper.addGame,
+    Helper.importFromDir and Club.post_rounds. The handicap index of the player drifts from
+    round to round, a round is played every 1 to 7 days.
+
+    Args:
+    courses (list[dict]): the courses the player plays on
+    count (int): the number of rounds
+    seed (int): the seed of the dataset
+    handicapIndex (float): the handicap index of the player before the first round
+    start (datetime): the day of the first round, rounds start up to 10 hours later
+    playerID (str): gives every player of a dataset other rounds
+
+    Yields:
+    dict: the round
+    """
+    for game, _ in _rounds(courses, count, seed, handicapIndex, start, playerID):
+        yield game
+
+
+def _rounds(courses: list[dict], count: int, seed: int, handicapIndex: float, start: datetime, playerID: str):
+    # yields (round, the handicap index the shots were generated with)
+    rng = random.Random(f"rounds:{seed}:{playerID}")
+    day = start
+    for number in range(count):
+        played = rng.choice(courses)
+        game = {
+            "game_id": f"{playerID}{seed:x}{number:08x}",
+            "courseID": played["courseID"],
+            "date": (day + timedelta(minutes=rng.randrange(600))).isoformat(),
+            "shots": shots(rng, played, handicapIndex),
+            "pcc": 0,
+            "cba": 0,
+            "is9Hole": len(played["par"]) == 9,
+        }
+        yield game, handicapIndex
+        # better players improve slowly, beginners quickly
+        drift = rng.gauss(-0.002 * handicapIndex, 0.4)
+        handicapIndex = min(54.0, max(-5.0, round(handicapIndex + drift, 1)))
+        day += timedelta(days=rng.randint(1, 7))
+
+
+def history(
+    courses: list[dict],
+    count: int,
+    seed: int = 0,
+    handicapIndex: float = 30.0,
+    playerID: str = "",
+    start: datetime = datetime(2020, 1, 1, 8),
+):
+    """
+    Yields the history of a player as stored by the Helper, see rounds: the games with
+    handicap_dif and exceptional_reduction, each with the hcLog entry of its day.
+
+    Yields:
+    tuple[dict, dict]: the game and the hcLog entry
+    """
+    byID = {course["courseID"]: course for course in courses}
+    for game, hci in _rounds(courses, count, seed, handicapIndex, start, playerID):
+        yield (
+            whs.handicapDifferential(game, byID[game["courseID"]], hci),
+            {"whs": hci, "ega": hci, "date": game["date"]},
+        )
+
+
+def players(count: int, seed: int = 0):
+    """
+    Yields count players of a club: {"playerID", "name", "hci"}. The handicap indexes are
+    spread like in a typical club, most players between 15 and 36.
+    """
+    rng = random.Random(f"players:{seed}")
+    for number in range(count):
+        hci = min(54.0, max(-2.0, round(rng.gauss(24.0, 10.0), 1)))
+        yield {"playerID": f"p{number:06}", "name": f"Player {number}", "hci": hci}
+
+
+def insertStream(table, documents, batchSize: int = 1_000) -> int:
+    """
+    Inserts the documents into a table in batches with insert_multiple.
+
+    Returns:
+    int: the number of inserted documents
+    """
+    documents = iter(documents)
+    inserted = 0
+    while batch := list(islice(documents, batchSize)):
+        table.insert_multiple(batch)
+        inserted += len(batch)
+    return inserted
+
+
+def insertHistory(helper, history, batchSize: int = 1_000) -> int:
+    """
+    Inserts a history (see history) into the games and the hcLog of a helper, every batch
+    with one transaction.
+
+    Returns:
+    int: the number of inserted games
+    """
+    history = iter(history)
+    inserted = 0
+    while batch := list(islice(history, batchSize)):
+        with helper.transaction():
+            helper.games.insert_multiple(game for game, _ in batch)
+            helper.hcLog.insert_multiple(entry for _, entry in batch)
+        inserted += len(batch)
+    helper.reindex()
+    return inserted
+
+
+def writeJSONDir(documents, path: str, digits: int = 8) -> int:
+    """
+    Writes every document into a file of its own, the format Helper.insertFromDir and
+    Helper.importFromDir read.
+
+    Returns:
+    int: the number of written files
+    """
+    os.makedirs(path, exist_ok=True)
+    written = 0
+    for number, doc in enumerate(documents):
+        with open(os.path.join(path, f"{number:0{digits}}.json"), "w") as file:
+            json.dump(doc, file)
+        written += 1
+    return written
+
+
+def populateClub(
+    club, courseCount: int, playerCount: int, roundsPerPlayer: int, seed: int = 0, playersPerWrite: int = 100
+) -> dict:
+    """
+    Fills a club (see club.py) with synthetic courses and players with their histories.
+
+    Args:
+    club (Club): the club
+    courseCount (int): the number of courses
+    playerCount (int): the number of players
+    roundsPerPlayer (int): the number of rounds in the history of every player
+    seed (int): the seed of the dataset
+    playersPerWrite (int): the number of players written with one transaction
+
+    Returns:
+    dict: {"courses", "players", "rounds"} the numbers of inserted documents
+    """
+    generated = list(courses(courseCount, seed))
+    insertStream(club.backend.courses, generated)
+    club.reloadCourses()
+    report = {"courses": len(generated), "players": 0, "rounds": 0}
+    population = players(playerCount, seed)
+    while chunk := list(islice(population, playersPerWrite)):
+        with club.transaction():
+            for player in chunk:
+                helper = club.addPlayer(player["playerID"], player["name"])
+                playerHistory = history(generated, roundsPerPlayer, seed, player["hci"], player["playerID"])
+                report["rounds"] += insertHistory(helper, playerHistory, batchSize=max(1, roundsPerPlayer))
+                report["players"] += 1
+    return report
@@ -0,0 +1,160 @@
+import os
+from tempfile import TemporaryDirectory
+
+import pytest
+from tinydb import Query, TinyDB, where
+from tinydb.storages import MemoryStorage
+from backend import INDEXED_FIELDS, SQLiteBackend, SQLiteTable, _toSQL, openBackend
+from journal import Journal
+from storage import SQLiteStorage
+
+DOCS = [
+    {"game_id": "a", "courseID": "Runde 1", "date": "2025-01-01T10:00:00", "pcc": 0, "is9Hole": False},
+    {"game_id": "b", "courseID": "Runde 2", "date": "2025-01-03T10:00:00", "pcc": 1, "is9Hole": True},
+    {"game_id": "c", "courseID": "Runde 1", "date": "2025-01-02T10:00:00", "pcc": 2.5, "is9Hole": False},
+    {"game_id": "d", "courseID": "Runde 3", "date": "2025-01-05", "pcc": None, "extra": {"x": 1}},
+    {"game_id": "e", "courseID": 7, "date": "2025-01-04T10:00:00", "shots": [4, 5]},
+]
+
+q = Query()
+QUERIES = [
+    q.courseID == "Runde 1",
+    q.courseID != "Runde 1",
+    q.courseID.one_of(["Runde 2", "Runde 3", 7]),
+    q.date >= "2025-01-02",
+    (q.date > "2025-01-01") & (q.date < "2025-01-04"),
+    (q.pcc == 1) | (q.courseID == "Runde 3"),
+    q.pcc > 0,
+    q.pcc <= 1,
+    q.pcc != 1,
+    q.is9Hole == True,
+    q.extra.x == 1,
+    q.courseID > "A",
+    q.courseID > 5,
+    # evaluated in python
+    q.pcc == None,
+    ~(q.pcc == 1),
+    q.shots == [4, 5],
+    q.courseID.test(lambda value: value == 7),
+    q.courseID.matches("Runde [12]"),
+]
+
+
+# the SQLite and journal table against a tinyDB table with the same documents
+@pytest.fixture(params=["sqlite", "journal"])
+def tables(request):
+    with TemporaryDirectory() as temp_dir:
+        if request.param == "sqlite":
+            storage = SQLiteStorage(f"{temp_dir}/test.sqlite")
+            table = SQLiteTable(storage, "games", INDEXED_FIELDS["games"])
+        else:
+            storage = Journal(f"{temp_dir}/test.jsonl", INDEXED_FIELDS)
+            table = storage.table("games")
+        tiny = TinyDB(storage=MemoryStorage).table("games")
+        table.insert_multiple(DOCS)
+        tiny.insert_multiple(DOCS)
+        yield table, tiny
+        storage.close()
+
+
+def matches(query, doc) -> bool:
+    # tinyDB raises if a field can not be compared with the value, the other tables skip the document
+    try:
+        return query(doc)
+    except TypeError:
+        return False
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_search_matches_tinydb(tables, query):
+    table, tiny = tables
+    result = table.search(query)
+    expected = [doc for doc in tiny.all() if matches(query, doc)]
+    assert result == expected
+    assert [doc.doc_id for doc in result] == [doc.doc_id for doc in expected]
+
+
+def test_table_api_matches_tinydb(tables):
+    for table in tables:
+        table.update({"pcc": 3}, q.courseID == "Runde 1")
+        table.update(lambda doc: doc.update(date="2026-01-01"), doc_ids=[2])
+        table.remove(q.game_id == "e")
+        table.remove(doc_ids=[4])
+        table.insert({"game_id": "f", "courseID": "Runde 2", "date": "2025-02-01"})
+
+    table, tiny = tables
+    assert table.all() == tiny.all()
+    assert [doc.doc_id for doc in table.all()] == [doc.doc_id for doc in tiny.all()]
+    assert len(table) == len(tiny)
+    assert table.get(doc_id=2) == tiny.get(doc_id=2)
+    assert table.get(q.game_id == "f").doc_id == tiny.get(q.game_id == "f").doc_id
+    assert table.get(doc_id=100) is None
+    assert table.contains(q.game_id == "a") and not table.contains(doc_id=5)
+    assert table.count(q.courseID == "Runde 2") == 2
+
+
+@pytest.mark.parametrize("field", ["date", "courseID", "game_id"])
+def test_queries_use_index(field):
+    with TemporaryDirectory() as temp_dir:
+        backend = SQLiteBackend(f"{temp_dir}/test.sqlite")
+        where_clause, params = _toSQL((where(field) == "x")._hash)
+        plan = backend.storage.connection.execute(
+            f'EXPLAIN QUERY PLAN SELECT doc FROM "games" WHERE {where_clause}', params
+        ).fetchall()
+        assert f"games_{field}" in str(plan)
+        backend.close()
+
+
+def test_transaction(tables):
+    table, _ = tables
+    storage = table.storage
+    writes = storage.writes
+
+    storage.begin()
+    table.insert({"game_id": "x", "date": "2025-01-01"})
+    table.update({"pcc": 0}, doc_ids=[1])
+    storage.commit()
+    assert storage.writes == writes + 1
+
+    storage.begin()
+    table.remove(doc_ids=[1, 2, 3])
+    storage.rollback()
+    assert len(table) == len(DOCS) + 1
+    assert storage.writes == writes + 1
+
+
+def test_persistence_sqlite():
+    with TemporaryDirectory() as temp_dir:
+        backend = openBackend("sqlite", temp_dir)
+        backend.games.insert_multiple(DOCS)
+        backend.courses.insert({"courseID": "Runde 1"})
+        backend.close()
+
+        backend = SQLiteBackend(f"{temp_dir}/db.sqlite")
+        assert backend.games.all() == DOCS
+        assert backend.courses.search(where("courseID") == "Runde 1")[0].doc_id == 1
+        # doc_ids of removed documents are not used again
+        backend.games.remove(doc_ids=[5])
+        assert backend.games.insert({"game_id": "f"}) == 6
+        assert backend.storage.connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        backend.close()
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        openBackend("csv", ".")
+
+
+@pytest.mark.parametrize("name", ["tinydb", "sqlite", "journal"])
+def test_opened_on_first_use(name):
+    with TemporaryDirectory() as temp_dir:
+        backend = openBackend(name, temp_dir)
+        assert not backend.isOpen
+        assert os.listdir(temp_dir) == []
+        backend.close()
+
+        backend = openBackend(name, temp_dir)
+        backend.games.insert(DOCS[0])
+        assert backend.isOpen
+        backend.close()
+        assert openBackend(name, temp_dir).games.all() == DOCS[:1]
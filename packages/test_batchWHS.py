@@ -0,0 +1,94 @@
+import copy
+import json
+import pathlib
+import random
+
+import numpy as np
+import pytest
+import batchWHS
+import handicapWHS as whs
+
+
+@pytest.fixture
+def courses():
+    files = list(pathlib.Path("test/real_data/courses").glob("Kurs*.json"))
+    kurse = dict()
+    for file in files:
+        with file.open() as file:
+            data = json.load(file)
+        kurse[data["courseID"]] = data
+    return kurse
+
+
+@pytest.fixture
+def games():
+    files = list(pathlib.Path("test/real_data/games").glob("Runde*.json"))
+    runden = list()
+    for file in files:
+        with file.open() as file:
+            runden.append(json.load(file))
+    return runden
+
+
+def random_games(courses: dict, count: int, seed: int = 0) -> tuple[list[dict], list[float]]:
+    rng = random.Random(seed)
+    games = []
+    hcis = []
+    for i in range(count):
+        course = rng.choice(list(courses.values()))
+        is9Hole = len(course["par"]) == 9 or rng.random() < 0.3
+        games.append({
+            "game_id": str(i),
+            "courseID": course["courseID"],
+            "shots": [rng.randint(1, 12) for _ in range(9 if is9Hole else 18)],
+            "pcc": rng.choice([-1.0, 0.0, 1.0, 2.0, 3.0]),
+            "is9Hole": is9Hole,
+            "handicap_allowance": rng.choice([None, 1, 0.95, 0.85]),
+        })
+        hcis.append(rng.choice([54.0, round(rng.uniform(-8.0, 54.0), 1)]))
+    return games, hcis
+
+
+def scalar(games: list[dict], courses: dict, hcis: list[float]) -> tuple[list[float], list[float]]:
+    difs, reductions = [], []
+    for game, hci in zip(games, hcis):
+        result = whs.handicapDifferential(copy.deepcopy(game), courses[game["courseID"]], hci)
+        difs.append(result["handicap_dif"])
+        reductions.append(result["exceptional_reduction"])
+    return difs, reductions
+
+
+def test_real_data(games, courses):
+    for hci in [54.0, 36.0, 20.3, 4.4, -2.0]:
+        arrays = batchWHS.gamesToArrays(games, courses, hci)
+        difs, reductions = batchWHS.handicapDifferentials(**arrays)
+        expected_difs, expected_reductions = scalar(games, courses, [hci] * len(games))
+        # bit identical, not just approximately equal
+        assert difs.tolist() == expected_difs
+        assert reductions.tolist() == expected_reductions
+
+
+def test_random_rounds(courses):
+    games, hcis = random_games(courses, 3000)
+    arrays = batchWHS.gamesToArrays(games, courses, hcis)
+    difs, reductions = batchWHS.handicapDifferentials(**arrays)
+    expected_difs, expected_reductions = scalar(games, courses, hcis)
+    assert difs.tolist() == expected_difs
+    assert reductions.tolist() == expected_reductions
+
+
+def test_inputs_not_modified(games, courses):
+    original = copy.deepcopy(games)
+    arrays = batchWHS.gamesToArrays(games, courses, 54.0)
+    copies = {key: np.array(value, copy=True) for key, value in arrays.items()}
+    batchWHS.handicapDifferentials(**arrays)
+    assert games == original
+    for key, value in arrays.items():
+        assert np.array_equal(value, copies[key])
+
+
+def test_invalid_shape(games, courses):
+    arrays = batchWHS.gamesToArrays(games, courses, 54.0)
+    arrays["shots"] = arrays["shots"][:, :9]
+    with pytest.raises(ValueError):
+        batchWHS.handicapDifferentials(**arrays)
@@ -0,0 +1,145 @@
+from datetime import datetime, timedelta
+import json
+import pathlib
+import random
+from tempfile import TemporaryDirectory
+
+import pytest
+from tinydb import where
+from backend import openBackend
+from club import Club
+
+
+@pytest.fixture(params=["tinydb", "sqlite", "journal"])
+def club(request):
+    with TemporaryDirectory() as temp_dir:
+        backend = openBackend(request.param, temp_dir)
+        for file in pathlib.Path("test/real_data/courses").glob("Kurs*.json"):
+            with file.open() as f:
+                backend.courses.insert(json.load(f))
+        yield Club(backend)
+        backend.close()
+
+
+@pytest.fixture
+def real_games():
+    games = []
+    for file in sorted(pathlib.Path("test/real_data/games").glob("Runde*.json"), key=lambda f: int(f.stem.removeprefix("Runde"))):
+        with file.open() as f:
+            games.append(json.load(f))
+    return games
+
+
+def competition(games: list[dict], players: list[str], day: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    rounds = []
+    for playerID in players:
+        game = rng.choice(games)
+        rounds.append({
+            "playerID": playerID,
+            "courseID": game["courseID"],
+            "shots": [max(1, shot + rng.randint(-1, 1)) for shot in game["shots"]],
+            "is9Hole": game["is9Hole"],
+            "pcc": game["pcc"],
+            "cba": game["cba"],
+            "date": datetime(2025, 1, 1) + timedelta(days=day),
+        })
+    return rounds
+
+
+def strip(docs: list[dict]) -> list[dict]:
+    # game_id is a new uuid on every post
+    return [{key: value for key, value in doc.items() if key != "game_id"} for doc in docs]
+
+
+def test_post_rounds_matches_addGame(club: Club, real_games):
+    players = [f"p{i}" for i in range(6)]
+    for playerID in players:
+        club.addPlayer(playerID)
+
+    with TemporaryDirectory() as temp_dir:
+        backend = openBackend("tinydb", temp_dir)
+        backend.courses.insert_multiple(club.courses.all())
+        reference = Club(backend)
+        for playerID in players:
+            reference.addPlayer(playerID)
+
+        for day in range(25):
+            rounds = competition(real_games, players, day, day)
+            writes = club.courses.storage.writes
+            results = club.post_rounds(rounds, workers=0)
+            # one write for the whole competition
+            assert club.courses.storage.writes == writes + 1
+
+            for score, result in zip(rounds, results):
+                helper = reference.player(score["playerID"])
+                helper.addGame(score["courseID"], score["shots"], score["is9Hole"], score["pcc"], score["cba"], score["date"])
+                assert result["playerID"] == score["playerID"]
+                assert (result["whs"], result["ega"]) == (helper.get_last_hci(True), helper.get_last_hci(False))
+
+        for playerID in players:
+            expected, actual = reference.player(playerID), club.player(playerID)
+            assert strip(actual.games.all()) == strip(expected.games.all())
+            assert actual.hcLog.all() == expected.hcLog.all()
+            # the indexes were kept up to date
+            assert strip(actual.getLastGames(0, 100)) == strip(expected.getLastGames(0, 100))
+            actual.reindex()
+            assert strip(actual.getLastGames(0, 100)) == strip(expected.getLastGames(0, 100))
+        backend.close()
+
+
+def test_post_rounds_process_pool(club: Club, real_games):
+    players = [f"p{i}" for i in range(4)]
+    for playerID in players:
+        club.addPlayer(playerID)
+    for day in range(3):
+        rounds = competition(real_games, players, day, day)
+        pooled = club.post_rounds(rounds, workers=2)
+        assert [result["playerID"] for result in pooled] == players
+    assert all(len(club.player(playerID).games.all()) == 3 for playerID in players)
+
+
+def test_post_rounds_invalid(club: Club, real_games):
+    club.addPlayer("p0")
+    club.addPlayer("p1")
+    rounds = competition(real_games, ["p0", "p1"], 0, 0)
+    rounds[1]["pcc"] = 7
+    writes = club.courses.storage.writes
+    with pytest.raises(ValueError):
+        club.post_rounds(rounds, workers=0)
+    with pytest.raises(KeyError):
+        club.post_rounds(competition(real_games, ["p0", "unknown"], 0, 0), workers=0)
+    assert club.courses.storage.writes == writes
+    assert club.player("p0").games.all() == []
+
+
+def test_players(club: Club):
+    club.addPlayer("anna", "Anna")
+    with pytest.raises(ValueError):
+        club.addPlayer("anna")
+    with pytest.raises(ValueError):
+        club.addPlayer("no spaces")
+    with pytest.raises(KeyError):
+        club.player("bob")
+    assert club.playerIDs() == ["anna"]
+    assert set(club.courseCache) == {course["courseID"] for course in club.courses.all()}
+
+
+def test_transaction_rollback(club: Club, real_games):
+    club.addPlayer("anna")
+    game = real_games[0]
+    with pytest.raises(ZeroDivisionError):
+        with club.transaction():
+            club.addPlayer("bob")
+            club.player("anna").queueGame(game["courseID"], game["shots"], game["is9Hole"])
+            # fills the query caches with documents that are rolled back
+            assert len(club.players.search(where("playerID") == "bob")) == 1
+            assert len(club.player("anna").pending.search(where("courseID") == game["courseID"])) == 1
+            club.courseCache
+            1 / 0
+
+    assert club.players.search(where("playerID") == "bob") == []
+    assert club.player("anna").pending.search(where("courseID") == game["courseID"]) == []
+    assert club.playerIDs() == ["anna"]
+    with pytest.raises(KeyError):
+        club.player("bob")
@@ -0,0 +1,95 @@
+import json
+import pathlib
+
+import pytest
+import handicapEGA as ega
+import handicapWHS as whs
+import course as courseModule
+from course import COMPILED_VERSIONS, Course, compileCourse, HCI_MIN_TENTHS, HCI_MAX_TENTHS
+
+
+@pytest.fixture
+def courses():
+    files = list(pathlib.Path("test/real_data/courses").glob("Kurs*.json"))
+    kurse = dict()
+    for file in files:
+        with file.open() as file:
+            data = json.load(file)
+        kurse[data["courseID"]] = data
+    return kurse
+
+
+def test_course_fields(courses):
+    course = Course(courses["Runde 1"])
+    assert course.parTotal == 72
+    assert course.parFront == 35
+    assert course.parBack == 37
+    assert course["slope_rating"] == 115
+    assert "par" in course
+    assert course.get("missing") is None
+    with pytest.raises(AttributeError):
+        course.other = 1
+
+    nine = Course(courses["Runde 10"])
+    assert nine.parTotal == nine.parFront == 35
+    assert nine.parBack == 0
+
+
+def test_lookup_tables_match_calculation(courses):
+    for doc in courses.values():
+        course = Course(doc)
+        par = sum(doc["par"])
+        for tenths in range(HCI_MIN_TENTHS, HCI_MAX_TENTHS + 1):
+            hci = tenths / 10
+            for is9Hole in (False, True):
+                assert course.egaPlayingHandicap(is9Hole, hci) == ega.playingHandicap(
+                    is9Hole, hci, doc["course_rating"], doc["slope_rating"], par
+                )
+                game = {"is9Hole": is9Hole}
+                assert round(course.whsCourseHandicap(is9Hole, hci)) == whs.calcPlayingHandicap(game, doc, hci)
+
+
+def test_values_outside_of_table(courses):
+    doc = courses["Runde 3"]
+    course = Course(doc)
+    par = sum(doc["par"])
+    # not exactly a tenth (e.g. summed up adjustments) and outside of the table
+    for hci in (18.400000000000002, 23.45, 60.0, -12.0):
+        assert course.egaPlayingHandicap(False, hci) == ega.playingHandicap(
+            False, hci, doc["course_rating"], doc["slope_rating"], par
+        )
+        assert course.whsCourseHandicap(True, hci) == hci * doc["slope_rating"] / 113 + 2 * (doc["course_rating"] - par)
+
+
+def test_compileCourse(courses):
+    doc = courses["Runde 9"]
+    compiled = compileCourse(doc)
+    assert compileCourse(doc) is compiled
+    assert compileCourse(compiled) is compiled
+    assert compileCourse(dict(doc)) is compiled
+
+    override = dict(doc, course_rating=70.0)
+    recompiled = compileCourse(override)
+    assert recompiled is not compiled
+    assert recompiled.courseRating == 70.0
+    # both versions stay compiled, e.g. for scorecards with and without overridden ratings
+    assert compileCourse(doc) is compiled
+    assert compileCourse(dict(override)) is recompiled
+
+    # only the versions used last stay compiled
+    for rating in range(COMPILED_VERSIONS):
+        compileCourse(dict(doc, course_rating=60.0 + rating))
+    assert len(courseModule._compiled[doc["courseID"]]) == COMPILED_VERSIONS
+    assert compileCourse(doc) is not compiled
+
+
+def test_register(courses):
+    # e.g. a course compiled in the parent process of a worker
+    compiled = Course(dict(courses["Runde 1"]))
+    courseModule.register(compiled)
+    assert compileCourse(courses["Runde 1"]) is compiled
+
+
+def test_spread(courses):
+    course = compileCourse(courses["Runde 1"])
+    assert course.spread(20, False) == ega.spreadPlayingHC(courses["Runde 1"], 20, False)
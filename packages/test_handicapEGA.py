@@ -93,20 +93,211 @@ def courses():
         kurse[data["courseID"]] = data
     return kurse
 
-@pytest.fixture
-def handicap_before():
-    # just 7 for now because this is only ega data
-    return [54, 37, 32.5, 27.5, 27.5, 23.7, 23.7]
+# (round, handicap before, handicap after) of the real ega data, just 7 rounds for now
+REAL_EGA_ROUNDS = [
+    ("Runde 1", 54, 37),
+    ("Runde 2", 37, 32.5),
+    ("Runde 3", 32.5, 27.5),
+    ("Runde 4", 27.5, 27.5),
+    pytest.param(
+        "Runde 5", 27.5, 23.7,
+        marks=pytest.mark.xfail(
+            strict=True,
+            reason="45 points at 27.5: 3 points of category 5 (26.5 still is category 5) and 6 "
+            "of category 4 give 23.6 per the EGA categories, the club's system printed 23.7",
+        ),
+    ),
+    pytest.param(
+        "Runde 6", 23.7, 23.7,
+        marks=pytest.mark.xfail(
+            strict=True,
+            reason="a 9 hole round with 12 + 18 = 30 points, below the buffer zone of category 4 "
+            "(34), gives 23.8 per the EGA booklet, the club's system kept 23.7",
+        ),
+    ),
+    # 7 + 18 = 25 points, below the buffer zone
+    ("Runde 7", 23.7, 23.8),
+]
 
-@pytest.fixture
-def handicap_after():
-    return [37, 32.5, 27.5, 27.5, 23.7, 23.7, 23.8]
-    # return [37, 32.5, 27.5, 27.5, 23.6, 23.7, 23.7] # correct as per our calculation
-    
-def test_calculateNewHandicap(games, courses, handicap_before, handicap_after):
-    # this is just to ensure oder of game 1 to 12 since it would sort as game 1, 10, 11, 12, 2, 3 ...
-    # oh but we only have data for 7 games so it doesn't matter lol
-    # leaving this in in case we get ega data for the other games
-    rundenliste = ["Runde " + str(i+1) for i in range(7)]
-    for i, runde in enumerate(rundenliste):
-        assert hc.calculateNewHandicap(games[runde], int(games[runde]["pcc"]), handicap_before[i], courses[games[runde]["courseID"]]) == handicap_after[i]
\ No newline at end of file
+
+@pytest.mark.parametrize("runde, before, after", REAL_EGA_ROUNDS)
+def test_calculateNewHandicap(games, courses, runde, before, after):
+    game = games[runde]
+    assert hc.calculateNewHandicap(game, int(game["pcc"]), before, courses[game["courseID"]]) == after
+
+def loop_calculateAdjustment(stablefordScore: int, handicap: float, cba: int, is9Hole: bool) -> float:
+    # the point by point implementation calculateAdjustment used to have.
+    # The only change is that the category is taken from the handicap rounded to one decimal,
+    # the loop used to sum up float errors, so e.g. 8.1 - 18 * 0.2 ended up in category 1
+    adjustment = 0
+    category = hc.handicapToCategory(handicap)
+    if category == 6:
+        cba = 0
+
+    if stablefordScore > hc.BUFFER_UPPER_LIMIT + cba:
+        for _ in range(stablefordScore - (hc.BUFFER_UPPER_LIMIT + cba)):
+            category = hc.handicapToCategory(round(handicap + adjustment, 1))
+            single = category / 10
+            if category == 6:
+                single = 1
+            adjustment -= single
+        return adjustment
+
+    lower = hc.catToLowerBuffer(is9Hole, category)
+    if stablefordScore < lower + cba:
+        for _ in range(stablefordScore - lower):
+            if hc.handicapToCategory(handicap + adjustment) == 6:
+                if adjustment > 0:
+                    return adjustment - hc.BELOW_BUFFER_ADD
+                return adjustment
+            adjustment += hc.BELOW_BUFFER_ADD
+
+    return adjustment
+
+
+def loop_reductions(handicap: float, cba: int, points: int) -> list[float]:
+    # the loop of loop_calculateAdjustment above the buffer zone, the i-th entry
+    # is the adjustment it returns for i + 1 points above the buffer zone
+    adjustments = []
+    adjustment = 0
+    for _ in range(points):
+        category = hc.handicapToCategory(round(handicap + adjustment, 1))
+        single = category / 10
+        if category == 6:
+            single = 1
+        adjustment -= single
+        adjustments.append(adjustment)
+    return adjustments
+
+
+def belowBuffer(stablefordScore: int, handicap: float, cba: int, is9Hole: bool) -> bool:
+    # below the buffer zone of a category that has one, category 6 never goes up
+    category = hc.handicapToCategory(handicap)
+    if category == 6:
+        return False
+    lower = hc.catToLowerBuffer(is9Hole, category)
+    return lower is not None and stablefordScore < lower + cba
+
+
+def test_calculateAdjustment_matches_loop():
+    # every handicap from +10.0 to 54.0, every Stableford score of 9 (+18) and 18 holes
+    max_score = 162
+    mismatches = []
+    for tenths in range(-100, 541):
+        handicap = tenths / 10
+        for cba in (-2, -1, 0, 1):
+            upper = hc.BUFFER_UPPER_LIMIT + (0 if hc.handicapToCategory(handicap) == 6 else cba)
+            reductions = loop_reductions(handicap, cba, max_score - upper)
+            for is9Hole in (False, True):
+                for score in range(0, max_score + 1):
+                    if belowBuffer(score, handicap, cba, is9Hole):
+                        # the loop never adjusted there, see test_calculateAdjustment_below_buffer
+                        continue
+                    if score > upper:
+                        expected = reductions[score - upper - 1]
+                    else:
+                        try:
+                            expected = loop_calculateAdjustment(score, handicap, cba, is9Hole)
+                        except TypeError:
+                            # the loop crashed for 9 hole rounds in category 1 and 6 inside the buffer zone
+                            expected = 0
+                    if abs(hc.calculateAdjustment(score, handicap, cba, is9Hole) - expected) > 1e-9:
+                        mismatches.append((score, handicap, cba, is9Hole))
+    assert mismatches == []
+
+    # spot check that the shortcut above is the same as the whole loop
+    for score, handicap, cba in [(53, 8.1, -2), (77, 37.0, 0), (120, 54.0, 1), (90, -3.2, -1)]:
+        assert hc.calculateAdjustment(score, handicap, cba, False) == pytest.approx(
+            loop_calculateAdjustment(score, handicap, cba, False), abs=1e-9
+        )
+
+
+def test_calculateAdjustment_category_boundary():
+    # 4.5 still is category 2, so all 19 points are worth 0.2
+    assert hc.calculateAdjustment(53, 8.1, -2, False) == -3.8
+    # 9 hole rounds of category 6 inside the buffer zone
+    assert hc.calculateAdjustment(30, 54.0, 0, True) == 0
+
+
+def test_calculateAdjustment_below_buffer():
+    # every input below the buffer zone goes up by 0.1, but not from category 5 into category 6
+    mismatches = []
+    for tenths in range(-100, 541):
+        handicap = tenths / 10
+        increase = 0 if hc.handicapToCategory((tenths + 1) / 10) == 6 else hc.BELOW_BUFFER_ADD
+        for cba in (-2, -1, 0, 1):
+            for is9Hole in (False, True):
+                for score in range(0, hc.BUFFER_UPPER_LIMIT + 1):
+                    if belowBuffer(score, handicap, cba, is9Hole):
+                        if hc.calculateAdjustment(score, handicap, cba, is9Hole) != increase:
+                            mismatches.append((score, handicap, cba, is9Hole))
+    assert mismatches == []
+
+    assert hc.calculateAdjustment(31, 20.0, 0, False) == 0.1
+    assert hc.calculateAdjustment(32, 20.0, 0, False) == 0
+    # the cba moves the buffer zone
+    assert hc.calculateAdjustment(31, 20.0, -1, False) == 0
+    assert hc.calculateAdjustment(18 + 15, 20.0, 0, True) == 0.1
+    assert hc.calculateAdjustment(20, 36.8, 0, False) == 0.1
+    assert hc.calculateAdjustment(20, 36.9, 0, False) == 0
+    assert hc.calculateAdjustment(20, 40.0, 0, False) == 0
+
+
+def test_calculateNewHandicap_one_decimal(courses):
+    # 18.2 + 0.1 is 18.299999999999997 as a float
+    course = courses["Runde 1"]
+    game = {"shots": [9] * 18, "is9Hole": False}
+    assert hc.calculateNewHandicap(game, 0, 18.2, course) == 18.3
+
+
+def old_spreadPlayingHC(course: dict, handicapStrokes: int, is9Hole: bool) -> list:
+    # spreadPlayingHC before the allocations were cached
+    par = course["par"].copy()
+    strokeIndex = course["handicap_stroke_index"].copy()
+    holecount_modifier = 9 if is9Hole else 18
+    everyHole = hc.ganzzahligeDivision(handicapStrokes, holecount_modifier)
+    hc_stroke_modifier = 1 if handicapStrokes > 0 else -1
+    rem = handicapStrokes - hc_stroke_modifier*(everyHole * holecount_modifier)
+    if handicapStrokes < 0:
+        strokeIndex.reverse()
+    if is9Hole:
+        sorted_tuples = sorted(zip(strokeIndex, list(range(1, 10))))
+        for i, (_, new_index) in enumerate(sorted_tuples):
+            strokeIndex[i] = new_index
+    for i in range(holecount_modifier):
+        par[i] += everyHole
+        if strokeIndex[i] <= abs(rem):
+            par[i] += hc_stroke_modifier
+    return par
+
+
+def test_spreadPlayingHC_matches_uncached(courses):
+    for course in courses.values():
+        for is9Hole in (False, True) if len(course["par"]) == 18 else (True,):
+            for strokes in range(-30, 70):
+                # twice, so the second call comes from the cache
+                for _ in range(2):
+                    result = hc.spreadPlayingHC(course, strokes, is9Hole)
+                    assert isinstance(result, tuple)
+                    assert list(result) == old_spreadPlayingHC(course, strokes, is9Hole)
+
+
+def test_spreadPlayingHC_override(courses):
+    course = courses["Runde 1"]
+    before = hc.spreadPlayingHC(course, 5, False)
+
+    # a copy with an overridden stroke index under the same courseID
+    override = dict(course, handicap_stroke_index=list(range(1, 19)))
+    assert list(hc.spreadPlayingHC(override, 5, False)) == old_spreadPlayingHC(override, 5, False)
+    assert hc.spreadPlayingHC(course, 5, False) == before
+
+    # changing the course in place is picked up as well
+    changed = dict(course, handicap_stroke_index=course["handicap_stroke_index"].copy())
+    hc.spreadPlayingHC(changed, 5, False)
+    changed["handicap_stroke_index"].reverse()
+    hc.invalidateCourse(changed["courseID"])
+    assert list(hc.spreadPlayingHC(changed, 5, False)) == old_spreadPlayingHC(changed, 5, False)
+
+
+def test_spreadPlayingHC_cache_is_bounded():
+    assert hc._spreadPlayingHC.cache_info().maxsize == hc.STROKE_ALLOCATION_CACHE_SIZE
@@ -1,3 +1,58 @@
 import pytest
-import handicapEGA as hc
+import handicapWHS as whs
+from course import compileCourse
 
+
+def test_handicap_rounds_ties_up():
+    # 8.1 and 14.2 average to 11.15, which is rounded up
+    games = [
+        {"handicap_dif": dif, "exceptional_reduction": 0.0, "shots": [5] * 18}
+        for dif in (8.1, 14.2, 30.0, 30.0, 30.0, 30.0, 30.0)
+    ]
+    assert whs.handicap(games, None) == 11.2
+
+
+def test_reduction_events():
+    # the exceptional score of the third newest game reduces it and the older games
+    games = [
+        {"handicap_dif": 20.0 + i, "exceptional_reduction": 0.0, "reduction_event": 0.0, "shots": [5] * 18}
+        for i in range(6)
+    ]
+    games[2]["exceptional_reduction"] = games[2]["reduction_event"] = -2.0
+    assert whs.reducedDifferentials(games) == [200, 210, 200, 210, 220, 230]
+    # stored before the reductions were events, the reduction of the newer game is already included
+    games[4] = {"handicap_dif": 24.0, "exceptional_reduction": -3.0, "shots": [5] * 18}
+    assert whs.reducedDifferentials(games) == [200, 210, 200, 210, 190, 230]
+    assert whs.handicap(games, None) == 18.5
+
+
+def test_pcc_lowers_differential():
+    course = {"courseID": "A", "course_rating": 72.0, "slope_rating": 113, "par": [4] * 18, "handicap_stroke_index": list(range(1, 19))}
+    game = {"shots": [5] * 18, "pcc": 0, "is9Hole": False}
+    assert whs.handicapDifferential(dict(game), course, 20.0)["handicap_dif"] == 18.0
+    # a stormy day: the field scored 3 strokes higher than expected
+    assert whs.handicapDifferential(dict(game, pcc=3), course, 20.0)["handicap_dif"] == 15.0
+    assert whs.handicapDifferential(dict(game, pcc=-1), course, 20.0)["handicap_dif"] == 19.0
+    nine = {"shots": [5] * 9, "pcc": 2, "is9Hole": True}
+    calm = whs.handicapDifferential(dict(nine, pcc=0), dict(course, course_rating=36.0), 20.0)["handicap_dif"]
+    assert whs.handicapDifferential(nine, dict(course, course_rating=36.0), 20.0)["handicap_dif"] == calm - 1.0
+
+
+def test_differential_does_not_check_the_slope():
+    # the slope is validated when a course is added (schema.validateCourse), not per round
+    course = {"courseID": "steep", "course_rating": 72.0, "slope_rating": 170, "par": [4] * 18, "handicap_stroke_index": list(range(1, 19))}
+    game = {"shots": [5] * 18, "pcc": 0, "is9Hole": False}
+    assert whs.calcPlayingHandicap(game, course, 20.0) == round(20.0 * 170 / 113 + 0)
+    assert whs.handicapDifferential(dict(game), course, 20.0)["handicap_dif"] == round(113 / 170 * 18.0, 1)
+    compiled = compileCourse(course)
+    assert whs.calcPlayingHandicap(game, compiled, 20.0) == whs.calcPlayingHandicap(game, course, 20.0)
+    # only the EGA playing handicap is limited to slopes from 55 to 155
+    with pytest.raises(ValueError):
+        compiled.egaPlayingHandicap(False, 20.0)
+
+
+@pytest.mark.parametrize("new, capped", [(12.5, 12.5), (13.0, 13.0), (14.0, 13.5), (15.0, 14.0), (16.0, 14.5), (17.0, 15.0), (20.0, 15.0)])
+def test_capIncrease(new, capped):
+    # low 10.0: half of the increase above 3.0 is kept (soft cap), never more than 5.0 (hard cap)
+    assert whs.capIncrease(new, [], 10.0) == capped
+    assert whs.capIncrease(new, [], None) == new
@@ -6,12 +6,22 @@ import json
 
 import pytest
 from tinydb import TinyDB
+from tinydb.storages import MemoryStorage
 from helper import Helper
+import handicapWHS as whs
+from backend import openBackend
 
 
 # Fixture to set up and tear down the temporary database
-@pytest.fixture
-def helper():
+@pytest.fixture(params=["tinydb", "sqlite", "journal"])
+def helper(request):
+    if request.param != "tinydb":
+        with TemporaryDirectory() as temp_dir:
+            backend = openBackend(request.param, temp_dir)
+            yield Helper(*backend.tables())
+            backend.close()
+        return
+
     with TemporaryDirectory() as temp_dir:
         db_dir = f"{temp_dir}/test_db.json"
         # Initialize the database
@@ -120,4 +130,307 @@ def test_export_scorecard(helper: Helper, courses):
     # helper.export_scorecard(helper.courses.all()[2], False, "./export.pdf", 65, 114)
     helper.export_scorecard("./export.pdf", helper.courses.all()[2], use_last_values=True)
     with pytest.raises(AttributeError):
-        helper.export_scorecard("./export.pdf", helper.courses.all()[2])
\ No newline at end of file
+        helper.export_scorecard("./export.pdf", helper.courses.all()[2])
+
+@pytest.fixture
+def real_courses():
+    files = list(pathlib.Path("test/real_data/courses").glob("Kurs*.json"))
+    courses = list()
+    for file in files:
+        with file.open() as file:
+            data = json.load(file)
+        courses.append(data)
+    return courses
+
+
+@pytest.fixture
+def real_games():
+    # sorted by round number so Runde 10 does not come before Runde 2
+    files = sorted(
+        pathlib.Path("test/real_data/games").glob("Runde*.json"),
+        key=lambda file: int(file.stem[len("Runde"):]),
+    )
+    games = list()
+    for file in files:
+        with file.open() as file:
+            data = json.load(file)
+        games.append(data)
+    return games
+
+
+def test_getLastGames(multiple_games: Helper):
+    games = multiple_games.getLastGames()
+    assert [game["game_id"] for game in games] == [str(i) for i in range(1, 21)]
+
+    games = multiple_games.getLastGames(5, 7)
+    assert [game["game_id"] for game in games] == ["6", "7", "8"]
+
+    # m is clamped to the amount of games
+    assert len(multiple_games.getLastGames(0, 100)) == 21
+    assert multiple_games.getLastGames(30, 40) == []
+
+
+def test_addGame_updates_index(helper: Helper, real_courses, real_games):
+    helper.courses.insert_multiple(real_courses)
+    base_date = datetime(2025, 1, 1)
+
+    for i, game in enumerate(real_games):
+        helper.addGame(
+            game["courseID"],
+            game["shots"],
+            game["is9Hole"],
+            game["pcc"],
+            game["cba"],
+            base_date + timedelta(days=i),
+        )
+        assert len(helper.gameIndex) == i + 1
+
+    # the index has to match a full scan of the table
+    expected = sorted(
+        helper.games.all(), key=lambda x: datetime.fromisoformat(x["date"]), reverse=True
+    )
+    assert helper.getLastGames(0, 100) == expected
+
+    # index rebuilt from the table gives the same result
+    helper.reindex()
+    assert helper.getLastGames(0, 100) == expected
+    assert len(helper.hcLog.all()) == len(real_games)
+
+
+def test_addGame_compact(real_courses, real_games):
+    with TemporaryDirectory() as temp_dir:
+        db = TinyDB(f"{temp_dir}/test_db.json")
+        helper = Helper(db.table("games"), db.table("courses"), db.table("hcLog"), compact=True)
+        helper.courses.insert_multiple(real_courses)
+        base_date = datetime(2025, 1, 1)
+
+        for i, game in enumerate(real_games):
+            helper.addGame(
+                game["courseID"],
+                game["shots"],
+                game["is9Hole"],
+                game["pcc"],
+                game["cba"],
+                base_date + timedelta(days=i),
+            )
+
+        # the compact records hold the same data as the table
+        expected = sorted(
+            helper.games.all(), key=lambda x: datetime.fromisoformat(x["date"]), reverse=True
+        )
+        assert [game.toDoc() for game in helper.getLastGames(0, 100)] == expected
+        assert helper.getHCLog(0, 0)[0]["whs"] == helper.hcLog.all()[-1]["whs"]
+        db.close()
+
+
+def test_first_game_indexed_once(helper: Helper, real_courses):
+    helper.courses.insert_multiple(real_courses)
+    # a bad round has no exceptional reduction, so nothing reads the index before the insert
+    helper.addGame("Runde 1", [10] * 18, False, 0, 0, datetime(2025, 1, 1))
+    assert len(helper.getLastGames()) == 1
+
+
+def test_exceptional_score_leaves_previous_games(helper: Helper, real_courses):
+    helper.courses.insert_multiple(real_courses)
+    courseID = real_courses[0]["courseID"]
+    for i in range(8):
+        helper.addGame(courseID, [6] * 18, False, 0, 0, datetime(2025, 1, 1) + timedelta(days=i))
+    before = helper.games.all()
+    helper.addGame(courseID, [3] * 18, False, 0, 0, datetime(2025, 2, 1))
+
+    # the exceptional score is stored with the round, the previous rounds are not rewritten
+    new = helper.getLastGames(0, 0)[0]
+    assert new["exceptional_reduction"] == new["reduction_event"] < 0
+    assert helper.games.all()[: len(before)] == before
+    # the same index as with the reductions written into the previous rounds
+    expected = []
+    for doc in helper.getLastGames()[::-1]:
+        for previous in expected[-19:]:
+            previous["exceptional_reduction"] += doc["reduction_event"]
+        expected.append({key: doc[key] for key in ("handicap_dif", "exceptional_reduction", "shots")})
+    assert helper.get_last_hci(True) == whs.handicap(expected, None)
+
+
+@pytest.fixture
+def hc_log(helper: Helper):
+    # one entry every 10 days, inserted in random order
+    base_date = datetime(2024, 12, 3, 11, 41, 30)
+    entries = [
+        {"whs": 20.0 + i / 10, "ega": 30.0 + i / 10, "date": (base_date - timedelta(days=10 * i)).isoformat()}
+        for i in range(50)
+    ]
+    random.shuffle(entries)
+    helper.hcLog.insert_multiple(entries)
+    return base_date
+
+
+def test_getHCLog(helper: Helper, hc_log):
+    base_date = hc_log
+    # entries on day 0, 10, ..., 90 are inside the window and day 100 was in effect at its start
+    data = helper.getHCLog(0, 100, base_date)
+    assert [doc["whs"] for doc in data] == [20.0 + i / 10 for i in range(11)]
+
+    data = helper.getHCLog(15, 40, base_date)
+    assert [doc["whs"] for doc in data] == [20.2, 20.3, 20.4]
+
+    # m=0 returns the entry in effect on the start date
+    assert [doc["ega"] for doc in helper.getHCLog(m=0, startDate=base_date - timedelta(days=5))] == [30.1]
+    assert helper.getHCLog(startDate=base_date - timedelta(days=1000)) == []
+
+
+def test_get_last_hci(helper: Helper, hc_log):
+    base_date = hc_log
+    assert helper.get_last_hci(True) == 20.0
+    assert helper.get_last_hci(False) == 30.0
+    assert helper.get_hci_on(True, base_date - timedelta(days=15)) == 20.2
+    assert helper.get_hci_on(False, (base_date - timedelta(days=20)).isoformat()) == 30.2
+    assert helper.get_hci_on(True, base_date - timedelta(days=1000)) is None
+
+
+def test_get_last_hci_empty(helper: Helper):
+    assert helper.get_last_hci(True) is None
+
+
+@pytest.fixture(params=["tinydb", "sqlite", "journal"])
+def transactional_helper(request):
+    with TemporaryDirectory() as temp_dir:
+        backend = openBackend(request.param, temp_dir)
+        yield Helper(*backend.tables())
+        backend.close()
+
+
+def test_addGame_single_write(transactional_helper: Helper, real_courses, real_games):
+    helper = transactional_helper
+    helper.courses.insert_multiple(real_courses)
+    base_date = datetime(2025, 1, 1)
+
+    for i, game in enumerate(real_games):
+        writes = helper.games.storage.writes
+        helper.addGame(
+            game["courseID"],
+            game["shots"],
+            game["is9Hole"],
+            game["pcc"],
+            game["cba"],
+            base_date + timedelta(days=i),
+        )
+        # one score post costs exactly one write, even with an exceptional reduction
+        assert helper.lastWrites == 1
+        assert helper.games.storage.writes == writes + 1
+
+    assert len(helper.games.all()) == len(real_games)
+    assert len(helper.hcLog.all()) == len(real_games)
+
+
+def test_transaction_rollback(transactional_helper: Helper, real_courses):
+    helper = transactional_helper
+    helper.courses.insert_multiple(real_courses)
+    writes = helper.games.storage.writes
+
+    with pytest.raises(ZeroDivisionError):
+        with helper.transaction():
+            helper.hcLog.insert({"whs": 54.0, "ega": 54.0, "date": datetime(2025, 1, 1).isoformat()})
+            1 / 0
+
+    assert helper.games.storage.writes == writes
+    assert helper.hcLog.all() == []
+    assert helper.get_last_hci(True) is None
+
+
+def test_nested_rollback_caught(transactional_helper: Helper):
+    helper = transactional_helper
+    writes = helper.games.storage.writes
+
+    with pytest.raises(RuntimeError):
+        with helper.transaction():
+            helper.hcLog.insert({"whs": 54.0, "ega": 54.0, "date": datetime(2025, 1, 1).isoformat()})
+            try:
+                with helper.transaction():
+                    helper.hcLog.insert({"whs": 50.0, "ega": 50.0, "date": datetime(2025, 1, 2).isoformat()})
+                    1 / 0
+            except ZeroDivisionError:
+                pass
+            # still inside the outer transaction, nothing may reach the disk
+            helper.hcLog.insert({"whs": 48.0, "ega": 48.0, "date": datetime(2025, 1, 3).isoformat()})
+            assert helper.games.storage.writes == writes
+
+    assert helper.games.storage.writes == writes
+    assert helper.hcLog.all() == []
+    assert helper.get_last_hci(True) is None
+
+    # the next transaction starts clean
+    with helper.transaction():
+        helper.hcLog.insert({"whs": 40.0, "ega": 40.0, "date": datetime(2025, 1, 4).isoformat()})
+    assert helper.games.storage.writes == writes + 1
+    assert [doc["whs"] for doc in helper.hcLog.all()] == [40.0]
+
+
+def test_importFromDir(transactional_helper: Helper):
+    helper = transactional_helper
+    report = helper.importFromDir(helper.courses, "test/real_data/courses")
+    assert report == {"inserted": 5, "errors": {}}
+
+    with TemporaryDirectory() as temp_dir:
+        for file in pathlib.Path("test/real_data/games").glob("Runde*.json"):
+            (pathlib.Path(temp_dir) / file.name).write_text(file.read_text())
+        (pathlib.Path(temp_dir) / "broken.json").write_text("{")
+        (pathlib.Path(temp_dir) / "no_course.json").write_text(
+            json.dumps({"game_id": "x", "courseID": "Nowhere", "date": "2025-01-01", "shots": [4] * 18, "pcc": 0, "cba": 0, "is9Hole": False})
+        )
+        (pathlib.Path(temp_dir) / "invalid.json").write_text(
+            json.dumps({"game_id": "y", "courseID": "Runde 1", "date": "2025-01-01", "shots": [4] * 18, "pcc": 0, "cba": 0, "is9Hole": True})
+        )
+
+        writes = helper.games.storage.writes
+        report = helper.importFromDir(helper.games, temp_dir, workers=4)
+
+    assert report["inserted"] == 12
+    assert set(report["errors"]) == {"broken.json", "no_course.json", "invalid.json"}
+    # games, differentials and the new handicap are written at once
+    assert helper.games.storage.writes == writes + 1
+    assert len(helper.games.all()) == 12
+    assert all("handicap_dif" in game for game in helper.games.all())
+    assert len(helper.hcLog.all()) == 1
+    assert len(helper.getLastGames()) == 12
+
+
+def test_importFromDir_matches_addGame(transactional_helper: Helper, real_courses, real_games):
+    helper = transactional_helper
+    helper.courses.insert_multiple(real_courses)
+    dates = [datetime(2025, 1, 1) + timedelta(days=i) for i in range(len(real_games))]
+
+    with TemporaryDirectory() as temp_dir:
+        for i, (game, gameDate) in enumerate(zip(real_games, dates)):
+            (pathlib.Path(temp_dir) / f"{i:02}.json").write_text(json.dumps(dict(game, date=gameDate.isoformat())))
+        report = helper.importFromDir(helper.games, temp_dir)
+    assert report["inserted"] == len(real_games)
+
+    db = TinyDB(storage=MemoryStorage)
+    sequential = Helper(db.table("games"), db.table("courses"), db.table("hcLog"))
+    sequential.courses.insert_multiple(real_courses)
+    for game, gameDate in zip(real_games, dates):
+        sequential.addGame(game["courseID"], game["shots"], game["is9Hole"], game["pcc"], game["cba"], gameDate)
+
+    latest = helper.logIndex.latest()
+    assert (latest["whs"], latest["ega"]) == (18.5, 18.4)
+    # one entry per day with the same handicaps
+    assert [(doc["whs"], doc["ega"]) for doc in helper.logIndex.newest()] == [
+        (doc["whs"], doc["ega"]) for doc in sequential.logIndex.newest()
+    ]
+    assert [doc["handicap_dif"] for doc in helper.getLastGames()] == [
+        doc["handicap_dif"] for doc in sequential.getLastGames()
+    ]
+
+
+@pytest.mark.parametrize("name", ["tinydb", "sqlite", "journal"])
+def test_fromBackend_opens_on_first_use(name, real_courses):
+    with TemporaryDirectory() as temp_dir:
+        backend = openBackend(name, temp_dir)
+        helper = Helper.fromBackend(backend)
+        assert not backend.isOpen
+
+        helper.courses.insert_multiple(real_courses)
+        assert backend.isOpen
+        helper.queueGame("Runde 1", [5] * 18, False, 0, 0, datetime(2025, 1, 1))
+        assert len(backend.table("pending")) == 1
+        backend.close()
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+import io
+import json
+import pathlib
+from tempfile import TemporaryDirectory
+
+import pytest
+from backend import openBackend
+import handicapEGA
+import handicapWHS
+from helper import Helper
+import instrumentation
+
+
+@pytest.fixture
+def real_courses():
+    courses = []
+    for file in pathlib.Path("test/real_data/courses").glob("Kurs*.json"):
+        with file.open() as f:
+            courses.append(json.load(f))
+    return courses
+
+
+@pytest.fixture
+def enabled():
+    instrumentation.reset()
+    instrumentation.enable()
+    yield
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+def post(helper: Helper, count: int) -> None:
+    for i in range(count):
+        helper.addGame("Runde 1", [5] * 18, False, 0, 0, datetime(2025, 1, 1) + timedelta(days=i))
+
+
+def test_disabled_costs_nothing():
+    original = Helper.addGame
+    instrumentation.enable()
+    assert Helper.addGame is not original
+    instrumentation.disable()
+    assert Helper.addGame is original
+    assert handicapWHS.handicap.__module__ == "handicapWHS"
+    assert not instrumentation.isEnabled()
+
+
+@pytest.mark.parametrize("name", ["tinydb", "sqlite", "journal"])
+def test_operations(name, real_courses, enabled):
+    with TemporaryDirectory() as temp_dir:
+        backend = openBackend(name, temp_dir)
+        backend.courses.insert_multiple(real_courses)
+        helper = Helper(*backend.tables())
+        post(helper, 3)
+        helper.getLastGames()
+        helper.getCourses([{"courseID": "Runde 1"}])
+        backend.close()
+
+    stats = instrumentation.snapshot()
+    addGame = stats["operations"]["Helper.addGame"]
+    assert addGame["count"] == 3
+    assert addGame["documents"] > 0
+    assert addGame["bytes"] > 0
+    # the calls inside addGame are timed but are not operations of their own
+    assert stats["calls"]["Helper.updateHandicapIndex"]["count"] == 3
+    assert "Helper.updateHandicapIndex" not in stats["operations"]
+    assert stats["calls"]["handicapWHS.handicapDifferential"]["count"] == 3
+    assert stats["operations"]["Helper.getLastGames"]["bytes"] == 0
+
+    if name == "tinydb":
+        # every tinyDB read is a scan
+        assert addGame["scans"] > 0
+    else:
+        # the courses are found by the index
+        assert stats["operations"]["Helper.getCourses"]["scans"] == 0
+
+
+def test_dump(real_courses, enabled):
+    with TemporaryDirectory() as temp_dir:
+        backend = openBackend("journal", temp_dir)
+        backend.courses.insert_multiple(real_courses)
+        post(Helper(*backend.tables()), 1)
+        backend.close()
+    output = io.StringIO()
+    instrumentation.dump(output)
+    assert json.loads(output.getvalue()) == instrumentation.snapshot()
+
+
+def test_profiled():
+    with instrumentation.profiled(limit=5) as result:
+        handicapEGA.convertToStableford([5] * 18, [4] * 18)
+    assert "convertToStableford" in result["stats"]
@@ -0,0 +1,186 @@
+import os
+import random
+from tempfile import TemporaryDirectory
+
+import pytest
+from tinydb import where
+from journal import Journal
+
+INDEXES = {"games": ("date", "courseID", "game_id"), "hcLog": ("date",)}
+
+
+@pytest.fixture
+def path():
+    with TemporaryDirectory() as temp_dir:
+        yield f"{temp_dir}/db.jsonl"
+
+
+def snapshot(journal: Journal) -> dict:
+    return {
+        name: {doc.doc_id: dict(doc) for doc in journal.table(name).all()}
+        for name in ("games", "hcLog")
+    }
+
+
+def test_reopen_rebuilds_index(path):
+    journal = Journal(path, INDEXES)
+    games, hcLog = journal.table("games"), journal.table("hcLog")
+    games.insert_multiple({"game_id": str(i), "date": f"2025-01-{i + 1:02}", "courseID": "A"} for i in range(20))
+    hcLog.insert({"whs": 54.0, "date": "2025-01-01"})
+    games.update({"courseID": "B"}, where("game_id") == "3")
+    games.remove(doc_ids=[5])
+    expected = snapshot(journal)
+    journal.close()
+
+    journal = Journal(path, INDEXES)
+    assert snapshot(journal) == expected
+    assert [doc["game_id"] for doc in journal.table("games").search(where("courseID") == "B")] == ["3"]
+    assert journal.table("games").insert({"game_id": "x"}) == 21
+    journal.close()
+
+
+def test_interrupted_write_is_cut_off(path):
+    journal = Journal(path, INDEXES)
+    journal.table("games").insert({"game_id": "a", "date": "2025-01-01"})
+    journal.close()
+    size = os.path.getsize(path)
+
+    # a transaction without its commit line and half a line
+    with open(path, "ab") as file:
+        file.write(b'{"t":"games","id":2,"doc":{"game_id":"b"}}\n{"t":"games","id":3,"do')
+
+    journal = Journal(path, INDEXES)
+    assert [doc["game_id"] for doc in journal.table("games").all()] == ["a"]
+    assert os.path.getsize(path) == size
+    journal.close()
+
+
+def test_transaction_single_append(path):
+    journal = Journal(path, INDEXES)
+    games = journal.table("games")
+    journal.begin()
+    docId = games.insert({"game_id": "a", "date": "2025-01-01"})
+    games.update({"pcc": 1}, doc_ids=[docId])
+    # changes are visible before they are appended
+    assert games.get(doc_id=docId)["pcc"] == 1
+    assert os.path.getsize(path) == 0
+    journal.commit()
+    assert journal.writes == 1
+
+    journal.begin()
+    games.remove(doc_ids=[docId])
+    journal.rollback()
+    assert games.get(doc_id=docId)["pcc"] == 1
+    journal.close()
+
+
+@pytest.mark.parametrize("background", [False, True])
+def test_compaction(path, background):
+    journal = Journal(path, INDEXES, compactMinimum=100, background=background)
+    games = journal.table("games")
+    rng = random.Random(0)
+    ids = games.insert_multiple({"game_id": str(i), "date": f"2025-01-{i % 28 + 1:02}", "pcc": 0} for i in range(50))
+    for i in range(500):
+        docId = rng.choice(ids)
+        games.update({"pcc": i}, doc_ids=[docId])
+        if i % 100 == 0:
+            games.remove(doc_ids=[ids.pop()])
+            journal.table("hcLog").insert({"whs": i / 10, "date": f"2025-02-{i % 28 + 1:02}"})
+    expected = snapshot(journal)
+    journal.close()
+
+    assert journal.compactions > 0
+    # every document is written once plus the changes since the last compaction
+    assert sum(1 for _ in open(path)) < 500
+
+    journal = Journal(path, INDEXES)
+    assert snapshot(journal) == expected
+    # doc_ids of removed documents are not used again
+    assert journal.table("games").insert({"game_id": "x"}) == 51
+    journal.close()
+
+
+def test_maps_closed(path):
+    # a file that is still mapped can not be replaced or deleted on Windows
+    journal = Journal(path, INDEXES, background=False)
+    games = journal.table("games")
+    games.insert({"game_id": "0", "date": "2025-01-01", "pcc": 0})
+    first = journal._map
+    games.update({"pcc": 1}, doc_ids=[1])
+    assert first.closed
+    mapped = journal._map
+    journal.compact()
+    assert mapped.closed
+    assert games.get(doc_id=1)["pcc"] == 1
+    last = journal._map
+    journal.close()
+    assert last.closed
+
+
+def test_compaction_then_rollback(path):
+    journal = Journal(path, INDEXES, background=False)
+    games = journal.table("games")
+    games.insert_multiple({"game_id": str(i), "date": f"2025-01-{i + 1:02}", "pcc": 0} for i in range(3))
+    games.update({"pcc": 1}, doc_ids=[3])
+    expected = snapshot(journal)
+
+    journal.begin()
+    games.update({"pcc": 2}, doc_ids=[1])
+    games.remove(doc_ids=[2])
+    games.insert({"game_id": "x"})
+    journal.compact()
+    # the changes of the open transaction are not in the compacted file
+    assert journal.compactions == 1
+    assert games.get(doc_id=1)["pcc"] == 2
+    journal.rollback()
+    assert snapshot(journal) == expected
+    journal.close()
+
+    journal = Journal(path, INDEXES)
+    assert snapshot(journal) == expected
+    journal.close()
+
+
+def test_compaction_then_commit(path):
+    journal = Journal(path, INDEXES, background=False)
+    games = journal.table("games")
+    games.insert_multiple({"game_id": str(i), "pcc": 0} for i in range(3))
+    journal.begin()
+    games.update({"pcc": 2}, doc_ids=[1])
+    games.remove(doc_ids=[2])
+    journal.compact()
+    journal.commit()
+    expected = snapshot(journal)
+    journal.compact()
+    journal.close()
+
+    journal = Journal(path, INDEXES)
+    assert snapshot(journal) == expected
+    assert sorted(expected["games"]) == [1, 3]
+    journal.close()
+
+
+def test_index_matches_scan(path):
+    journal = Journal(path, INDEXES)
+    games = journal.table("games")
+    rng = random.Random(1)
+    docs = [
+        {"game_id": str(i), "courseID": rng.choice("ABC"), "date": f"2025-{rng.randrange(1, 13):02}-{rng.randrange(1, 29):02}"}
+        for i in range(200)
+    ]
+    games.insert_multiple(docs)
+    games.remove(where("courseID") == "C")
+    games.update({"date": "2025-06-15"}, where("courseID") == "B")
+
+    queries = [
+        where("date") < "2025-06-15",
+        where("date") <= "2025-06-15",
+        where("date") > "2025-06-15",
+        where("date") >= "2025-06-15",
+        (where("date") >= "2025-03-01") & (where("courseID") == "A"),
+        where("courseID").one_of(["A", "C"]),
+        where("game_id") == "17",
+    ]
+    for query in queries:
+        assert games.search(query) == [doc for doc in games.all() if query(doc)]
+    journal.close()
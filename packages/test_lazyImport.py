@@ -0,0 +1,40 @@
+import subprocess
+import sys
+
+import pytest
+from lazyImport import lazyImport
+
+
+def imported(statement: str) -> set[str]:
+    # the modules loaded by the statement in a new interpreter
+    script = f"import sys\n{statement}\nprint(' '.join(name for name, module in sys.modules.items() if type(module).__name__ != '_LazyModule'))"
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True, cwd="packages")
+    return set(result.stdout.split())
+
+
+def test_loaded_on_first_use():
+    assert "fpdf" not in imported("import helper")
+    assert "numpy" not in imported("import helper")
+    assert "fpdf" in imported("import helper; helper.fpdf.FPDF")
+
+
+def test_handicap_modules_loaded_on_first_use():
+    loaded = imported("import helper")
+    # the storage modules are loaded by the backends, not by the helper
+    for module in ("handicapEGA", "handicapWHS", "replayEGA", "course", "journal", "sqlite3", "mmap"):
+        assert module not in loaded
+    assert "handicapEGA" in imported("import helper; helper.ega.roundHalfUp")
+
+
+def test_lazyImport():
+    json = lazyImport("json")
+    assert json.loads("[1]") == [1]
+    assert lazyImport("json") is sys.modules["json"]
+    with pytest.raises(ModuleNotFoundError):
+        lazyImport("no_such_module")
+
+
+def test_submodule():
+    assert "concurrent.futures" not in imported("import helper")
+    # the submodule is an attribute of its package like after an import
+    assert "asyncio" in imported("import helper, asyncio")
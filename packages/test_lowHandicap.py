@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+import random
+
+import pytest
+from tinydb import TinyDB
+from tinydb.storages import MemoryStorage
+from helper import Helper
+from lowHandicap import RollingLow
+
+
+def test_rollingLow():
+    entries = [(datetime(2024, 1, 1), 10.0), (datetime(2024, 6, 1), 12.0), (datetime(2025, 3, 1), 14.0)]
+    assert RollingLow(entries[:2]).low(datetime(2024, 12, 1)) == 10.0
+    low = RollingLow(entries)
+    assert low.low(datetime(2025, 3, 1)) == 10.0
+    # the entry of 2024-01-01 was replaced on 2024-06-01, before the year started
+    assert low.low(datetime(2025, 7, 1)) == 12.0
+    low.append(datetime(2025, 8, 1), 11.0)
+    assert low.low(datetime(2026, 8, 1)) == 11.0
+    assert RollingLow().low(datetime(2023, 7, 1)) is None
+
+
+def test_rollingLow_order():
+    low = RollingLow([(datetime(2024, 6, 1), 12.0)])
+    with pytest.raises(ValueError):
+        low.append(datetime(2024, 1, 1), 10.0)
+    low.low(datetime(2025, 7, 1))
+    with pytest.raises(ValueError):
+        low.low(datetime(2025, 1, 1))
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_logIndex_matches_getHCLog(compact):
+    db = TinyDB(storage=MemoryStorage)
+    helper = Helper(db.table("games"), db.table("courses"), db.table("hcLog"), compact=compact)
+    rng = random.Random(7)
+    entryDate = datetime(2020, 1, 1, 10)
+
+    def expected(gameDate: datetime) -> float | None:
+        return min((doc["whs"] for doc in helper.getHCLog(startDate=gameDate)), default=None)
+
+    for _ in range(400):
+        entryDate += timedelta(days=rng.choice([0, 1, 3, 20, 90]), hours=rng.randrange(3))
+        # written like _logHandicap, sometimes replacing the entry of the same day
+        helper._logHandicap(round(rng.uniform(5.0, 30.0), 1), 20.0, entryDate)
+        assert helper.logIndex.low(entryDate) == expected(entryDate)
+        if rng.random() < 0.1:
+            # an older round, e.g. from a correction
+            olderDate = entryDate - timedelta(days=rng.randrange(1, 500))
+            assert helper.logIndex.low(olderDate) == expected(olderDate)
+        if rng.random() < 0.05:
+            # a restart
+            helper.reindex()
+
+    later = entryDate + timedelta(days=200)
+    assert helper.logIndex.low(later) == expected(later)
@@ -0,0 +1,110 @@
+from datetime import date, datetime
+import json
+import pathlib
+import random
+from tempfile import TemporaryDirectory
+
+import numpy as np
+import pytest
+from backend import openBackend
+from club import Club
+import handicapWHS as whs
+import playingConditions as pc
+import revision
+
+
+@pytest.fixture(params=["tinydb", "sqlite", "journal"])
+def club(request):
+    with TemporaryDirectory() as temp_dir:
+        backend = openBackend(request.param, temp_dir)
+        for file in pathlib.Path("test/real_data/courses").glob("Kurs*.json"):
+            with file.open() as f:
+                backend.courses.insert(json.load(f))
+        yield Club(backend)
+        backend.close()
+
+
+def field(fieldNumber: int, count: int, difference: float, hci: float = 10.0, is9Hole: bool = False) -> list[tuple]:
+    expected = float(pc.expectedDifferentials(hci))
+    return [(fieldNumber, expected + difference, hci, is9Hole)] * count
+
+
+def test_thresholds():
+    rounds = (
+        field(0, 10, 2.5)
+        + field(1, 10, -1.5)
+        + field(2, 10, 0.4)
+        + field(3, 7, 5.0)
+        + field(4, 10, 5.0, hci=40.0)
+        + field(5, 10, 5.0, is9Hole=True)
+        + field(6, 10, 12.0)
+        + field(6, 5, -30.0, hci=54.0)
+    )
+    fields, differentials, hcis, is9Hole = map(np.array, zip(*rounds))
+    pcc, calculated = pc.playingConditions(differentials, hcis, is9Hole, fields)
+    assert pcc.tolist() == [2.0, -1.0, 0.0, 0.0, 0.0, 0.0, 3.0]
+    assert calculated.tolist() == [True, True, True, False, False, False, True]
+
+
+def test_matches_loop():
+    rng = random.Random(0)
+    count = 5000
+    fields = np.array([rng.randrange(300) for _ in range(count)])
+    hcis = np.array([rng.choice([54.0, round(rng.uniform(-5, 45), 1)]) for _ in range(count)])
+    is9Hole = np.array([rng.random() < 0.2 for _ in range(count)])
+    differentials = np.array([hci * 1.04 + 2.4 + rng.gauss(0.5, 3) for hci in hcis])
+    pcc, calculated = pc.playingConditions(differentials, hcis, is9Hole, fields)
+
+    for number in range(300):
+        differences = [
+            dif - (hci * 1.04 + 2.4)
+            for f, dif, hci, nine in zip(fields, differentials, hcis, is9Hole)
+            if f == number and not nine and hci <= 36
+        ]
+        assert calculated[number] == (len(differences) >= 8)
+        mean = sum(differences) / len(differences) if differences else 0.0
+        expected = 0 if len(differences) < 8 else -1 if mean < -1 else 0 if mean < 1 else 1 if mean < 2 else 2 if mean < 3 else 3
+        assert pcc[number] == expected
+
+
+def test_updatePending(club: Club):
+    course = club.courses.get(lambda doc: doc["courseID"] == "Runde 1")
+    badDay = datetime(2025, 3, 1, 10)
+    # a few rounds the day before are not enough for a pcc
+    normalDay = datetime(2025, 2, 28, 10)
+    for i in range(12):
+        helper = club.addPlayer(f"p{i}")
+        helper.hcLog.insert({"whs": 10.0 if i < 10 else 45.0, "ega": 10.0, "date": "2025-01-01T00:00:00"})
+        helper.reindex()
+        # a stormy day, everybody plays two shots over par on every hole
+        helper.queueGame("Runde 1", [par + 2 for par in course["par"]], False, 0, 0, badDay)
+        if i < 3:
+            helper.queueGame("Runde 1", list(course["par"]), False, 1, 0, normalDay)
+    club.player("p0").queueGame("Runde 1", [par + 2 for par in course["par"][:9]], True, 0, 0, badDay)
+
+    storage = club.courses.storage
+    before = getattr(storage, "writes", 0)
+    result = pc.updatePending([club.player(playerID) for playerID in club.playerIDs()], date(2025, 3, 2))
+    assert result == {("Runde 1", date(2025, 3, 1)): 3.0}
+    if hasattr(storage, "writes"):
+        assert storage.writes - before == 1
+
+    for playerID in club.playerIDs():
+        for doc in club.player(playerID).pending.all():
+            assert doc["pcc"] == (3.0 if doc["date"].startswith("2025-03-01") else 1)
+
+    revision.reviseClub(club, date(2025, 3, 2))
+    games = club.player("p0").games.all()
+    assert sorted(game["pcc"] for game in games) == [1, 3.0, 3.0]
+    # the stormy day lowers the differentials (WHS 5.1 subtracts the pcc)
+    for game in games:
+        if len(game["shots"]) == 18:
+            calm = whs.handicapDifferential(dict(game, pcc=0), course, 10.0)["handicap_dif"]
+            expected = whs.roundHalfUp((sum(game["shots"]) - course["course_rating"] - game["pcc"]) * 113 / course["slope_rating"], 1)
+            assert game["handicap_dif"] == expected
+            assert game["handicap_dif"] < calm
+
+
+def test_updatePending_nothing_pending(club: Club):
+    club.addPlayer("anna")
+    assert pc.updatePending([club.player("anna")], date(2025, 3, 2)) == {}
@@ -0,0 +1,126 @@
+import copy
+from datetime import datetime, timedelta
+import json
+import pathlib
+from tempfile import TemporaryDirectory
+
+import numpy as np
+import pytest
+from backend import openBackend
+import handicapEGA as ega
+import handicapWHS as whs
+from helper import Helper
+import projection
+import synthetic
+
+NEXT_ROUND = datetime(2024, 6, 1, 10)
+
+
+@pytest.fixture
+def real_courses():
+    courses = []
+    for file in sorted(pathlib.Path("test/real_data/courses").glob("Kurs*.json")):
+        with file.open() as f:
+            courses.append(json.load(f))
+    return courses
+
+
+def player(backend, courses: list[dict], count: int, seed: int = 0, handicapIndex: float = 30.0) -> Helper:
+    backend.courses.insert_multiple(courses)
+    helper = Helper(*backend.tables())
+    start = NEXT_ROUND - timedelta(days=7 * count + 1)
+    for game in synthetic.rounds(courses, count, seed, handicapIndex, start):
+        helper.addGame(game["courseID"], game["shots"], game["is9Hole"], 0, 0, game["date"])
+    return helper
+
+
+def scalar(helper: Helper, course: dict, shots: list[int], is9Hole: bool, pcc: float, cba: int) -> tuple[float, float]:
+    # the handicaps addGame would log for the round, calculated with the scalar functions
+    hci = helper.get_last_hci(True)
+    game = {"shots": list(shots), "pcc": pcc, "cba": cba, "is9Hole": is9Hole}
+    game = whs.handicapDifferential(game, course, 54.0 if hci is None else hci)
+    # the reduction of the game applies to the previous ones through its reduction_event
+    previous = helper.getLastGames(0, 18)
+    low = min((doc["whs"] for doc in helper.getHCLog(startDate=NEXT_ROUND)), default=None)
+    return (
+        whs.handicap([game] + previous, low),
+        ega.calculateNewHandicap(game, cba, helper.get_last_hci(False), course),
+    )
+
+
+@pytest.mark.parametrize("count", [0, 2, 3, 4, 5, 6, 12, 19, 30])
+def test_matches_scalar(real_courses, count):
+    with TemporaryDirectory() as temp_dir:
+        backend = openBackend("journal", temp_dir)
+        helper = player(backend, real_courses, count, seed=count)
+        state = helper.projectionState(NEXT_ROUND)
+        for course in real_courses:
+            for is9Hole in ([True, False] if len(course["par"]) == 18 else [True]):
+                for pcc, cba in [(0, 0), (2, -1)]:
+                    result = projection.project(state, course, is9Hole, pcc, cba)
+                    expected = [scalar(helper, course, shots, is9Hole, pcc, cba) for shots in result["shots"].tolist()]
+                    assert result["whs"].tolist() == [value for value, _ in expected]
+                    assert result["ega"].tolist() == [value for _, value in expected]
+                    assert result["scores"].tolist() == result["shots"].sum(axis=1).tolist()
+        backend.close()
+
+
+def test_matches_addGame(real_courses):
+    course = real_courses[0]
+    with TemporaryDirectory() as temp_dir:
+        backend = openBackend("journal", temp_dir)
+        result = player(backend, real_courses, 25).projectRound(course["courseID"], False, gameDate=NEXT_ROUND)
+        backend.close()
+
+    # the first and the last score of some thresholds, added for real
+    for threshold in result["thresholds"]["whs"][:: max(1, len(result["thresholds"]["whs"]) // 3)]:
+        row = int(np.flatnonzero(result["scores"] == threshold["max_score"])[0])
+        with TemporaryDirectory() as temp_dir:
+            backend = openBackend("journal", temp_dir)
+            helper = player(backend, real_courses, 25)
+            helper.addGame(course["courseID"], result["shots"][row].tolist(), False, 0, 0, NEXT_ROUND)
+            assert helper.get_last_hci(True) == threshold["handicap"]
+            assert helper.get_last_hci(False) == result["ega"][row]
+            backend.close()
+
+
+def test_cap(real_courses):
+    # a low handicap far below the current differentials, so the soft and the hard cap apply
+    games = [
+        {"handicap_dif": 20.0 + i / 10, "exceptional_reduction": 0.0, "shots": [5] * 18}
+        for i in range(19)
+    ]
+    state = projection.prepare(games, 14.3, 20.0, 20.0)
+    result = projection.project(state, real_courses[0], False)
+    for shots, index, differential, reduction in zip(
+        result["shots"].tolist(), result["whs"], result["differentials"], result["reductions"]
+    ):
+        window = copy.deepcopy(games)
+        for game in window:
+            game["exceptional_reduction"] += reduction
+        window.append({"handicap_dif": differential, "exceptional_reduction": reduction, "shots": shots})
+        assert index == whs.handicap(window, 14.3)
+    # 20.3 without the cap, 14.3 + 3.0 + half of the remaining 3.0
+    assert result["whs"].max() == 18.8
+    # 20.3 is more than 5.0 above a low of 12.0 even with the soft cap
+    state = projection.prepare(games, 12.0, 20.0, 20.0)
+    assert projection.project(state, real_courses[0], False)["whs"].max() == 17.0
+
+
+def test_thresholds():
+    scores = np.arange(70, 76)
+    handicaps = np.array([10.1, 10.1, 10.2, 10.4, 10.4, 10.4])
+    assert projection.thresholds(scores, handicaps) == [
+        {"max_score": 71, "handicap": 10.1},
+        {"max_score": 72, "handicap": 10.2},
+        {"max_score": 75, "handicap": 10.4},
+    ]
+
+
+def test_projectRound_unknown_course():
+    with TemporaryDirectory() as temp_dir:
+        backend = openBackend("journal", temp_dir)
+        with pytest.raises(KeyError):
+            Helper(*backend.tables()).projectRound("nowhere", False)
+        backend.close()
+
@@ -0,0 +1,147 @@
+import json
+import pathlib
+from tempfile import TemporaryDirectory
+
+import pytest
+from backend import openBackend
+from helper import Helper
+import recalculation
+import synthetic
+
+COUNT = 45
+
+
+@pytest.fixture
+def real_courses():
+    courses = []
+    for file in sorted(pathlib.Path("test/real_data/courses").glob("Kurs*.json")):
+        with file.open() as f:
+            courses.append(json.load(f))
+    return courses
+
+
+@pytest.fixture
+def rounds(real_courses):
+    # one round per day, so addGame calculates like the daily recalculation
+    return list(synthetic.rounds(real_courses, COUNT, seed=3, handicapIndex=25.0))
+
+
+@pytest.fixture(params=["tinydb", "sqlite", "journal"])
+def backend_name(request):
+    return request.param
+
+
+def build(temp_dir: str, name: str, courses: list[dict], rounds: list[dict]) -> Helper:
+    backend = openBackend(name, temp_dir)
+    backend.courses.insert_multiple(courses)
+    helper = Helper(*backend.tables())
+    for game in rounds:
+        helper.addGame(game["courseID"], list(game["shots"]), game["is9Hole"], game["pcc"], game["cba"], game["date"])
+    return helper
+
+
+def state(helper: Helper) -> tuple[list, list]:
+    # the shots are compared on their own, a rebuild adjusts the stored shots again
+    games = [
+        (game["date"], game["courseID"], game["handicap_dif"], game["exceptional_reduction"])
+        for game in helper.getLastGames(0, None)
+    ]
+    log = [dict(entry) for entry in helper.logIndex.newest()]
+    return games, log
+
+
+def stored(helper: Helper) -> list[dict]:
+    # the rounds with the shots as addGame stored them, adjusted to net double bogey
+    return [
+        {key: game[key] for key in ("courseID", "shots", "is9Hole", "pcc", "cba", "date")}
+        for game in helper.getLastGames(0, None)[::-1]
+    ]
+
+
+def rebuilt(name: str, courses: list[dict], rounds: list[dict]) -> tuple[list, list]:
+    with TemporaryDirectory() as temp_dir:
+        return state(build(temp_dir, name, courses, rounds))
+
+
+def test_checkpoints(real_courses, rounds):
+    with TemporaryDirectory() as temp_dir:
+        helper = build(temp_dir, "journal", real_courses, rounds)
+        log = helper.logIndex.newest()[::-1]
+        assert [i for i, entry in enumerate(log) if "checkpoint" in entry] == [0, 20, 40]
+        newest = helper.getLastGames(COUNT - 41, COUNT - 23)
+        assert log[40]["checkpoint"] == recalculation.checkpoint(newest)
+
+
+def test_correctGame(backend_name, real_courses, rounds):
+    with TemporaryDirectory() as temp_dir:
+        helper = build(temp_dir, backend_name, real_courses, rounds)
+        corrected = stored(helper)
+        corrected[30]["shots"] = [max(1, shots - 2) for shots in rounds[30]["shots"]]
+        gameID = helper.getLastGames(COUNT - 31, COUNT - 31)[0]["game_id"]
+        report = helper.correctGame(gameID, shots=corrected[30]["shots"])
+        assert report["checkpoint"] == helper.logIndex.newest()[COUNT - 21]["date"]
+        assert report["games"] == COUNT - 21
+        assert state(helper) == rebuilt(backend_name, real_courses, corrected)
+        # the db has the same state as the helper
+        helper.discardCaches()
+        assert state(helper) == rebuilt(backend_name, real_courses, corrected)
+
+
+def test_correctGame_keeps_shots(real_courses, rounds):
+    with TemporaryDirectory() as temp_dir:
+        helper = build(temp_dir, "journal", real_courses, rounds)
+        before = stored(helper)
+        gameID = helper.getLastGames(COUNT - 11, COUNT - 11)[0]["game_id"]
+        # a much better round lowers the index of the later games, then it is corrected back
+        helper.correctGame(gameID, shots=[max(1, shots - 3) for shots in before[10]["shots"]])
+        helper.correctGame(gameID, shots=before[10]["shots"])
+        assert stored(helper) == before
+        helper.discardCaches()
+        assert stored(helper) == before
+
+
+def test_removeGame(real_courses, rounds):
+    with TemporaryDirectory() as temp_dir:
+        helper = build(temp_dir, "journal", real_courses, rounds)
+        kept = stored(helper)
+        # there is no checkpoint before the first game, the whole history is replayed
+        report = helper.removeGame(helper.getLastGames(COUNT - 1, COUNT - 1)[0]["game_id"])
+        assert report["checkpoint"] is None
+        assert state(helper) == rebuilt("journal", real_courses, kept[1:])
+        report = helper.removeGame(helper.getLastGames(COUNT - 12, COUNT - 12)[0]["game_id"])
+        assert report["checkpoint"] == helper.logIndex.newest()[-1]["date"]
+        assert state(helper) == rebuilt("journal", real_courses, kept[1:11] + kept[12:])
+
+
+def test_correctCourse(real_courses, rounds):
+    fixed = [dict(course) for course in real_courses]
+    courseID = rounds[25]["courseID"]
+    for course in fixed:
+        if course["courseID"] == courseID:
+            course["course_rating"] -= 1.5
+            rating = course["course_rating"]
+    with TemporaryDirectory() as temp_dir:
+        helper = build(temp_dir, "journal", real_courses, rounds)
+        kept = stored(helper)
+        helper.correctCourse(courseID, courseRating=rating)
+        assert state(helper) == rebuilt("journal", fixed, kept)
+
+
+def test_nothing_changed(real_courses, rounds):
+    with TemporaryDirectory() as temp_dir:
+        helper = build(temp_dir, "journal", real_courses, rounds)
+        report = helper.recalculate(rounds[35]["date"])
+        assert report["games"] == COUNT - 21
+        assert (report["updatedGames"], report["removedEntries"], report["insertedEntries"]) == (0, 0, 0)
+
+
+def test_stale_checkpoint(real_courses, rounds):
+    with TemporaryDirectory() as temp_dir:
+        helper = build(temp_dir, "journal", real_courses, rounds)
+        # changed behind the helper's back, so the checkpoint after it can not be used
+        game = helper.getLastGames(COUNT - 31, COUNT - 31)[0]
+        helper.games.update({"handicap_dif": game["handicap_dif"] + 1}, doc_ids=[game.doc_id])
+        helper.reindex()
+        report = helper.recalculate(rounds[42]["date"])
+        assert report["checkpoint"] == helper.logIndex.newest()[COUNT - 21]["date"]
+        assert state(helper) == rebuilt("journal", real_courses, stored(helper))
@@ -0,0 +1,83 @@
+import copy
+import json
+import pathlib
+import pickle
+
+import pytest
+from datetime import datetime
+import handicapWHS as whs
+from records import Game, HandicapLogEntry
+
+
+@pytest.fixture
+def games():
+    files = list(pathlib.Path("test/real_data/games").glob("Runde*.json"))
+    runden = list()
+    for file in files:
+        with file.open() as file:
+            runden.append(json.load(file))
+    return runden
+
+
+@pytest.fixture
+def courses():
+    files = list(pathlib.Path("test/real_data/courses").glob("Kurs*.json"))
+    kurse = dict()
+    for file in files:
+        with file.open() as file:
+            data = json.load(file)
+        kurse[data["courseID"]] = data
+    return kurse
+
+
+def test_lossless_conversion(games):
+    for doc in games:
+        game = Game.fromDoc(doc)
+        # same JSON, including the date string and the fields Game has no slot for
+        assert json.dumps(game.toDoc(), sort_keys=True) == json.dumps(doc, sort_keys=True)
+        assert game == doc
+        assert game.date == datetime.fromisoformat(doc["date"])
+        assert game.dateOrdinal == datetime.fromisoformat(doc["date"]).toordinal()
+        assert game["shots"].typecode == "b"
+
+
+def test_date_formats():
+    for text in ["2025-02-11", "2025-02-11T12:00:00", "2025-02-11T12:00:00.000000", "2025-02-11T12:00",
+                 "2024-12-03T11:41:30.013870", "2025-02-11T12:00:00+01:00", "2025-02-11 12:00:00"]:
+        entry = HandicapLogEntry({"whs": 54.0, "ega": 54, "date": text})
+        assert entry["date"] == text
+        assert entry.date.replace(tzinfo=None) == datetime.fromisoformat(text).replace(tzinfo=None)
+
+
+def test_mapping_interface():
+    entry = HandicapLogEntry({"whs": 20.1, "ega": 22, "date": "2025-01-01"}, doc_id=3)
+    assert entry.doc_id == 3
+    assert set(entry) == {"whs", "ega", "date"}
+    assert len(entry) == 3
+    assert entry.get("other") is None
+    entry["other"] = 1
+    assert entry["other"] == 1
+    del entry["whs"]
+    assert "whs" not in entry
+    with pytest.raises(KeyError):
+        entry["whs"]
+    with pytest.raises(AttributeError):
+        entry.something = 1
+
+
+def test_copy_and_pickle(games):
+    game = Game(games[0], doc_id=1)
+    for other in (copy.deepcopy(game), pickle.loads(pickle.dumps(game))):
+        assert other == game
+        assert other.doc_id == 1
+
+
+def test_handicapWHS_accepts_records(games, courses):
+    for doc in games:
+        expected = whs.handicapDifferential(copy.deepcopy(doc), courses[doc["courseID"]], 30.0)
+        game = whs.handicapDifferential(Game(doc), courses[doc["courseID"]], 30.0)
+        assert game.toDoc() == expected
+
+    records = [whs.handicapDifferential(Game(doc), courses[doc["courseID"]], 30.0) for doc in games]
+    dicts = [whs.handicapDifferential(copy.deepcopy(doc), courses[doc["courseID"]], 30.0) for doc in games]
+    assert whs.handicap(records, 25.0) == whs.handicap(dicts, 25.0)
@@ -0,0 +1,64 @@
+import json
+import pathlib
+import random
+
+import pytest
+import handicapEGA as hc
+from replayEGA import replay, replayHandicap
+
+
+@pytest.fixture
+def courses():
+    files = list(pathlib.Path("test/real_data/courses").glob("Kurs*.json"))
+    kurse = dict()
+    for file in files:
+        with file.open() as file:
+            data = json.load(file)
+        kurse[data["courseID"]] = data
+    return kurse
+
+
+@pytest.fixture
+def games():
+    files = sorted(
+        pathlib.Path("test/real_data/games").glob("Runde*.json"),
+        key=lambda file: int(file.stem[len("Runde"):]),
+    )
+    runden = list()
+    for file in files:
+        with file.open() as file:
+            runden.append(json.load(file))
+    return runden
+
+
+def step_by_step(games: list[dict], courses: dict, handicap: float | None) -> list[float]:
+    result = []
+    for game in games:
+        handicap = hc.calculateNewHandicap(game, int(game["cba"]), handicap, courses[game["courseID"]])
+        result.append(handicap)
+    return result
+
+
+def test_replay_matches_calculateNewHandicap(games, courses):
+    for handicap in [None, 54.0, 36.0, 18.4, 11.5]:
+        trajectory = replayHandicap(games, courses, handicap)
+        assert [entry["ega"] for entry in trajectory] == step_by_step(games, courses, handicap)
+        assert [entry["game_id"] for entry in trajectory] == [game["game_id"] for game in games]
+
+
+def test_replay_random_history(games, courses):
+    rng = random.Random(1)
+    history = [rng.choice(games) for _ in range(2000)]
+    trajectory = replayHandicap(history, list(courses.values()))
+    assert [entry["ega"] for entry in trajectory] == step_by_step(history, courses, None)
+
+
+def test_replay_is_lazy(games, courses):
+    trajectory = replay(iter(games), courses)
+    assert next(trajectory)["ega"] == hc.calculateNewHandicap(games[0], 0, None, courses[games[0]["courseID"]])
+
+
+def test_replay_unknown_course(games, courses):
+    del courses[games[0]["courseID"]]
+    with pytest.raises(KeyError):
+        replayHandicap(games, courses)
@@ -0,0 +1,179 @@
+from datetime import date, datetime, timedelta
+import json
+import pathlib
+from tempfile import TemporaryDirectory
+
+import pytest
+from tinydb import TinyDB
+from tinydb.storages import MemoryStorage
+from backend import openBackend
+from club import Club
+from helper import Helper
+import revision
+
+
+@pytest.fixture
+def real_courses():
+    courses = []
+    for file in pathlib.Path("test/real_data/courses").glob("Kurs*.json"):
+        with file.open() as f:
+            courses.append(json.load(f))
+    return courses
+
+
+@pytest.fixture
+def real_games():
+    games = []
+    for file in sorted(pathlib.Path("test/real_data/games").glob("Runde*.json"), key=lambda f: int(f.stem.removeprefix("Runde"))):
+        with file.open() as f:
+            games.append(json.load(f))
+    return games
+
+
+@pytest.fixture(params=["tinydb", "sqlite", "journal"])
+def backend(request, real_courses):
+    with TemporaryDirectory() as temp_dir:
+        backend = openBackend(request.param, temp_dir)
+        backend.courses.insert_multiple(real_courses)
+        yield backend
+        backend.close()
+
+
+def queuedHelper(backend) -> Helper:
+    games, courses, hcLog = backend.tables()
+    return Helper(games, courses, hcLog, pending=backend.table("pending"))
+
+
+def memoryHelper(courses: list[dict]) -> Helper:
+    db = TinyDB(storage=MemoryStorage)
+    helper = Helper(db.table("games"), db.table("courses"), db.table("hcLog"), pending=db.table("pending"))
+    helper.courses.insert_multiple(courses)
+    return helper
+
+
+def post(helper: Helper, games: list[dict], queue: bool, perDay: int = 1):
+    base_date = datetime(2025, 1, 1, 10)
+    for i, game in enumerate(games):
+        gameDate = base_date + timedelta(days=i // perDay, hours=i % perDay)
+        args = (game["courseID"], game["shots"], game["is9Hole"], game["pcc"], game["cba"], gameDate)
+        if queue:
+            helper.queueGame(*args)
+        else:
+            helper.addGame(*args)
+
+
+def strip(docs: list[dict]) -> list[dict]:
+    return [{key: value for key, value in doc.items() if key != "game_id"} for doc in docs]
+
+
+def test_queue_is_cheap(backend, real_games):
+    helper = queuedHelper(backend)
+    post(helper, real_games, queue=True)
+    assert helper.games.all() == []
+    assert helper.hcLog.all() == []
+    assert len(helper.pending.all()) == len(real_games)
+
+
+def test_revise_matches_addGame(backend, real_games):
+    helper = queuedHelper(backend)
+    post(helper, real_games, queue=True)
+    # the rounds of the last day are not revised yet
+    report = revision.revise(helper, today=date(2025, 1, len(real_games)))
+    assert report == {"days": len(real_games) - 1, "rounds": len(real_games) - 1}
+    assert len(helper.pending.all()) == 1
+    assert revision.revise(helper, today=date(2025, 2, 1))["rounds"] == 1
+
+    reference = memoryHelper(backend.courses.all())
+    post(reference, real_games, queue=False)
+    # one round per day gives the same result as posting immediately
+    assert strip(helper.games.all()) == strip(reference.games.all())
+    assert helper.hcLog.all() == reference.hcLog.all()
+    assert helper.pending.all() == []
+
+
+def test_one_entry_per_day(backend, real_games):
+    helper = queuedHelper(backend)
+    post(helper, real_games, queue=True, perDay=3)
+    days = (len(real_games) + 2) // 3
+    assert revision.revise(helper, today=date(2025, 2, 1)) == {"days": days, "rounds": len(real_games)}
+    log = helper.hcLog.all()
+    assert len(log) == days
+    assert len({datetime.fromisoformat(doc["date"]).date() for doc in log}) == days
+    assert len(helper.games.all()) == len(real_games)
+
+
+def test_resume_after_crash(backend, real_games, monkeypatch):
+    helper = queuedHelper(backend)
+    post(helper, real_games, queue=True, perDay=2)
+
+    # the job dies while writing the fourth day
+    original = Helper._logHandicap
+    calls = []
+
+    def crashing(self, *args):
+        calls.append(1)
+        if len(calls) == 4:
+            raise OSError("disk full")
+        return original(self, *args)
+
+    monkeypatch.setattr(Helper, "_logHandicap", crashing)
+    with pytest.raises(OSError):
+        revision.revise(helper, today=date(2025, 2, 1))
+    monkeypatch.undo()
+    assert len(helper.hcLog.all()) == 3
+
+    # starting the job again finishes the work, running it once more changes nothing
+    revision.revise(helper, today=date(2025, 2, 1))
+    games, log = helper.games.all(), helper.hcLog.all()
+    assert revision.revise(helper, today=date(2025, 2, 1)) == {"days": 0, "rounds": 0}
+
+    expected = memoryHelper(backend.courses.all())
+    post(expected, real_games, queue=True, perDay=2)
+    revision.revise(expected, today=date(2025, 2, 1))
+    assert strip(games) == strip(expected.games.all())
+    assert log == expected.hcLog.all()
+
+
+def test_revise_skips_games_added_before_a_crash(real_courses, real_games, monkeypatch):
+    # without transactions a crash can leave the games written but the rounds still pending
+    helper = memoryHelper(real_courses)
+    post(helper, real_games[:6], queue=True, perDay=2)
+
+    def crashing(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(helper.pending, "remove", crashing)
+    with pytest.raises(OSError):
+        revision.revise(helper, today=date(2025, 2, 1))
+    monkeypatch.undo()
+    assert len(helper.games.all()) == 2
+    assert len(helper.pending.all()) == 6
+
+    assert revision.revise(helper, today=date(2025, 2, 1)) == {"days": 3, "rounds": 6}
+
+    expected = memoryHelper(real_courses)
+    post(expected, real_games[:6], queue=True, perDay=2)
+    revision.revise(expected, today=date(2025, 2, 1))
+    assert strip(helper.games.all()) == strip(expected.games.all())
+    assert helper.hcLog.all() == expected.hcLog.all()
+
+
+def test_revise_club(real_courses, real_games):
+    with TemporaryDirectory() as temp_dir:
+        backend = openBackend("sqlite", temp_dir)
+        backend.courses.insert_multiple(real_courses)
+        club = Club(backend)
+        for playerID in ("anna", "bob"):
+            post(club.addPlayer(playerID), real_games[:4], queue=True)
+        post(queuedHelper(backend), real_games[:2], queue=True)
+        backend.close()
+
+        assert revision.needsRevision(temp_dir, date(2025, 3, 1))
+        report = revision.main(["--db", temp_dir, "--backend", "sqlite", "--today", "2025-03-01"])
+        assert not revision.needsRevision(temp_dir, date(2025, 3, 1))
+        assert revision.needsRevision(temp_dir, date(2025, 3, 2))
+        assert report == {"": {"days": 2, "rounds": 2}, "anna": {"days": 4, "rounds": 4}, "bob": {"days": 4, "rounds": 4}}
+
+        backend = openBackend("sqlite", temp_dir)
+        assert len(Club(backend).player("bob").hcLog.all()) == 4
+        backend.close()
@@ -0,0 +1,56 @@
+import json
+import pathlib
+
+import pytest
+import schema
+
+
+@pytest.fixture
+def game():
+    with open("test/real_data/games/Runde1.json") as file:
+        return json.load(file)
+
+
+@pytest.fixture
+def course():
+    with open("test/real_data/courses/Kurs 1.json") as file:
+        return json.load(file)
+
+
+def test_real_data_is_valid():
+    for file in pathlib.Path("test/real_data/games").glob("*.json"):
+        with file.open() as f:
+            schema.validateGame(json.load(f))
+    for file in pathlib.Path("test/real_data/courses").glob("*.json"):
+        with file.open() as f:
+            schema.validateCourse(json.load(f))
+
+
+def test_validateGame(game):
+    for field, value in [
+        ("shots", [4] * 10),
+        ("shots", [4] * 17 + [0]),
+        ("is9Hole", True),
+        ("pcc", 4),
+        ("cba", True),
+        ("date", "yesterday"),
+    ]:
+        invalid = dict(game, **{field: value})
+        with pytest.raises(ValueError):
+            schema.validateGame(invalid)
+
+    del game["courseID"]
+    with pytest.raises(ValueError):
+        schema.validateGame(game)
+
+
+def test_validateCourse(course):
+    for field, value in [
+        ("slope_rating", 50),
+        ("par", [4] * 9),
+        ("handicap_stroke_index", [1] * 18),
+        ("course_rating", "70"),
+    ]:
+        invalid = dict(course, **{field: value})
+        with pytest.raises(ValueError):
+            schema.validateCourse(invalid)
@@ -0,0 +1,134 @@
+from io import BytesIO
+import json
+import pathlib
+import re
+from tempfile import TemporaryDirectory
+import zipfile
+
+import pytest
+from tinydb import TinyDB
+from tinydb.storages import MemoryStorage
+from backend import openBackend
+from club import Club
+from helper import Helper
+from scorecards import prepare_table_data
+import scorecards
+
+
+@pytest.fixture
+def real_courses():
+    courses = []
+    for file in sorted(pathlib.Path("test/real_data/courses").glob("Kurs*.json")):
+        with file.open() as f:
+            courses.append(json.load(f))
+    return courses
+
+
+def player(courses: list[dict], hci: float | None) -> Helper:
+    db = TinyDB(storage=MemoryStorage)
+    helper = Helper(db.table("games"), db.table("courses"), db.table("hcLog"))
+    helper.courses.insert_multiple(courses)
+    if hci is not None:
+        helper.hcLog.insert({"whs": hci, "ega": hci + 1, "date": "2025-01-01T00:00:00"})
+    return helper
+
+
+def pages(pdf: bytes) -> int:
+    return len(re.findall(rb"/Type /Page\b(?!s)", pdf))
+
+
+def test_prepareCards(real_courses):
+    helpers = [player(real_courses, hci) for hci in (12.3, 30.0, None)]
+    pairs = [(f"p{i}", helper, real_courses[i]) for i, helper in enumerate(helpers)]
+    cards = scorecards.prepareCards(pairs, is_whs=True)
+
+    assert [card["hci"] for card in cards] == [12.3, 30.0, 54.0]
+    for card, (_, helper, course) in zip(cards, pairs):
+        assert card["rows"] == prepare_table_data(card["course"], card["hci"])
+        # nothing is written to the courses
+        assert helper.courses.all() == real_courses
+
+    ega = scorecards.prepareCards(pairs[:1], is_whs=False)
+    assert ega[0]["hci"] == 13.3
+    with pytest.raises(ValueError):
+        scorecards.prepareCards(pairs[:1], use_last_values=True)
+
+
+def test_single_pdf(real_courses):
+    helper = player(real_courses, 20.0)
+    cards = scorecards.prepareCards([(None, helper, course) for course in real_courses] * 3, is_whs=True)
+    output = BytesIO()
+    report = scorecards.exportScorecards(cards, output, single=True)
+    assert report["cards"] == 15
+    assert report["cards_per_second"] > 0
+    assert output.getvalue().startswith(b"%PDF")
+    assert pages(output.getvalue()) == 15
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_zip(real_courses, workers):
+    helper = player(real_courses, 20.0)
+    cards = scorecards.prepareCards([(f"p {i}/x", helper, real_courses[i % 5]) for i in range(40)], is_whs=True)
+    output = BytesIO()
+    scorecards.exportScorecards(cards, output, workers=workers, chunkSize=8)
+
+    with zipfile.ZipFile(output) as archive:
+        names = archive.namelist()
+        assert len(names) == 40
+        assert names[0] == f"0000_p_0_x_{real_courses[0]["courseID"].replace(" ", "_")}.pdf"
+        assert names == sorted(names)
+        for name in names:
+            data = archive.read(name)
+            assert data.startswith(b"%PDF")
+            assert pages(data) == 1
+
+
+def test_club_exportScorecards(real_courses):
+    with TemporaryDirectory() as temp_dir:
+        backend = openBackend("sqlite", temp_dir)
+        backend.courses.insert_multiple(real_courses)
+        club = Club(backend)
+        club.addPlayer("anna", "Anna Example")
+        club.addPlayer("bob")
+        courseIDs = [course["courseID"] for course in real_courses]
+
+        path = f"{temp_dir}/cards.zip"
+        report = club.exportScorecards(
+            [(playerID, courseID) for playerID in ("anna", "bob") for courseID in courseIDs], path, is_whs=True, workers=0
+        )
+        assert report["cards"] == 10
+        with zipfile.ZipFile(path) as archive:
+            assert archive.namelist()[0].startswith("0000_Anna_Example_")
+            assert archive.namelist()[5].startswith("0005_bob_")
+
+        with pytest.raises(KeyError):
+            club.exportScorecards([("anna", "nothing")], path, is_whs=True)
+        backend.close()
+
+
+def test_rows_cached_by_playing_handicap(real_courses):
+    course = real_courses[0]
+    rows = scorecards.prepare_table_data(course, 20.0)
+    # a handicap index with the same playing handicap shares the rows
+    key = (scorecards.courseVersion(course), int(rows[-1][3]))
+    assert key in scorecards._rows[course["courseID"]]
+    assert scorecards.prepare_table_data(course, 20.0) == rows
+
+    overridden = dict(course, handicap_stroke_index=list(reversed(course["handicap_stroke_index"])))
+    assert scorecards.prepare_table_data(overridden, 20.0) != rows
+    assert scorecards.scorecardTemplate(overridden) is not scorecards.scorecardTemplate(course)
+    assert scorecards.scorecardTemplate(course) is scorecards.scorecardTemplate(dict(course))
+
+
+def test_overrides_invalidate_the_cache(real_courses):
+    helper = player(real_courses, 20.0)
+    course = next(course for course in real_courses if len(course["par"]) == 18)
+    version = scorecards.courseVersion(course)
+    scorecards.scorecardTemplate(course)
+    assert version in scorecards._templates[course["courseID"]]
+
+    helper.export_scorecard(BytesIO(), course, True, sr_override=120)
+    # only the overridden version printed after the write is left
+    assert list(scorecards._templates[course["courseID"]]) == [scorecards.courseVersion(dict(course, slope_rating=120))]
+    assert all(key[0] != version for key in scorecards._rows[course["courseID"]])
+
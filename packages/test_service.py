@@ -0,0 +1,180 @@
+import asyncio
+from datetime import datetime, timedelta
+import json
+import pathlib
+from tempfile import TemporaryDirectory
+
+import pytest
+from backend import openBackend
+from helper import Helper
+import service
+from service import Service, call
+
+
+@pytest.fixture(params=["tinydb", "sqlite", "journal"])
+def helper(request):
+    with TemporaryDirectory() as temp_dir:
+        backend = openBackend(request.param, temp_dir)
+        for file in pathlib.Path("test/real_data/courses").glob("Kurs*.json"):
+            with file.open() as f:
+                backend.courses.insert(json.load(f))
+        yield Helper(*backend.tables())
+        backend.close()
+
+
+def run(helper: Helper, client) -> Service:
+    # starts the service, runs the client coroutine against it and stops the service
+    async def main():
+        server = Service(helper)
+        await server.start()
+        try:
+            await client(server.port)
+        finally:
+            await server.stop()
+        return server
+
+    return asyncio.run(main())
+
+
+async def request(port: int, method: str, target: str, payload: dict | None = None) -> tuple[int, bytes]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        return await call(reader, writer, method, target, payload)
+    finally:
+        writer.close()
+
+
+def game(i: int, courseID: str = "Runde 1") -> dict:
+    return {
+        "courseID": courseID,
+        "shots": [4 + i % 3] * 18,
+        "is9Hole": False,
+        "date": (datetime(2025, 1, 1, 10) + timedelta(days=i)).isoformat(),
+    }
+
+
+def test_burst_is_written_once(helper):
+    results = {}
+
+    async def client(port):
+        responses = await asyncio.gather(*(request(port, "POST", "/games", game(i)) for i in range(30)))
+        results["posts"] = responses
+        results["games"] = await request(port, "GET", "/games?n=0&m=99")
+        results["hci"] = await request(port, "GET", "/hci?whs=true")
+
+    server = run(helper, client)
+    assert [status for status, _ in results["posts"]] == [200] * 30
+    assert server.posts == 30
+    # the posts that arrived while the writer was busy were written together
+    assert server.flushes < 30
+
+    status, body = results["games"]
+    games = json.loads(body)
+    assert status == 200
+    assert len(games) == 30
+    assert games == [dict(doc) for doc in helper.getLastGames(0, 99)]
+    assert json.loads(results["hci"][1]) == {"hci": helper.get_last_hci(True)}
+    assert len(helper.games.all()) == 30
+
+
+def test_failing_post_does_not_affect_the_batch(helper):
+    results = {}
+
+    async def client(port):
+        posts = [game(i) for i in range(10)]
+        posts[4] = game(4, courseID="unknown")
+        results["posts"] = await asyncio.gather(*(request(port, "POST", "/games", post) for post in posts))
+
+    run(helper, client)
+    statuses = [status for status, _ in results["posts"]]
+    assert statuses == [200] * 4 + [400] + [200] * 5
+    assert "unknown" in json.loads(results["posts"][4][1])["error"]
+    assert len(helper.games.all()) == 9
+    assert len(helper.gameIndex) == 9
+
+
+def test_reads_and_errors(helper):
+    results = {}
+
+    async def client(port):
+        await request(port, "POST", "/games", game(0))
+        results["hclog"] = await request(port, "GET", "/hclog?n=0&m=30&startDate=2025-01-05T00:00:00")
+        results["ega"] = await request(port, "GET", "/hci?whs=false")
+        results["unknown"] = await request(port, "GET", "/nothing")
+        results["invalid"] = await request(port, "GET", "/games?n=abc")
+        results["metrics"] = await request(port, "GET", "/metrics")
+
+    run(helper, client)
+    assert json.loads(results["hclog"][1]) == [dict(doc) for doc in helper.getHCLog(0, 30, datetime(2025, 1, 5))]
+    assert json.loads(results["ega"][1]) == {"hci": helper.get_last_hci(False)}
+    assert results["unknown"][0] == 404
+    assert results["invalid"][0] == 400
+
+    metrics = json.loads(results["metrics"][1])
+    assert metrics["routes"]["POST /games"]["count"] == 1
+    assert metrics["routes"]["GET /hci"]["count"] == 1
+    assert 0 < metrics["routes"]["GET /hclog"]["p50_ms"] <= metrics["routes"]["GET /hclog"]["p99_ms"]
+
+
+def test_add_course_then_game(helper):
+    results = {}
+    course = {
+        "courseID": "New",
+        "courseRating": 35.2,
+        "slopeRating": 121,
+        "par": [4, 3, 5, 4, 4, 3, 4, 5, 4],
+        "strokeIndex": [5, 17, 1, 9, 3, 15, 11, 7, 13],
+    }
+
+    async def client(port):
+        results["course"] = await request(port, "POST", "/courses", course)
+        results["game"] = await request(port, "POST", "/games", dict(game(0, "New"), shots=[5] * 9, is9Hole=True))
+        results["again"] = await request(port, "POST", "/courses", course)
+        results["slope"] = await request(port, "POST", "/courses", dict(course, courseID="Steep", slopeRating=170))
+        results["metrics"] = await request(port, "GET", "/metrics")
+
+    run(helper, client)
+    assert results["course"][0] == 200
+    assert results["game"][0] == 200
+    assert helper.getCourses([{"courseID": "New"}])[0]["handicap_stroke_index"] == course["strokeIndex"]
+    assert helper.getLastGames()[0]["courseID"] == "New"
+    assert results["again"][0] == 400
+    assert results["slope"][0] == 400
+    # the time the writer held the event loop
+    assert json.loads(results["metrics"][1])["routes"]["writer"]["count"] == 4
+
+
+def test_scorecard(helper):
+    results = {}
+
+    async def client(port):
+        await request(port, "POST", "/games", game(0))
+        results["pdf"] = await request(port, "POST", "/scorecard", {"courseID": "Runde 1", "is_whs": True})
+        results["missing"] = await request(port, "POST", "/scorecard", {"courseID": "nothing", "is_whs": True})
+
+    run(helper, client)
+    status, body = results["pdf"]
+    assert status == 200
+    assert body.startswith(b"%PDF")
+    assert results["missing"][0] == 404
+
+
+def test_load_generator(helper):
+    results = {}
+
+    async def client(port):
+        results["report"] = await service.loadTest(port=port, clients=5, requests=20, writeRatio=0.3)
+
+    server = run(helper, client)
+    report = results["report"]
+    assert report["requests"] == 100
+    assert report["errors"] == 0
+    assert report["p50_ms"] <= report["p99_ms"]
+    assert report["service"]["posts"] == server.posts == len(helper.games.all())
+
+
+def test_percentile():
+    samples = list(range(1, 101))
+    assert service.percentile(samples, 50) == 50
+    assert service.percentile(samples, 99) == 99
+    assert service.percentile([], 99) == 0.0
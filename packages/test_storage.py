@@ -0,0 +1,67 @@
+from tempfile import TemporaryDirectory
+import json
+import os
+
+import pytest
+from tinydb import TinyDB
+from storage import AtomicJSONStorage, TransactionMiddleware
+
+
+@pytest.fixture
+def db():
+    with TemporaryDirectory() as temp_dir:
+        db = TinyDB(f"{temp_dir}/test_db.json", storage=TransactionMiddleware(AtomicJSONStorage))
+        yield db
+        db.close()
+
+
+def test_atomic_write(db):
+    db.table("games").insert({"a": 1})
+    assert db.storage.writes == 1
+    path = db.storage.storage._path
+    with open(path) as file:
+        assert json.load(file) == {"games": {"1": {"a": 1}}}
+    # no temp files are left behind
+    assert os.listdir(os.path.dirname(path)) == ["test_db.json"]
+
+
+def test_transaction_single_write(db):
+    games = db.table("games")
+    hcLog = db.table("hcLog")
+    db.storage.begin()
+    games.insert({"a": 1})
+    games.update({"a": 2}, doc_ids=[1])
+    hcLog.insert({"whs": 54})
+    # reads inside the transaction see the buffered changes
+    assert games.all() == [{"a": 2}]
+    assert db.storage.writes == 0
+    db.storage.commit()
+
+    assert db.storage.writes == 1
+    assert games.all() == [{"a": 2}]
+    assert hcLog.all() == [{"whs": 54}]
+
+
+def test_nested_transaction(db):
+    games = db.table("games")
+    db.storage.begin()
+    db.storage.begin()
+    games.insert({"a": 1})
+    db.storage.commit()
+    assert db.storage.writes == 0
+    db.storage.commit()
+    assert db.storage.writes == 1
+
+
+def test_rollback(db):
+    games = db.table("games")
+    games.insert({"a": 1})
+    db.storage.begin()
+    games.insert({"a": 2})
+    db.storage.rollback()
+    games.clear_cache()
+    assert db.storage.writes == 1
+    assert games.all() == [{"a": 1}]
+
+    with pytest.raises(RuntimeError):
+        db.storage.commit()
@@ -0,0 +1,86 @@
+from tempfile import TemporaryDirectory
+
+import pytest
+from backend import openBackend
+from club import Club
+from helper import Helper
+import schema
+import synthetic
+
+
+@pytest.fixture
+def courses():
+    return list(synthetic.courses(10, seed=3))
+
+
+def test_courses_are_valid(courses):
+    for course in courses:
+        schema.validateCourse(course)
+    assert any(len(course["par"]) == 9 for course in synthetic.courses(50))
+    assert all(70 <= sum(course["par"]) <= 73 for course in courses if len(course["par"]) == 18)
+
+
+def test_deterministic(courses):
+    assert list(synthetic.courses(10, seed=3)) == courses
+    assert list(synthetic.rounds(courses, 50, seed=1)) == list(synthetic.rounds(courses, 50, seed=1))
+    assert list(synthetic.rounds(courses, 50, seed=1)) != list(synthetic.rounds(courses, 50, seed=2))
+    # a player does not depend on the players generated before
+    players = list(synthetic.players(20, seed=1))
+    assert list(synthetic.rounds(courses, 5, seed=1, playerID=players[7]["playerID"])) == list(
+        synthetic.rounds(courses, 5, seed=1, playerID="p000007")
+    )
+
+
+def test_rounds(courses):
+    rounds = list(synthetic.rounds(courses, 200))
+    for game in rounds:
+        schema.validateGame(game)
+    dates = [game["date"] for game in rounds]
+    assert dates == sorted(dates)
+    assert len({game["game_id"] for game in rounds}) == 200
+
+    # better players need fewer shots
+    eighteen = [course for course in courses if len(course["par"]) == 18]
+    def average(hci: float) -> float:
+        games = list(synthetic.rounds(eighteen, 100, handicapIndex=hci))
+        return sum(sum(game["shots"]) for game in games) / len(games)
+
+    assert average(5.0) + 15 < average(25.0) < average(45.0) - 15
+
+
+def test_json_dir_for_importFromDir(courses):
+    with TemporaryDirectory() as temp_dir:
+        backend = openBackend("journal", temp_dir)
+        helper = Helper(*backend.tables())
+        assert synthetic.insertStream(helper.courses, courses, batchSize=3) == 10
+        assert synthetic.writeJSONDir(synthetic.rounds(courses, 30), f"{temp_dir}/games") == 30
+
+        report = helper.importFromDir(helper.games, f"{temp_dir}/games")
+        assert report == {"inserted": 30, "errors": {}}
+        assert len(helper.getLastGames()) == 20
+        backend.close()
+
+
+def test_insertHistory(courses):
+    with TemporaryDirectory() as temp_dir:
+        backend = openBackend("sqlite", temp_dir)
+        helper = Helper(*backend.tables())
+        backend.courses.insert_multiple(courses)
+        assert synthetic.insertHistory(helper, synthetic.history(courses, 250), batchSize=100) == 250
+        assert len(helper.games.all()) == len(helper.hcLog.all()) == 250
+        assert all("handicap_dif" in game for game in helper.getLastGames())
+        assert helper.get_last_hci(True) == helper.hcLog.all()[-1]["whs"]
+        backend.close()
+
+
+def test_populateClub():
+    with TemporaryDirectory() as temp_dir:
+        backend = openBackend("journal", temp_dir)
+        club = Club(backend)
+        report = synthetic.populateClub(club, courseCount=5, playerCount=12, roundsPerPlayer=25, seed=7)
+        assert report == {"courses": 5, "players": 12, "rounds": 300}
+        assert len(club.playerIDs()) == 12
+        player = club.player("p000011")
+        assert len(player.games.all()) == 25
+        assert player.get_last_hci(True) is not None
+        backend.close()